@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+# Import-time benchmark of root_plot entry points
+# Each case runs in a fresh interpreter, wall time of the whole process
+
+# Usage:
+# python benchmarks/bench_import.py [--repeat 5]
+
+import sys, os, time, statistics, subprocess, argparse
+
+CASES = [
+  ('python', 'pass'),
+  ('import ROOT', 'import ROOT'),
+  ('import root_plot', 'import root_plot'),
+  ('efficiency_simple', 'import root_plot; root_plot.efficiency_simple(5, 10)'),
+  ('Painter', 'from root_plot import Painter'),
+  ('import *', 'from root_plot import *'),
+]
+
+def time_case(stmt, repeat, env):
+  times = []
+  for _ in range(repeat):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', stmt], check=True, env=env)
+    times.append(time.perf_counter() - start)
+  return min(times), statistics.median(times)
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Import-time benchmark of root_plot')
+  parser.add_argument('--repeat', type=int, default=5, help='runs per case')
+  args = parser.parse_args()
+  env = dict(os.environ)
+  env['PYTHONPATH'] = os.pathsep.join([os.path.dirname(os.path.dirname(os.path.realpath(__file__))), env.get('PYTHONPATH', '')])
+  env.setdefault('ROOT_PLOT_BATCH', '1')
+  print(f'{"case":<20} {"min [s]":>8} {"median [s]":>10}')
+  for name, stmt in CASES:
+    tmin, tmed = time_case(stmt, args.repeat, env)
+    print(f'{name:<20} {tmin:8.3f} {tmed:10.3f}')
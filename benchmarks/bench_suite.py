@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+# Benchmark suite of root_plot, headless (ROOT batch mode)
+# Synthetic TH1/TH2 inputs at several sizes, results stored as JSON
+
+# Usage:
+# python benchmarks/bench_suite.py -o bench_<commit>.json [--quick] [-k langau]
+# python benchmarks/bench_suite.py --compare bench_old.json bench_new.json
+
+import os, sys, time, json, shutil, socket, platform, statistics, subprocess, tempfile, argparse
+
+os.environ.setdefault('ROOT_PLOT_BATCH', '1')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+BENCHMARKS = []
+def benchmark(name, sizes, quickSizes=None):
+  """Register bench(size, workDir) -> callable timed per repetition
+  """
+  def decorator(setup):
+    BENCHMARKS.append({'name': name, 'sizes': sizes, 'quickSizes': quickSizes or sizes[:1], 'setup': setup})
+    return setup
+  return decorator
+
+# Synthetic inputs
+def gaus_hist(name, nbins, mean=0., sigma=1.):
+  import ROOT, numpy as np
+  from root_plot.array_util import hist_content, axis_centers, sync_stats
+  hist = ROOT.TH1D(name, 'Gaussian;x;counts', nbins, mean - 6 * sigma, mean + 6 * sigma)
+  x = axis_centers(hist.GetXaxis())
+  expected = 1e5 * np.exp(-0.5 * ((x - mean) / sigma) ** 2) * (12 * sigma / nbins) / (2.5066 * sigma)
+  hist.Sumw2()
+  hist_content(hist, flow=False)[:] = np.random.default_rng(1).poisson(expected)
+  hist.SetEntries(hist.Integral())
+  return sync_stats(hist)
+
+def langau_hist(name, nbins, pars=(2., 40., 1e5, 3.)):
+  import ROOT, numpy as np
+  from root_plot.array_util import hist_content, axis_centers, sync_stats
+  from root_plot.fit_util import langaus_array
+  hist = ROOT.TH1D(name, 'Landau-Gaussian;x;counts', nbins, 0., 200.)
+  x = axis_centers(hist.GetXaxis())
+  expected = langaus_array(x, pars) * (200. / nbins)
+  hist.Sumw2()
+  hist_content(hist, flow=False)[:] = np.random.default_rng(2).poisson(expected)
+  hist.SetEntries(hist.Integral())
+  return sync_stats(hist)
+
+def response_hist(name, nbins):
+  import ROOT, numpy as np
+  from root_plot.array_util import hist_content, axis_centers, sync_stats
+  hist = ROOT.TH2D(name, 'Response;measured;true', nbins, 0., 1., nbins, 0., 1.)
+  x = axis_centers(hist.GetXaxis())
+  y = axis_centers(hist.GetYaxis())
+  expected = 1e3 * np.exp(-0.5 * ((x[:, np.newaxis] - y[np.newaxis, :]) / 0.05) ** 2)
+  hist.Sumw2()
+  hist_content(hist, flow=False)[:] = np.random.default_rng(3).poisson(expected)
+  hist.SetEntries(hist.Integral())
+  return sync_stats(hist)
+
+def new_painter(workDir, tag, **kwargs):
+  from root_plot import Painter
+  return Painter(printer=os.path.join(workDir, f'{tag}.pdf'), **kwargs)
+
+# Benchmarks
+@benchmark('fcn_langaus', [200, 2000], [200])
+def bench_fcn_langaus(size, workDir):
+  import numpy as np
+  from root_plot.fit_util import fcn_langaus
+  xs = np.linspace(0., 200., size)
+  pars = [2., 40., 1e5, 3.]
+  return lambda: [fcn_langaus([x], pars) for x in xs]
+
+@benchmark('langaus_array', [200, 2000, 20000], [200])
+def bench_langaus_array(size, workDir):
+  import numpy as np
+  from root_plot.fit_util import langaus_array
+  xs = np.linspace(0., 200., size)
+  return lambda: langaus_array(xs, (2., 40., 1e5, 3.))
+
+def moyal_eval(size, native):
+  # TH1::Eval(TF1) loops over bins in C++, cost per evaluation is the callback
+  import ROOT
+  from root_plot.fit_util import fcn_moyal, native_tf1
+  hist = ROOT.TH1D(f'hMoyal_{size}_{native}', 'Moyal', size, -5., 20.)
+  if native:
+    fcn = native_tf1('moyal', f'fcnMoyalNative_{size}', -5., 20.)
+  else:
+    fcn = ROOT.TF1(f'fcnMoyalPython_{size}', fcn_moyal, -5., 20., 2)
+  fcn.SetParameters(2., 1.)
+  def run():
+    hist.Eval(fcn)
+    return hist, fcn
+  return run
+
+@benchmark('moyal_python', [1000, 10000], [1000])
+def bench_moyal_python(size, workDir):
+  return moyal_eval(size, native=False)
+
+@benchmark('moyal_native', [1000, 10000, 100000], [1000])
+def bench_moyal_native(size, workDir):
+  return moyal_eval(size, native=True)
+
+@benchmark('DrawHist_optGaus', [100, 1000], [100])
+def bench_draw_gaus(size, workDir):
+  hist = gaus_hist(f'hGaus_{size}', size)
+  painter = new_painter(workDir, f'gaus_{size}')
+  return lambda: (painter.DrawHist(hist, optGaus=True), painter.NextPage())
+
+@benchmark('DrawHist_optLangau', [100, 400], [100])
+def bench_draw_langau(size, workDir):
+  hist = langau_hist(f'hLangau_{size}', size)
+  painter = new_painter(workDir, f'langau_{size}')
+  return lambda: (painter.DrawHist(hist, optLangau=True), painter.NextPage())
+
+@benchmark('Rebin2D', [100, 500, 1000], [100])
+def bench_rebin2d(size, workDir):
+  import numpy as np
+  from root_plot.plot_util import Rebin2D
+  hist = response_hist(f'hRebin_{size}', size)
+  edges = np.unique(np.concatenate([np.linspace(0., 0.5, size // 4 + 1), np.linspace(0.5, 1., size // 10 + 1)]))
+  return lambda: Rebin2D(hist, edges, edges, name=f'hRebinned_{size}').Delete()
+
+@benchmark('ResponseNorm', [100, 500, 1000], [100])
+def bench_response_norm(size, workDir):
+  from root_plot.plot_util import ResponseNorm
+  hist = response_hist(f'hResponse_{size}', size)
+  return lambda: ResponseNorm(hist)
+
+@benchmark('draw_hist_text', [10, 50, 100], [10])
+def bench_hist_text(size, workDir):
+  hist = response_hist(f'hText_{size}', size)
+  painter = new_painter(workDir, f'text_{size}')
+  def run():
+    # DrawHist sets the Z range on the histogram, reset it so that every
+    # iteration draws the same input
+    hist.SetMinimum()
+    hist.SetMaximum()
+    hist.GetZaxis().SetRange()
+    painter.DrawHist(hist, option='colz')
+    painter.draw_hist_text(hist, minCellSize=0.)
+    painter.NextPage()
+  return run
+
+@benchmark('multipage_pdf', [10, 100], [10])
+def bench_multipage(size, workDir):
+  hists = [gaus_hist(f'hPage_{size}_{i}', 100) for i in range(size)]
+  def run():
+    painter = new_painter(workDir, f'pages_{size}')
+    painter.PrintCover('Benchmark')
+    for hist in hists:
+      painter.DrawHist(hist)
+      painter.NextPage()
+    painter.PrintBackCover()
+  return run
+
+# Runner
+def git_commit():
+  try:
+    return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+      cwd=os.path.dirname(os.path.realpath(__file__))).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+def run_benchmarks(quick=False, repeat=3, select=None):
+  import ROOT
+  ROOT.gROOT.SetBatch(True)
+  ROOT.gErrorIgnoreLevel = ROOT.kWarning
+  workDir = tempfile.mkdtemp(prefix='root_plot_bench_')
+  results = []
+  try:
+    for bench in BENCHMARKS:
+      if select and select not in bench['name']: continue
+      for size in (bench['quickSizes'] if quick else bench['sizes']):
+        run = bench['setup'](size, workDir)
+        run() # warm-up, JIT & caches
+        times = []
+        for _ in range(repeat):
+          start = time.perf_counter()
+          run()
+          times.append(time.perf_counter() - start)
+        result = {'name': bench['name'], 'size': size, 'repeat': repeat,
+          'min': min(times), 'median': statistics.median(times), 'mean': statistics.mean(times)}
+        print(f'{bench["name"]:<20} {size:>7} {result["min"]:10.4f} {result["median"]:10.4f}', flush=True)
+        results.append(result)
+  finally:
+    shutil.rmtree(workDir, ignore_errors=True)
+  return {
+    'meta': {
+      'commit': git_commit(),
+      'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+      'host': socket.gethostname(),
+      'platform': platform.platform(),
+      'python': platform.python_version(),
+      'root': ROOT.gROOT.GetVersion(),
+      'quick': quick,
+    },
+    'results': results,
+  }
+
+def compare(baseFile, newFile):
+  with open(baseFile) as f: base = json.load(f)
+  with open(newFile) as f: new = json.load(f)
+  baseTimes = {(r['name'], r['size']): r['median'] for r in base['results']}
+  print(f'base {base["meta"]["commit"]} -> new {new["meta"]["commit"]}')
+  print(f'{"benchmark":<20} {"size":>7} {"base [s]":>10} {"new [s]":>10} {"new/base":>9}')
+  for r in new['results']:
+    baseTime = baseTimes.get((r['name'], r['size']))
+    ratio = f'{r["median"] / baseTime:9.2f}' if baseTime else f'{"-":>9}'
+    baseStr = f'{baseTime:10.4f}' if baseTime else f'{"-":>10}'
+    print(f'{r["name"]:<20} {r["size"]:>7} {baseStr} {r["median"]:10.4f} {ratio}')
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Benchmark suite of root_plot')
+  parser.add_argument('-o', '--output', default='bench_results.json', help='JSON output')
+  parser.add_argument('-r', '--repeat', type=int, default=3, help='timed runs per case')
+  parser.add_argument('-k', '--select', default=None, help='run benchmarks whose name contains this')
+  parser.add_argument('--quick', action='store_true', help='smallest size only')
+  parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='compare two JSON outputs')
+  args = parser.parse_args()
+  if args.compare:
+    compare(*args.compare)
+    sys.exit(0)
+  print(f'{"benchmark":<20} {"size":>7} {"min [s]":>10} {"median [s]":>10}')
+  output = run_benchmarks(args.quick, args.repeat, args.select)
+  with open(args.output, 'w') as f:
+    json.dump(output, f, indent=2)
+  print(f'[-] INFO - Results saved to {args.output}')
@@ -1,7 +1,81 @@
-from root_plot import painter
-from root_plot.plot_util import *
-from root_plot.fit_util import *
-from root_plot.analysis_util import *
+# Lazy loading of submodules and symbols
 
-Painter = painter.Painter
+# `import root_plot` loads no submodule and does not import ROOT.
+# Attributes are resolved on first access, e.g. root_plot.efficiency_simple
+# imports analysis_util only. `from root_plot import *` loads everything.
 
+import os, sys, importlib
+
+# Modules exported by `from root_plot import *`, later ones take precedence
+_STAR_MODULES = ['plot_util', 'fit_util', 'analysis_util', 'array_util', 'rebin_util', 'ratio_util']
+# Lookup order for lazy attributes, light modules first
+_LOOKUP_MODULES = ['analysis_util', 'array_util', 'rebin_util', 'ratio_util', 'fit_util', 'plot_util']
+_EXPORTS = {
+  'Painter': ('painter', 'Painter'),
+  'fit_many': ('fit_batch', 'fit_many'),
+}
+_SUBMODULES = ['painter', 'plot_util', 'fit_util', 'analysis_util', 'array_util',
+  'rebin_util', 'fit_batch', 'fit_cache', 'export_pool', 'timing_util',
+  'pdf_util', 'page_cache', 'file_util', 'cli', 'root_archive',
+  'snapshot_cache', 'ratio_util', 'integral_index']
+
+def _headless():
+  """No display available, e.g. batch node or ssh without X forwarding
+  Override by ROOT_PLOT_BATCH=1/0
+  """
+  if os.environ.get('ROOT_PLOT_BATCH'):
+    return os.environ['ROOT_PLOT_BATCH'] != '0'
+  if sys.platform == 'darwin' or sys.platform.startswith('win'):
+    return False
+  return not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+HEADLESS = _headless()
+
+def setup_root():
+  """Import ROOT, switch to batch mode if HEADLESS
+  """
+  import ROOT
+  if HEADLESS and not ROOT.gROOT.IsBatch():
+    ROOT.gROOT.SetBatch(True)
+  return ROOT
+
+def _public_names(module):
+  names = getattr(module, '__all__', None)
+  if names is None:
+    names = [name for name in vars(module) if not name.startswith('_')]
+  return list(names)
+
+def _load_all():
+  names = []
+  for modName in _STAR_MODULES:
+    module = importlib.import_module(f'root_plot.{modName}')
+    for name in _public_names(module) + list(getattr(module, 'ROOT_SYMBOLS', [])):
+      globals()[name] = getattr(module, name)
+      if name not in names: names.append(name)
+  for name in _EXPORTS:
+    globals()[name] = __getattr__(name)
+  return names + list(_EXPORTS) + _SUBMODULES
+
+def __getattr__(name):
+  if name == '__all__':
+    globals()['__all__'] = _load_all()
+    return globals()['__all__']
+  if name in _SUBMODULES:
+    return importlib.import_module(f'root_plot.{name}')
+  if name in _EXPORTS:
+    modName, attr = _EXPORTS[name]
+    value = getattr(importlib.import_module(f'root_plot.{modName}'), attr)
+  elif name.startswith('_'):
+    raise AttributeError(f"module 'root_plot' has no attribute '{name}'")
+  else:
+    for modName in _LOOKUP_MODULES:
+      module = importlib.import_module(f'root_plot.{modName}')
+      if name in _public_names(module) or name in getattr(module, 'ROOT_SYMBOLS', []):
+        value = getattr(module, name)
+        break
+    else:
+      raise AttributeError(f"module 'root_plot' has no attribute '{name}'")
+  globals()[name] = value
+  return value
+
+def __dir__():
+  return sorted(set(globals()) | set(_EXPORTS) | set(_SUBMODULES))
@@ -0,0 +1,4 @@
+import sys
+from root_plot.cli import main
+
+sys.exit(main())
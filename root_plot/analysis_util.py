@@ -1,14 +1,75 @@
 import ROOT
+import functools
+import numpy as np
+from root_plot.array_util import hist_content
+
+try:
+  from scipy.special import betaincinv
+except ImportError:
+  betaincinv = None
 
 # numerical calculation
 def efficiency_simple(nsel, nall):
   if(nall < 1.):
-    return (0., 0.)
+    return (0., 0., 0., 0.)
   eff = float(nsel) / float(nall)
-  lowerErrorEff = eff - ROOT.TEfficiency.ClopperPearson(nall, nsel, 0.683, False)
-  upperErrorEff = ROOT.TEfficiency.ClopperPearson(nall, nsel, 0.683, True) - eff
+  lower, upper = clopper_pearson(float(nall), float(nsel), 0.683)
+  lowerErrorEff = eff - lower
+  upperErrorEff = upper - eff
   error = (upperErrorEff + lowerErrorEff) / 2.
   return eff, error, lowerErrorEff, upperErrorEff
 def show_efficiency(nsel, nall):
   eff, error, lerr, uerr = efficiency_simple(nsel, nall)
-  return f'{eff * 100:.1f}^{{+{uerr * 100:.1f}}}_{{-{lerr * 100:.1f}}} %'
\ No newline at end of file
+  return f'{eff * 100:.1f}^{{+{uerr * 100:.1f}}}_{{-{lerr * 100:.1f}}} %'
+
+@functools.lru_cache(maxsize=1 << 16)
+def clopper_pearson(nall, nsel, level=0.683):
+  """(lower, upper) bound as TEfficiency::ClopperPearson, memoized per (n, k)
+  """
+  alpha = (1. - level) / 2.
+  lower = ROOT.Math.beta_quantile(alpha, nsel, nall - nsel + 1.) if nsel > 0 else 0.
+  upper = ROOT.Math.beta_quantile_c(alpha, nsel + 1., nall - nsel) if nsel < nall else 1.
+  return lower, upper
+
+def clopper_pearson_array(nall, nsel, level=0.683):
+  """Vectorized (lower, upper) bound arrays, shape of nall/nsel
+  Each distinct (n, k) pair is evaluated once
+  """
+  nall, nsel = np.broadcast_arrays(np.asarray(nall, dtype=float), np.asarray(nsel, dtype=float))
+  lower = np.zeros(nall.shape)
+  upper = np.ones(nall.shape)
+  valid = nall > 0
+  if betaincinv is not None:
+    alpha = (1. - level) / 2.
+    n, k = nall[valid], nsel[valid]
+    low, up = np.zeros(n.shape), np.ones(n.shape)
+    hasLow, hasUp = k > 0, k < n
+    low[hasLow] = betaincinv(k[hasLow], n[hasLow] - k[hasLow] + 1., alpha)
+    up[hasUp] = betaincinv(k[hasUp] + 1., n[hasUp] - k[hasUp], 1. - alpha)
+    lower[valid], upper[valid] = low, up
+    return lower, upper
+  pairs, inverse = np.unique(np.stack([nall[valid], nsel[valid]], axis=-1), axis=0, return_inverse=True)
+  bounds = np.array([clopper_pearson(n, k, level) for n, k in pairs.tolist()]).reshape(-1, 2)
+  inverse = inverse.reshape(-1)
+  lower[valid] = bounds[inverse, 0]
+  upper[valid] = bounds[inverse, 1]
+  return lower, upper
+
+def efficiency_array(nsel, nall, level=0.683):
+  """Efficiency arrays (eff, error, lowerError, upperError) as efficiency_simple
+  Zeros where nall < 1
+  """
+  nsel, nall = np.broadcast_arrays(np.asarray(nsel, dtype=float), np.asarray(nall, dtype=float))
+  valid = nall >= 1.
+  eff = np.divide(nsel, nall, out=np.zeros(nall.shape), where=valid)
+  lower, upper = clopper_pearson_array(np.where(valid, nall, 0.), np.where(valid, nsel, 0.), level)
+  lowerError = np.where(valid, eff - lower, 0.)
+  upperError = np.where(valid, upper - eff, 0.)
+  return eff, (lowerError + upperError) / 2., lowerError, upperError
+
+def efficiency_hist(passed, total, flow=False, level=0.683):
+  """Efficiency arrays of TH1/TH2 pass/total pair, shaped [ix, iy]
+  """
+  if passed.GetNcells() != total.GetNcells():
+    raise ValueError(f'Inconsistent binning : {passed.GetName()} / {total.GetName()}')
+  return efficiency_array(hist_content(passed, flow), hist_content(total, flow), level)
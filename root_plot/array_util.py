@@ -0,0 +1,153 @@
+# NumPy views of ROOT histogram buffers
+
+# Bin contents and squared errors of TH1/TH2/TH3 are exposed without copy,
+# including under/overflow bins, so bin-wise transforms run as array
+# operations directly on the histogram memory.
+# Layout (flow=True): index 0 is underflow, index N+1 is overflow,
+#   1D - [ix], 2D - [ix, iy], 3D - [ix, iy, iz]
+
+import zlib
+
+import ROOT
+import numpy as np
+
+# Storage class of histogram -> NumPy dtype
+# TArrayC (TH1C) is not supported: its Char_t* array converts to str, not a buffer
+HIST_DTYPES = [
+  ('TArrayD', np.float64),
+  ('TArrayF', np.float32),
+  ('TArrayI', np.int32),
+  ('TArrayS', np.int16),
+  ('TArrayL64', np.int64),
+]
+
+def hist_dtype(hist):
+  if hist.InheritsFrom('TProfile') or hist.InheritsFrom('TProfile2D'):
+    raise TypeError(f'{hist.ClassName()} stores sums, not bin contents')
+  for arrayClass, dtype in HIST_DTYPES:
+    if hist.InheritsFrom(arrayClass):
+      return dtype
+  raise TypeError(f'Unsupported histogram storage : {hist.ClassName()}')
+
+def _buffer_view(ptr, ncells, dtype):
+  return np.frombuffer(ptr, dtype=dtype, count=ncells)
+
+def _shape_view(hist, flat, flow):
+  """Reshape flat global-bin buffer to [ix, iy, iz] without copy
+  ROOT global bin = ix + (nx+2) * (iy + (ny+2) * iz)
+  """
+  ndim = hist.GetDimension()
+  shape = [hist.GetNbinsX() + 2, hist.GetNbinsY() + 2, hist.GetNbinsZ() + 2][:ndim]
+  view = flat.reshape(shape[::-1]).T
+  if not flow:
+    view = view[(slice(1, -1),) * ndim]
+  return view
+
+def hist_content(hist, flow=True):
+  """Bin contents as NumPy view, writes go to the histogram
+  """
+  flat = _buffer_view(hist.GetArray(), hist.GetNcells(), hist_dtype(hist))
+  return _shape_view(hist, flat, flow)
+
+def hist_sumw2(hist, flow=True, create=True):
+  """Sum of squared weights (= error^2) as NumPy view
+
+  create - call TH1::Sumw2() if not stored yet (initialised from contents),
+    otherwise return None for histograms without Sumw2
+  """
+  if hist.GetSumw2N() == 0:
+    if not create:
+      return None
+    hist.Sumw2()
+  flat = _buffer_view(hist.GetSumw2().GetArray(), hist.GetNcells(), np.float64)
+  return _shape_view(hist, flat, flow)
+
+def hist_errors(hist, flow=True):
+  """Bin errors as in TH1::GetBinError (copy)
+  """
+  sumw2 = hist_sumw2(hist, flow, create=False)
+  if sumw2 is None:
+    return np.sqrt(np.abs(hist_content(hist, flow).astype(np.float64)))
+  return np.sqrt(sumw2)
+
+def axis_edges(axis):
+  """Bin edges of TAxis, N+1 values (copy)
+  """
+  nbins = axis.GetNbins()
+  xbins = axis.GetXbins()
+  if xbins.GetSize() == 0: # fixed bin width
+    return np.linspace(axis.GetXmin(), axis.GetXmax(), nbins + 1)
+  return np.array(_buffer_view(xbins.GetArray(), nbins + 1, np.float64))
+
+def axis_centers(axis):
+  edges = axis_edges(axis)
+  return 0.5 * (edges[1:] + edges[:-1])
+
+def axis_widths(axis):
+  return np.diff(axis_edges(axis))
+
+def _checksum(values, crc=0):
+  # transposed [ix, iy] views are C-contiguous as global-bin buffers, no copy
+  return zlib.crc32(np.ascontiguousarray(values.T).view(np.uint8), crc)
+
+def hist_key(hist):
+  """Modification key of histogram for caches: identity, name, entries and
+  CRC32 of bin edges, contents and sumw2 (one pass over the buffers, no copy)
+  Changes with Fill, SetBinContent or writes to the array views
+  """
+  crc = 0
+  for axis in [hist.GetXaxis(), hist.GetYaxis(), hist.GetZaxis()][:hist.GetDimension()]:
+    crc = _checksum(axis_edges(axis), crc)
+  crc = _checksum(hist_content(hist), crc)
+  sumw2 = hist_sumw2(hist, create=False)
+  if sumw2 is not None:
+    crc = _checksum(sumw2, crc)
+  return (id(hist), hist.GetName(), hist.GetNcells(), hist.GetEntries(), crc)
+
+def sync_stats(hist):
+  """Recompute statistics after direct writes into bin buffers
+  Number of entries is kept
+  """
+  entries = hist.GetEntries()
+  hist.ResetStats()
+  hist.SetEntries(entries)
+  return hist
+
+def hist_to_arrays(hist):
+  """Plain dict of TH1/TH2 binning and buffers (copies), picklable
+  """
+  ndim = hist.GetDimension()
+  axes = [hist.GetXaxis(), hist.GetYaxis(), hist.GetZaxis()][:ndim]
+  sumw2 = hist_sumw2(hist, create=False)
+  return {
+    'name': hist.GetName(),
+    'title': hist.GetTitle(),
+    'edges': [axis_edges(axis) for axis in axes],
+    'axisTitles': [axis.GetTitle() for axis in axes],
+    'content': np.array(hist_content(hist), dtype=np.float64),
+    'sumw2': None if sumw2 is None else np.array(sumw2),
+    'entries': hist.GetEntries(),
+  }
+
+def arrays_to_hist(data, name=None):
+  """Build TH1D/TH2D from hist_to_arrays() output
+  data['className'] (optional) - e.g. TH1F, default TH1D/TH2D/TH3D
+  """
+  from array import array
+  edges = data['edges']
+  binning = []
+  for axisEdges in edges:
+    binning += [len(axisEdges) - 1, array('d', axisEdges)]
+  if data.get('className'):
+    histClass = getattr(ROOT, data['className'])
+  else:
+    histClass = {1: ROOT.TH1D, 2: ROOT.TH2D, 3: ROOT.TH3D}[len(edges)]
+  hist = histClass(name or data['name'], data['title'], *binning)
+  axes = [hist.GetXaxis(), hist.GetYaxis(), hist.GetZaxis()]
+  for axis, title in zip(axes, data.get('axisTitles', [])):
+    axis.SetTitle(title)
+  if data['sumw2'] is not None:
+    hist_sumw2(hist)[...] = data['sumw2']
+  hist_content(hist)[...] = data['content']
+  hist.SetEntries(data['entries'])
+  return sync_stats(hist)
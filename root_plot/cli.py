@@ -0,0 +1,185 @@
+# Command line interface: root-plot JOB_SPEC
+
+# Job spec (JSON, or YAML with PyYAML installed):
+# {
+#   "output": "report.pdf",
+#   "title": "QA report",
+#   "layout": {"nx": 2, "ny": 2},
+#   "painter": {"showPageNo": true},          # Painter keyword arguments
+#   "inputs": [
+#     {"file": "run.root", "include": ["QA/*"], "exclude": ["*_tmp"], "classes": ["TH1"]}
+#   ],
+#   "options": {"TH2": {"option": "colz"}},    # DrawHist arguments per class
+#   "fits": {"TH1F": "gaus"},                  # fit model per class, gaus or langau
+#   "workers": 8,
+#   "snapshotDir": ".snapshots"                # optional, see snapshot_cache
+# }
+
+# Objects are listed without reading, grouped into pages by layout and the
+# pages split into contiguous shards. Each shard is rendered into its own
+# PDF by a worker process, then cover, shards and back cover are merged in
+# order. Page numbers continue across shards.
+
+import os, sys, json, math, shutil, tempfile, argparse, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+FIT_OPTIONS = {'gaus': 'optGaus', 'langau': 'optLangau'}
+DEFAULT_OPTIONS = {'TH2': {'option': 'colz'}, 'TGraph': {'option': 'AP'}}
+
+def load_spec(path):
+  with open(path) as f:
+    if path.endswith(('.yaml', '.yml')):
+      try:
+        import yaml
+      except ImportError:
+        raise RuntimeError('PyYAML is required for YAML job spec, or use JSON')
+      return yaml.safe_load(f)
+    return json.load(f)
+
+def class_options(spec, className):
+  """DrawHist arguments for object class, first matching base class
+  """
+  import ROOT
+  cl = ROOT.TClass.GetClass(className)
+  options = {}
+  for base, opts in spec.get('options', DEFAULT_OPTIONS).items():
+    if cl and cl.InheritsFrom(base):
+      options = dict(opts)
+      break
+  for base, model in spec.get('fits', {}).items():
+    if cl and cl.InheritsFrom(base):
+      options[FIT_OPTIONS[model]] = True
+      break
+  return options
+
+def list_items(spec):
+  """Objects to draw as [file, path, DrawHist options], in order
+  With snapshotDir, snapshots are (re)built here, before the workers start
+  """
+  from root_plot.file_util import list_file
+  if spec.get('snapshotDir'):
+    from root_plot.snapshot_cache import SnapshotCache
+    list_file = SnapshotCache(spec['snapshotDir']).list
+  items = []
+  for source in spec['inputs']:
+    for path, className in list_file(source['file'], source.get('include'),
+        source.get('exclude'), source.get('classes', ['TH1', 'TGraph'])):
+      items.append([source['file'], path, class_options(spec, className)])
+  return items
+
+def split_shards(items, padsPerPage, nshards):
+  """Contiguous shards of whole pages, as (first page index, items)
+  """
+  pages = [items[i:i + padsPerPage] for i in range(0, len(items), padsPerPage)]
+  pagesPerShard = math.ceil(len(pages) / max(1, nshards)) if pages else 1
+  shards = []
+  for first in range(0, len(pages), pagesPerShard):
+    shardItems = [item for page in pages[first:first + pagesPerShard] for item in page]
+    shards.append((first, shardItems))
+  return shards
+
+def new_painter(spec, printer, **kwargs):
+  from root_plot.painter import Painter
+  layout = spec.get('layout', {})
+  painterArgs = dict(spec.get('painter', {}))
+  painterArgs.update(kwargs)
+  return Painter(printer=printer, nx=layout.get('nx', 1), ny=layout.get('ny', 1), **painterArgs)
+
+def render_shard(spec, printer, pageOffset, items):
+  """Render items into printer (PDF) as pages pageOffset+1, ...
+  """
+  import ROOT
+  from root_plot.file_util import open_file, detach
+  ROOT.gROOT.SetBatch(True)
+  painter = new_painter(spec, printer, pageOffset=pageOffset)
+  painter.OpenDocument()
+  snapshots = None
+  if spec.get('snapshotDir'):
+    from root_plot.snapshot_cache import SnapshotCache
+    snapshots = SnapshotCache(spec['snapshotDir'])
+  files = {}
+  missing = 0
+  for fileName, path, options in items:
+    if snapshots is not None:
+      try:
+        obj = snapshots.get(fileName, path)
+      except KeyError:
+        obj = None
+    else:
+      if fileName not in files:
+        files[fileName] = open_file(fileName)
+      obj = detach(files[fileName].Get(path))
+    if obj is None: # keep the pad, page numbers of later shards are fixed
+      print(f'[X] Warning  - {fileName} : {path} not found, skipped')
+      missing += 1
+      painter.NextPad(path)
+      pave = painter.draw_text()
+      painter.add_text(pave, f'{path} not found', align=22)
+      pave.Draw()
+      painter.padEmpty = False
+      continue
+    painter.DrawHist(obj, **options)
+    painter.new_obj(obj)
+  if not painter.padEmpty:
+    painter.NextPage()
+  painter.CloseDocument()
+  for tfile in files.values():
+    tfile.Close()
+  if missing:
+    print(f'[X] Warning  - {printer} - {missing} of {len(items)} objects not found')
+  return printer
+
+def render_covers(spec, workDir):
+  """Cover and back cover as separate PDF files
+  """
+  cover = os.path.join(workDir, 'cover.pdf')
+  painter = new_painter(spec, cover)
+  painter.PrintCover(spec.get('title', ''))
+  painter.CloseDocument()
+  back = os.path.join(workDir, 'back.pdf')
+  painter = new_painter(spec, back)
+  painter.OpenDocument()
+  painter.PrintBackCover()
+  return cover, back
+
+def run(spec, workers=None):
+  """Render job spec into spec['output'], return output path
+  """
+  from root_plot.pdf_util import merge_pdf
+  output = spec.get('output', 'out.pdf')
+  layout = spec.get('layout', {})
+  padsPerPage = layout.get('nx', 1) * layout.get('ny', 1)
+  workers = workers or spec.get('workers') or os.cpu_count() or 1
+  items = list_items(spec)
+  shards = split_shards(items, padsPerPage, workers)
+  print(f'[-] INFO - {len(items)} objects, {math.ceil(len(items) / padsPerPage)} pages in {len(shards)} shards')
+  workDir = tempfile.mkdtemp(prefix='root_plot_shards_', dir=os.path.dirname(os.path.abspath(output)))
+  try:
+    shardFiles = [os.path.join(workDir, f'shard_{i}.pdf') for i in range(len(shards))]
+    context = multiprocessing.get_context('spawn') # fresh gPad/gStyle per worker
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(shards))), mp_context=context) as pool:
+      futures = [pool.submit(render_shard, spec, shardFile, first, shardItems)
+        for shardFile, (first, shardItems) in zip(shardFiles, shards)]
+      cover, back = render_covers(spec, workDir)
+      for future in futures:
+        future.result()
+    merge_pdf([cover] + shardFiles + [back], output)
+  finally:
+    shutil.rmtree(workDir, ignore_errors=True)
+  print(f'[-] INFO - Report saved to {output}')
+  return output
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog='root-plot', description='Render ROOT objects into a PDF report from a job spec')
+  parser.add_argument('spec', help='job spec, JSON or YAML')
+  parser.add_argument('-o', '--output', help='output PDF, overrides spec')
+  parser.add_argument('-j', '--workers', type=int, help='worker processes, overrides spec')
+  args = parser.parse_args(argv)
+  spec = load_spec(args.spec)
+  if args.output:
+    spec['output'] = args.output
+  run(spec, args.workers)
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,102 @@
+# Background export of finished canvases to image/document formats
+
+# Basic Usage:
+# pool = ExportPool(workers=4)
+# pool.submit(canvas, 'out/figure', ['pdf', 'png'])
+# ... continue drawing ...
+# pool.close()
+
+# The canvas is serialized once into a spool ROOT file on submit, together
+# with the style to paint it, so the drawing thread can clear and reuse it
+# immediately. Worker processes read the spool file back and write every
+# requested format. The number of
+# pending exports is bounded: submit() waits for the oldest when full.
+
+import os, shutil, tempfile, collections, multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import ROOT
+
+SPOOL_STYLE = 'root_plot_spool_style'
+
+def _init_worker():
+  ROOT.gROOT.SetBatch(True)
+
+def _export_worker(spoolPath, name, figurePath, exts, winSize):
+  """Write spooled pad to figurePath.ext for each ext, return written paths
+  """
+  f = ROOT.TFile.Open(spoolPath)
+  style = f.Get(SPOOL_STYLE)
+  if style:
+    style.cd() # painted with the style of the submitting painter
+  pad = f.Get(name)
+  if pad.InheritsFrom('TCanvas'):
+    canvas = pad
+    canvas.Draw()
+  else: # sub-pad, paint it on a full canvas
+    canvas = ROOT.TCanvas(f'{name}_export', name, *winSize)
+    pad.SetPad(0, 0, 1, 1)
+    pad.Draw()
+  written = []
+  for ext in exts:
+    path = f'{figurePath}.{ext}'
+    if ext == 'root' and canvas is pad:
+      shutil.copyfile(spoolPath, path) # same as TCanvas::SaveAs
+    else:
+      canvas.SaveAs(path)
+    written.append(path)
+  f.Close()
+  os.remove(spoolPath)
+  return written
+
+class ExportPool:
+  """Process pool writing canvases to several formats in background
+
+  workers - number of worker processes
+  maxQueue - max. pending exports (spool files), default 2 * workers
+  """
+  def __init__(self, workers=2, maxQueue=None, spoolDir=None, mpContext=None):
+    context = multiprocessing.get_context(mpContext) if mpContext else None
+    self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker)
+    self.maxQueue = maxQueue or 2 * workers
+    self.spoolDir = spoolDir or tempfile.mkdtemp(prefix='root_plot_export_')
+    os.makedirs(self.spoolDir, exist_ok=True)
+    self.pending = collections.deque()
+    self.counterSubmitted = 0
+    self.written = []
+    self.failed = []
+  def submit(self, pad, figurePath, exts, style=None):
+    """Serialize pad (TCanvas or sub-pad) now, write figurePath.ext later
+    style - TStyle to paint with, default current gStyle
+    """
+    while len(self.pending) >= self.maxQueue:
+      self._wait_oldest()
+    spoolPath = os.path.join(self.spoolDir, f'export_{self.counterSubmitted}.root')
+    self.counterSubmitted += 1
+    with ROOT.TDirectory.TContext(): # keep gDirectory
+      spool = ROOT.TFile(spoolPath, 'RECREATE')
+      pad.Write(pad.GetName())
+      spool.WriteTObject(style or ROOT.gStyle, SPOOL_STYLE)
+      spool.Close()
+    winSize = (int(pad.GetWw() * pad.GetAbsWNDC()), int(pad.GetWh() * pad.GetAbsHNDC()))
+    future = self.pool.submit(_export_worker, spoolPath, pad.GetName(), figurePath, list(exts), winSize)
+    self.pending.append((figurePath, future))
+    return future
+  def _wait_oldest(self):
+    figurePath, future = self.pending.popleft()
+    try:
+      self.written += future.result()
+    except Exception as e:
+      print(f'[X] Warning  - Export FAILED for {figurePath} : {e}')
+      self.failed.append(figurePath)
+  def flush(self):
+    """Wait until all submitted exports are written
+    """
+    while self.pending:
+      self._wait_oldest()
+  def close(self):
+    if self.pool is None: return
+    self.flush()
+    self.pool.shutdown(wait=True)
+    self.pool = None
+    shutil.rmtree(self.spoolDir, ignore_errors=True)
@@ -0,0 +1,93 @@
+# Lazy iteration over objects in ROOT files
+
+# Basic Usage:
+# for path, obj in walk_file('output.root', include=['QA/*'], classes=['TH1']):
+#   ...
+
+# Keys are walked recursively through TDirectories, filtered by path and
+# class before reading, and objects are read one at a time. Returned
+# objects are detached from the file and owned by Python, so they are
+# deleted once the last reference is dropped.
+
+import fnmatch
+
+import ROOT
+
+def match_path(path, include=None, exclude=None):
+  """Glob filter on object path, e.g. 'QA/tracks/hPt'
+  """
+  if include and not any(fnmatch.fnmatchcase(path, pattern) for pattern in include):
+    return False
+  if exclude and any(fnmatch.fnmatchcase(path, pattern) for pattern in exclude):
+    return False
+  return True
+
+def key_inherits(key, classes):
+  if not classes: return True
+  cl = ROOT.TClass.GetClass(key.GetClassName())
+  return bool(cl) and any(cl.InheritsFrom(name) for name in classes)
+
+def detach(obj):
+  """Remove obj from its directory and give ownership to Python
+  Return None for a null obj (e.g. TDirectory::Get of a missing path)
+  """
+  if not obj:
+    return None
+  if obj.InheritsFrom('TH1'):
+    obj.SetDirectory(ROOT.nullptr)
+  ROOT.SetOwnership(obj, True)
+  return obj
+
+def walk_keys(tdir, include=None, exclude=None, classes=None, prefix=''):
+  """Generator of (path, TKey) in TDirectory and sub-directories, no object read
+  Only the highest cycle of each key is kept
+  """
+  seen = set()
+  for key in tdir.GetListOfKeys():
+    name = key.GetName()
+    if name in seen: continue # lower cycle
+    seen.add(name)
+    path = f'{prefix}{name}'
+    cl = ROOT.TClass.GetClass(key.GetClassName())
+    if cl and cl.InheritsFrom('TDirectory'):
+      yield from walk_keys(tdir.GetDirectory(name), include, exclude, classes, path + '/')
+      continue
+    if not key_inherits(key, classes) or not match_path(path, include, exclude):
+      continue
+    yield path, key
+
+def walk_dir(tdir, include=None, exclude=None, classes=None, prefix=''):
+  """Generator of (path, obj) in TDirectory and sub-directories
+  """
+  for path, key in walk_keys(tdir, include, exclude, classes, prefix):
+    obj = key.ReadObj()
+    if not obj: continue
+    yield path, detach(obj)
+
+def open_file(source):
+  tfile = ROOT.TFile.Open(source, 'READ') if isinstance(source, str) else source
+  if not tfile or tfile.IsZombie():
+    raise OSError(f'Cannot open ROOT file : {source}')
+  return tfile
+
+def list_file(source, include=None, exclude=None, classes=None):
+  """List of (path, class name) in ROOT file, without reading objects
+  """
+  tfile = open_file(source)
+  try:
+    return [(path, key.GetClassName()) for path, key in walk_keys(tfile, include, exclude, classes)]
+  finally:
+    if tfile is not source:
+      tfile.Close()
+
+def walk_file(source, include=None, exclude=None, classes=None):
+  """Generator of (path, obj) in ROOT file (path or TFile)
+  include/exclude - glob patterns on object path
+  classes - base class names, e.g. ['TH1', 'TGraph']
+  """
+  tfile = open_file(source)
+  try:
+    yield from walk_dir(tfile, include, exclude, classes)
+  finally:
+    if tfile is not source:
+      tfile.Close()
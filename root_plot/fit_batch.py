@@ -0,0 +1,135 @@
+# Batch fitting of many histograms in a process pool
+
+# Basic Usage:
+# records = fit_many(hists, model='gaus', workers=32)
+# for hist, record in zip(hists, records):
+#   p.DrawHist(hist, fitResult=record)
+
+# Histograms are shipped to workers as plain arrays, fitted there without
+# drawing, and returned as FitRecord in input order.
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import ROOT
+from root_plot.array_util import hist_to_arrays, arrays_to_hist
+from root_plot.fit_util import FitRecord, gaus_seed, fit_gaus, langau_seed, fit_langau, DEFAULT_FIT_STRATEGY
+from root_plot.fit_util import load_langaufun, langaus_compiled
+
+FIT_MODELS = ('gaus', 'langau')
+
+def fit_seed(hist, model='gaus', **kwargs):
+  """Fit range and seed values, which together with the histogram
+  fully determine the fit (also used as cache key)
+  Return (fitRange, seed), seed None if no fit possible
+  """
+  if model == 'gaus':
+    seed = gaus_seed(hist, kwargs.get('gausFitRange', 1))
+    return (seed['fitRange'] if seed else None), seed
+  elif model == 'langau':
+    fitRange, pars = langau_seed(hist, kwargs.get('fitRange'))
+    return fitRange, {'pars': pars}
+  raise ValueError(f'Unknown fit model : {model}, expected one of {FIT_MODELS}')
+
+def cache_config(fitRange, seed, model='gaus', **kwargs):
+  """Fit configuration hashed into the cache key: range, seed, FitStrategy
+  and for langau the compiled function
+  """
+  config = {'fitRange': list(fitRange) if fitRange is not None else None, 'seed': seed,
+    'strategy': (kwargs.get('fitStrategy') or DEFAULT_FIT_STRATEGY).key()}
+  if model == 'langau':
+    config['compileLangau'] = bool(kwargs.get('compileLangau', False))
+  return config
+
+def fit_hist(hist, model='gaus', cache=None, **kwargs):
+  """Fit one histogram without drawing, return FitRecord
+
+  cache - FitCache, stored record returned without fitting,
+    only converged fits (status 0) are stored
+  Options:
+    gaus - gausFitRange (ratio of FWHM)
+    langau - fitRange, compileLangau
+    both - fitStrategy (FitStrategy, default DEFAULT_FIT_STRATEGY)
+  """
+  name = hist.GetName()
+  fitRange, seed = fit_seed(hist, model, **kwargs)
+  if seed is None:
+    return FitRecord(name, model, info={'error': 'FWHM too narrow'})
+  if cache is not None:
+    key = cache.key(hist, model, cache_config(fitRange, seed, model, **kwargs))
+    record = cache.get(key)
+    if record is not None:
+      record.name = name
+      return record
+  record = _fit_seeded(hist, model, fitRange, seed, kwargs.get('compileLangau', False), kwargs.get('fitStrategy'))
+  if cache is not None and record.status == 0:
+    cache.put(key, record)
+  return record
+
+def _fit_seeded(hist, model, fitRange, seed, compileLangau=False, strategy=None):
+  name = hist.GetName()
+  if model == 'gaus':
+    info = seed
+    fit = fit_gaus(hist, seed, f'fcnFitGaus_{name}', strategy)
+  else:
+    info = {}
+    fit = fit_langau(hist, fitRange, seed['pars'], f'fitLangaus_{name}', compileLangau, strategy)
+  if fit is None:
+    return FitRecord(name, model, fitRange=fitRange, info=info)
+  fcn, result, ncalls = fit
+  return FitRecord.from_result(name, model, result, fitRange, info, ncalls)
+
+def _init_worker():
+  ROOT.gROOT.SetBatch(True)
+  ROOT.TH1.AddDirectory(False)
+
+def _fit_arrays(task):
+  data, model, kwargs = task
+  return fit_hist(arrays_to_hist(data), model, **kwargs)
+
+def fit_many(hists, model='gaus', workers=None, chunksize=None, mpContext=None, cache=None, **kwargs):
+  """Fit histograms in a process pool, return list of FitRecord
+
+  workers - number of processes, default os.cpu_count(), 1 for serial
+  mpContext - multiprocessing start method, e.g. 'spawn' (default of platform)
+  cache - FitCache, looked up in this process, only misses are fitted,
+    converged results stored
+  kwargs - fit options, see fit_hist
+  """
+  if model not in FIT_MODELS:
+    raise ValueError(f'Unknown fit model : {model}, expected one of {FIT_MODELS}')
+  hists = list(hists)
+  records = [None] * len(hists)
+  keys = [None] * len(hists)
+  if cache is not None:
+    for i, hist in enumerate(hists):
+      fitRange, seed = fit_seed(hist, model, **kwargs)
+      if seed is None: continue # no fit, let fit_hist report it
+      keys[i] = cache.key(hist, model, cache_config(fitRange, seed, model, **kwargs))
+      records[i] = cache.get(keys[i])
+      if records[i] is not None:
+        records[i].name = hist.GetName()
+  todo = [i for i, record in enumerate(records) if record is None]
+  if workers is None:
+    workers = os.cpu_count() or 1
+  workers = min(workers, len(todo))
+  if workers <= 1:
+    results = [fit_hist(hists[i], model, **kwargs) for i in todo]
+  else:
+    if model == 'langau' and kwargs.get('compileLangau'):
+      # ACLiC build once here, workers only load the library: concurrent
+      # builds on a cold cache race on the same files. JIT if not built.
+      load_langaufun(precompile=True)
+      kwargs = dict(kwargs, compileLangau=langaus_compiled())
+    tasks = [(hist_to_arrays(hists[i]), model, kwargs) for i in todo]
+    if chunksize is None:
+      chunksize = max(1, len(tasks) // (4 * workers))
+    context = multiprocessing.get_context(mpContext) if mpContext else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+      results = list(pool.map(_fit_arrays, tasks, chunksize=chunksize))
+  for i, record in zip(todo, results):
+    records[i] = record
+    if keys[i] is not None and record.status == 0: # failed fits are retried next time
+      cache.put(keys[i], record)
+  return records
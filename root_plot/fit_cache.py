@@ -0,0 +1,73 @@
+# Persistent cache of fit results
+
+# Basic Usage:
+# cache = FitCache('out/fit_cache.sqlite')
+# record = fit_hist(hist, 'gaus', cache=cache)
+# print(cache.stats())
+
+# Key is a digest of bin contents, errors, binning, fit model and
+# configuration (range, seeds, limits). A hit returns the stored FitRecord
+# without running Minuit. Least recently used entries are evicted
+# beyond maxEntries.
+
+import os, json, time, hashlib, sqlite3
+import numpy as np
+
+from root_plot.array_util import hist_content, hist_sumw2, axis_edges
+from root_plot.fit_util import FitRecord
+
+FIT_CACHE_VERSION = 3 # bump when fitting code changes results
+
+class FitCache:
+  """SQLite cache of FitRecord, size-bounded LRU with hit/miss counters
+  """
+  def __init__(self, path='fit_cache.sqlite', maxEntries=100000):
+    self.path = path
+    self.maxEntries = maxEntries
+    self.hits = 0
+    self.misses = 0
+    cacheDir = os.path.dirname(path)
+    if cacheDir: os.makedirs(cacheDir, exist_ok=True)
+    self.db = sqlite3.connect(path)
+    self.db.execute('CREATE TABLE IF NOT EXISTS fits (key TEXT PRIMARY KEY, record TEXT, used REAL)')
+    self.db.execute('CREATE INDEX IF NOT EXISTS fits_used ON fits (used)')
+    self.db.commit()
+  def __len__(self):
+    return self.db.execute('SELECT COUNT(*) FROM fits').fetchone()[0]
+  def key(self, hist, model, config):
+    """Digest of histogram content, errors, binning and fit configuration
+    """
+    digest = hashlib.sha1(f'v{FIT_CACHE_VERSION}:{model}:'.encode())
+    for axis in [hist.GetXaxis(), hist.GetYaxis(), hist.GetZaxis()][:hist.GetDimension()]:
+      digest.update(axis_edges(axis).tobytes())
+      digest.update(f'{axis.GetFirst()}:{axis.GetLast()}'.encode()) # axis range
+    digest.update(np.ascontiguousarray(hist_content(hist), dtype=np.float64).tobytes())
+    sumw2 = hist_sumw2(hist, create=False)
+    digest.update(b'-' if sumw2 is None else np.ascontiguousarray(sumw2).tobytes())
+    digest.update(json.dumps(config, sort_keys=True, default=float).encode())
+    return digest.hexdigest()
+  def get(self, key):
+    """FitRecord for key, or None
+    """
+    row = self.db.execute('SELECT record FROM fits WHERE key = ?', (key,)).fetchone()
+    if row is None:
+      self.misses += 1
+      return None
+    self.hits += 1
+    self.db.execute('UPDATE fits SET used = ? WHERE key = ?', (time.time(), key))
+    self.db.commit()
+    return FitRecord.from_dict(json.loads(row[0]), cached=True)
+  def put(self, key, record):
+    self.db.execute('INSERT OR REPLACE INTO fits VALUES (?, ?, ?)',
+      (key, json.dumps(record.to_dict(), default=float), time.time()))
+    nover = len(self) - self.maxEntries
+    if nover > 0:
+      self.db.execute('DELETE FROM fits WHERE key IN (SELECT key FROM fits ORDER BY used ASC LIMIT ?)', (nover,))
+    self.db.commit()
+  def clear(self):
+    self.db.execute('DELETE FROM fits')
+    self.db.commit()
+  def stats(self):
+    return {'hits': self.hits, 'misses': self.misses, 'entries': len(self), 'path': self.path}
+  def close(self):
+    self.db.close()
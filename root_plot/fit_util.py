@@ -1,9 +1,21 @@
+import ROOT
 from ROOT import TMath
+import numpy as np
+from array import array
+import os
+import ctypes
+from root_plot.array_util import hist_content, hist_errors, axis_centers, axis_widths, hist_key
+
+# Compiled Landau-Gaussian, shipped as package data
+LANGAUS_MACRO = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'langaus.C')
+LANGAUS_LIBRARY = 'root_plot_langaus'
+_LANGAUFUN = None
+_LANGAUS_COMPILED = False
 
 # Functions
 def fcn_moyal(x : list, par : list):
   """Moyal Distribution
-  Approximation for Landau distribution
+  Approximation for Landau distribution, native version native_tf1('moyal', ...)
   Reference:
 
   Parameter
@@ -16,7 +28,56 @@ def fcn_moyal(x : list, par : list):
   invsq2pi = 0.3989422804014
   expPseudo = -0.5 * (TMath.Exp(-t) + t)
   return invsq2pi / sigma * (TMath.Exp( expPseudo ))
-  
+
+# Native closed-form models, compiled by cling once per process
+# TF1 of these formulas are evaluated in C++, without Python callbacks
+NATIVE_CODE = r"""
+namespace root_plot {
+  inline double moyal(double x, double mean, double sigma) {
+    const double t = (x - mean) / sigma;
+    return 0.3989422804014 / sigma * std::exp(-0.5 * (std::exp(-t) + t));
+  }
+}
+"""
+NATIVE_MODELS = {
+  # name : (formula, parameter names)
+  'moyal': ('root_plot::moyal(x, [0], [1])', ('Mean', 'Sigma')), # as fcn_moyal
+  'moyal_area': ('[2] * root_plot::moyal(x, [0], [1])', ('Mean', 'Sigma', 'Area')), # Area with bin width, as langaufun
+}
+_NATIVE_DECLARED = False
+_NATIVE_TF1 = {}
+
+def declare_native():
+  """Declare NATIVE_CODE once per process, return True if available
+  """
+  global _NATIVE_DECLARED
+  if not _NATIVE_DECLARED:
+    _NATIVE_DECLARED = hasattr(ROOT, 'root_plot') or bool(ROOT.gInterpreter.Declare(NATIVE_CODE))
+    if not _NATIVE_DECLARED:
+      print('[X] Warning  - Fail to declare native fit models')
+  return _NATIVE_DECLARED
+
+def native_tf1(model, fcnName, xmin, xmax):
+  """TF1 of NATIVE_MODELS, copied from a per-process prototype
+  (formula compiled once), e.g. native_tf1('moyal', 'fcnMoyal', 0, 10)
+  """
+  if model not in NATIVE_MODELS:
+    raise ValueError(f'Unknown native model : {model}, expected one of {tuple(NATIVE_MODELS)}')
+  if not declare_native():
+    return None
+  proto = _NATIVE_TF1.get(model)
+  if proto is None:
+    formula, parNames = NATIVE_MODELS[model]
+    proto = ROOT.TF1(f'root_plot_{model}', formula, 0., 1.)
+    for i, parName in enumerate(parNames):
+      proto.SetParName(i, parName)
+    ROOT.SetOwnership(proto, False) # kept for the process
+    _NATIVE_TF1[model] = proto
+  fcn = ROOT.TF1(proto)
+  fcn.SetName(fcnName)
+  fcn.SetRange(xmin, xmax)
+  return fcn
+
 def fcn_langaus(x : list, par : list):
   """Convoluted Landau and Gaussian Fitting Function
 
@@ -50,3 +111,526 @@ def fcn_langaus(x : list, par : list):
     fland = TMath.Landau(xx, mpc, par[0]) / par[0]
     sum += fland * TMath.Gaus(x[0], xx, par[3])
   return float(par[2] * step * sum * invsq2pi / par[3])
+
+def langaus_build_dir():
+  """Cache directory for the precompiled langaus library
+  Set by $ROOT_PLOT_CACHE, default ~/.cache/root_plot
+  """
+  cacheDir = os.environ.get('ROOT_PLOT_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'root_plot'))
+  os.makedirs(cacheDir, exist_ok=True)
+  return cacheDir
+
+def load_langaufun(precompile=False, buildDir=None):
+  """Compiled langaufun from langaus.C, declared once per process
+
+  precompile - build shared library by ACLiC into buildDir, reused by
+    later runs without cling JIT (rebuilt only if langaus.C changed)
+  Return ROOT.langaufun, or None if not available
+  """
+  global _LANGAUFUN, _LANGAUS_COMPILED
+  if _LANGAUFUN is not None:
+    return _LANGAUFUN
+  if hasattr(ROOT, 'langaufun'): # declared by user
+    _LANGAUFUN = ROOT.langaufun
+    return _LANGAUFUN
+  if not os.path.exists(LANGAUS_MACRO):
+    print(f'[X] Warning  - Macro not found : {LANGAUS_MACRO}')
+    return None
+  loaded = False
+  if precompile:
+    if buildDir is None: buildDir = langaus_build_dir()
+    loaded = ROOT.gSystem.CompileMacro(LANGAUS_MACRO, 'kO', LANGAUS_LIBRARY, buildDir) == 1
+    _LANGAUS_COMPILED = loaded
+    if not loaded:
+      print(f'[X] Warning  - Fail to compile {LANGAUS_MACRO} in {buildDir}, use JIT instead')
+  if not loaded:
+    loaded = ROOT.gInterpreter.Declare(f'#include "{LANGAUS_MACRO}"')
+  if not loaded:
+    print(f'[X] Warning  - Fail to declare langaufun from {LANGAUS_MACRO}')
+    return None
+  _LANGAUFUN = ROOT.langaufun
+  return _LANGAUFUN
+
+def langaus_compiled():
+  """True if langaufun of this process is the ACLiC library
+  """
+  return _LANGAUS_COMPILED
+
+# Vectorized functions (NumPy)
+  # Coefficients of CERNLIB DENLAN, as used by TMath::Landau
+_LANDAU_P1 = (0.4259894875, -0.1249762550, 0.03984243700, -0.006298287635, 0.001511162253)
+_LANDAU_Q1 = (1.0, -0.3388260629, 0.09594393323, -0.01608042283, 0.003778942063)
+_LANDAU_P2 = (0.1788541609, 0.1173957403, 0.01488850518, -0.001394989411, 0.0001283617211)
+_LANDAU_Q2 = (1.0, 0.7428795082, 0.3153932961, 0.06694219548, 0.008790609714)
+_LANDAU_P3 = (0.1788544503, 0.09359161662, 0.006325387654, 0.00006611667319, -0.000002031049101)
+_LANDAU_Q3 = (1.0, 0.6097809921, 0.2560616665, 0.04746722384, 0.006957301675)
+_LANDAU_P4 = (0.9874054407, 118.6723273, 849.2794360, -743.7792444, 427.0262186)
+_LANDAU_Q4 = (1.0, 106.8615961, 337.6496214, 2016.712389, 1597.063511)
+_LANDAU_P5 = (1.003675074, 167.5702434, 4789.711289, 21217.86767, -22324.94910)
+_LANDAU_Q5 = (1.0, 156.9424537, 3745.310488, 9834.698876, 66924.28357)
+_LANDAU_P6 = (1.000827619, 664.9143136, 62972.92665, 475554.6998, -5743609.109)
+_LANDAU_Q6 = (1.0, 651.4101098, 56974.73333, 165917.4725, -2815759.939)
+_LANDAU_A1 = (0.04166666667, -0.01996527778, 0.02709538966)
+_LANDAU_A2 = (-1.845568670, -4.284640743)
+
+def _poly4(c, u):
+  return c[0] + (c[1] + (c[2] + (c[3] + c[4] * u) * u) * u) * u
+
+def landau_array(x, mpv=0., sigma=1.):
+  """Landau density for an array of x, same as TMath.Landau(x, mpv, sigma)
+  """
+  v = (np.asarray(x, dtype=np.float64) - mpv) / sigma
+  out = np.zeros_like(v)
+  if sigma <= 0:
+    return out
+    # v < -5.5
+  sel = v < -5.5
+  u = np.exp(v[sel] + 1.0)
+  with np.errstate(divide='ignore', over='ignore'):
+    val = 0.3989422803 * (np.exp(-1 / u) / np.sqrt(u)) * (1 + (_LANDAU_A1[0] + (_LANDAU_A1[1] + _LANDAU_A1[2] * u) * u) * u)
+  out[sel] = np.where(u < 1e-10, 0., val)
+    # -5.5 <= v < -1
+  sel = (v >= -5.5) & (v < -1)
+  w = v[sel]
+  u = np.exp(-w - 1)
+  out[sel] = np.exp(-u) * np.sqrt(u) * _poly4(_LANDAU_P1, w) / _poly4(_LANDAU_Q1, w)
+    # -1 <= v < 5
+  sel = (v >= -1) & (v < 1)
+  out[sel] = _poly4(_LANDAU_P2, v[sel]) / _poly4(_LANDAU_Q2, v[sel])
+  sel = (v >= 1) & (v < 5)
+  out[sel] = _poly4(_LANDAU_P3, v[sel]) / _poly4(_LANDAU_Q3, v[sel])
+    # Tail, v >= 5
+  for vmin, vmax, p, q in [(5, 12, _LANDAU_P4, _LANDAU_Q4), (12, 50, _LANDAU_P5, _LANDAU_Q5), (50, 300, _LANDAU_P6, _LANDAU_Q6)]:
+    sel = (v >= vmin) & (v < vmax)
+    u = 1 / v[sel]
+    out[sel] = u * u * _poly4(p, u) / _poly4(q, u)
+  sel = v >= 300
+  u = 1 / (v[sel] - v[sel] * np.log(v[sel]) / (v[sel] + 1))
+  out[sel] = u * u * (1 + (_LANDAU_A2[0] + _LANDAU_A2[1] * u) * u)
+  return out
+
+def langaus_array(x, par):
+  """Vectorized fcn_langaus for an array of x
+
+  Evaluates the same 100-step convolution sum as fcn_langaus,
+  for all x points in one NumPy call.
+  """
+  invsq2pi = 0.3989422804014  # (2 pi)^(-1/2)
+  mpshift  = -0.22278298   # Landau maximum location
+  np_steps = 100 # number of convolution steps
+  sc =   5.0 # convolution extends to +-sc Gaussian sigmas
+  width, mp, area, gsigma = [float(par[i]) for i in range(4)]
+  x = np.asarray(x, dtype=np.float64)
+  mpc = mp - mpshift * width
+  step = 2. * sc * gsigma / np_steps
+    # Convolution nodes xx = x + offset, symmetric around x
+  half = (np.arange(1, np_steps // 2 + 1) - 0.5) * step
+  offset = np.concatenate([half - sc * gsigma, sc * gsigma - half])
+  xx = x[..., np.newaxis] + offset
+  fland = landau_array(xx, mpc, width) / width
+  gaus = np.exp(-0.5 * (offset / gsigma) ** 2)
+  return area * step * (fland @ gaus) * invsq2pi / gsigma
+
+def fcn_langaus_vec(x : list, par : list):
+  """TF1-compatible wrapper of langaus_array for a single point
+  """
+  return float(langaus_array(x[0], par))
+
+def hist_fit_arrays(hist, xmin, xmax):
+  """Bin centers, contents and errors of TH1 within [xmin, xmax]
+  Bins with zero error are skipped, as in ROOT chi2 fit
+  """
+  x = axis_centers(hist.GetXaxis())
+  y = hist_content(hist, flow=False).astype(np.float64)
+  err = hist_errors(hist, flow=False)
+  sel = (err > 0) & (x >= xmin) & (x <= xmax)
+  return x[sel], y[sel], err[sel]
+
+def fit_langaus_vec(hist, fitRange, startvals, parlimitslo, parlimitshi, strategy=None):
+  """Chi2 fit of Landau-Gaussian by vectorized FCN
+
+  Each Minuit call evaluates langaus_array on all bins at once,
+  instead of one Python callback per bin as with TF1(fcn_langaus).
+  strategy - FitStrategy, default DEFAULT_FIT_STRATEGY
+  Next attempt only if status is not 0, last converged result is returned
+  Return (ROOT.Fit.FitResult, number of FCN calls), result None if failed
+  """
+  x, y, err = hist_fit_arrays(hist, fitRange[0], fitRange[1])
+  N_PARS = 4
+  if len(x) <= N_PARS:
+    return None, 0
+  ncalls = [0]
+  def chi2(par):
+    ncalls[0] += 1
+    return float(np.sum(((y - langaus_array(x, par)) / err) ** 2))
+  fcn = ROOT.Math.Functor(chi2, N_PARS)
+  result = None
+  for config in (strategy or DEFAULT_FIT_STRATEGY).attempts():
+    fitter = ROOT.Fit.Fitter()
+    config.configure(fitter.Config())
+    fitter.Config().SetParamsSettings(N_PARS, array('d', startvals))
+    for i, name in enumerate(["Width","MP","Area","GSigma"]):
+      parSettings = fitter.Config().ParSettings(i)
+      parSettings.SetName(name)
+      parSettings.SetLimits(parlimitslo[i], parlimitshi[i])
+    if fitter.FitFCN(fcn, array('d', startvals), len(x), True):
+      result = ROOT.Fit.FitResult(fitter.Result()) # copy, fitter owns its result
+      if result.Status() == 0:
+        break
+  return result, ncalls[0]
+
+# Fitting
+class FitRecord:
+  """Plain fit result, picklable and free of ROOT objects
+
+  Accessors follow TFitResult: GetParams, Parameter, ParError, Chi2, Ndf, Status, NCalls.
+  info - seed values for annotation, e.g. rms & fwhm
+  ncalls - FCN calls of all attempts, including failed ones
+  cached - True if read from a FitCache (not stored), no FCN calls spent
+  """
+  def __init__(self, name, model, params=(), errors=(), chi2=0., ndf=0, status=-1, fitRange=None, info=None, ncalls=0, cached=False):
+    self.name = name
+    self.model = model
+    self.params = list(params)
+    self.errors = list(errors)
+    self.chi2 = chi2
+    self.ndf = ndf
+    self.status = status
+    self.fitRange = list(fitRange) if fitRange is not None else None
+    self.info = dict(info) if info else {}
+    self.ncalls = ncalls
+    self.cached = cached
+  def __repr__(self):
+    return f'FitRecord({self.name!r}, {self.model!r}, status={self.status}, ncalls={self.ncalls}, params={self.params})'
+  def GetParams(self):
+    return self.params
+  def GetErrors(self):
+    return self.errors
+  def Parameter(self, i):
+    return self.params[i]
+  def ParError(self, i):
+    return self.errors[i]
+  def Chi2(self):
+    return self.chi2
+  def Ndf(self):
+    return self.ndf
+  def Status(self):
+    return self.status
+  def NCalls(self):
+    return self.ncalls
+  def IsValid(self):
+    return self.status == 0 and len(self.params) > 0
+  def to_dict(self):
+    d = dict(vars(self))
+    del d['cached']
+    return d
+  @classmethod
+  def from_dict(cls, d, cached=False):
+    return cls(**d, cached=cached)
+  @classmethod
+  def from_result(cls, name, model, result, fitRange=None, info=None, ncalls=None):
+    """Copy values from TFitResult / ROOT.Fit.FitResult
+    ncalls - FCN calls, default result.NCalls()
+    """
+    npar = result.NPar()
+    return cls(name, model,
+      params=[result.Parameter(i) for i in range(npar)],
+      errors=[result.ParError(i) for i in range(npar)],
+      chi2=result.Chi2(), ndf=result.Ndf(), status=result.Status(),
+      fitRange=fitRange, info=info,
+      ncalls=result.NCalls() if ncalls is None else ncalls)
+
+class FitStrategy:
+  """Minimizer configuration of a fit, with fallback on failure
+
+  minimizer, algorithm - as ROOT.Math.MinimizerOptions, e.g. 'Minuit2', 'Migrad'
+  strategy - Minuit strategy, 0 (fewer calls), 1 (default) or 2 (careful)
+  tolerance - EDM tolerance, ROOT default 0.01
+  maxCalls - FCN call budget per attempt, 0 for minimizer default
+  fallback - FitStrategy tried when the fit fails, or None
+  """
+  def __init__(self, minimizer='Minuit2', algorithm='Migrad', strategy=1, tolerance=0.01, maxCalls=0, fallback=None):
+    self.minimizer = minimizer
+    self.algorithm = algorithm
+    self.strategy = strategy
+    self.tolerance = tolerance
+    self.maxCalls = maxCalls
+    self.fallback = fallback
+  def __repr__(self):
+    return f'FitStrategy({self.minimizer}/{self.algorithm}, strategy={self.strategy}, tolerance={self.tolerance}, fallback={self.fallback})'
+  def attempts(self):
+    config = self
+    while config is not None:
+      yield config
+      config = config.fallback
+  def key(self):
+    """Plain list of all attempts, for cache keys
+    """
+    return [[c.minimizer, c.algorithm, c.strategy, c.tolerance, c.maxCalls] for c in self.attempts()]
+  def configure(self, fitConfig):
+    """Apply to ROOT.Fit.FitConfig of a ROOT.Fit.Fitter
+    """
+    fitConfig.SetMinimizer(self.minimizer, self.algorithm)
+    options = fitConfig.MinimizerOptions()
+    options.SetStrategy(self.strategy)
+    options.SetTolerance(self.tolerance)
+    if self.maxCalls:
+      options.SetMaxFunctionCalls(self.maxCalls)
+    fitConfig.SetParabErrors(True)
+
+# Minuit2 with the default strategy, careful strategy with looser tolerance on failure
+DEFAULT_FIT_STRATEGY = FitStrategy('Minuit2', 'Migrad', 1, 0.01,
+  fallback=FitStrategy('Minuit2', 'Migrad', 2, 0.1))
+
+def fit_hist_tf1(hist, fcn, strategy=None):
+  """Chi2 fit of TF1 to hist, as TH1::Fit(fcn, 'RBSQN'): TF1 range, TF1
+  parameter limits (fixed if equal), empty bins skipped
+  The minimizer is set per fit by the FitStrategy attempts on the FitConfig,
+  process-wide MinimizerOptions defaults are not touched.
+  Next attempt only if status is not 0, last valid result is returned
+  and copied to the TF1
+  Return (ROOT.Fit.FitResult, total FCN calls), result None if no valid result
+  """
+  data = ROOT.Fit.BinData(ROOT.Fit.DataOptions(), ROOT.Fit.DataRange(fcn.GetXmin(), fcn.GetXmax()))
+  ROOT.Fit.FillData(data, hist)
+  if data.Size() == 0:
+    return None, 0
+  model = ROOT.Math.WrappedMultiTF1(fcn, 1)
+  ncalls = 0
+  result = None
+  for config in (strategy or DEFAULT_FIT_STRATEGY).attempts():
+    fitter = ROOT.Fit.Fitter()
+    fitter.SetFunction(model, False)
+    config.configure(fitter.Config())
+    for i in range(fcn.GetNpar()):
+      parSettings = fitter.Config().ParSettings(i)
+      parSettings.SetName(fcn.GetParName(i))
+      parSettings.SetValue(fcn.GetParameter(i))
+      low, high = ctypes.c_double(0.), ctypes.c_double(0.)
+      fcn.GetParLimits(i, low, high)
+      if low.value * high.value != 0 and low.value >= high.value:
+        parSettings.Fix()
+      elif low.value < high.value:
+        parSettings.SetLimits(low.value, high.value)
+    fitter.Fit(data)
+    if fitter.Result().NPar() == 0: # not run
+      continue
+    attempt = ROOT.Fit.FitResult(fitter.Result()) # copy, fitter owns its result
+    ncalls += attempt.NCalls()
+    result = attempt
+    if result.Status() == 0:
+      break
+  if result is not None:
+    fcn.SetFitResult(result)
+  return result, ncalls
+
+PEAK_STATS_CACHE_SIZE = 256
+_PEAK_STATS_CACHE = {}
+
+class PeakStats:
+  """Peak statistics of TH1 in the axis range, from one pass over bin contents
+
+  peak, peakX - maximum content and its bin center
+  halfLeft, halfRight - half-maximum crossings, linear interpolation between bin centers
+  fwhm, center - halfRight - halfLeft and their midpoint
+  integral, integralWidth - sum of contents, and weighted by bin width
+  mean, rms, skewness - binned moments
+  binWidth - width of the first bin in range
+  """
+  def __init__(self, hist):
+    axis = hist.GetXaxis()
+    first, last = axis.GetFirst(), axis.GetLast()
+    content = np.asarray(hist_content(hist, flow=True)[first:last + 1], dtype=np.float64)
+    x = axis_centers(axis)[first - 1:last]
+    width = axis_widths(axis)[first - 1:last]
+    self.name = hist.GetName()
+    self.binWidth = float(width[0]) if len(width) else 0.
+    self.integral = float(content.sum())
+    self.integralWidth = float((content * width).sum())
+    imax = int(content.argmax()) if len(content) else 0
+    self.peak = float(content[imax]) if len(content) else 0.
+    self.peakX = float(x[imax]) if len(x) else 0.
+    if self.integral > 0:
+      self.mean = float((content * x).sum()) / self.integral
+      dx = x - self.mean
+      var = (content * dx**2).sum() / self.integral
+      self.rms = float(np.sqrt(max(var, 0.)))
+      self.skewness = float((content * dx**3).sum()) / self.integral / self.rms**3 if self.rms > 0 else 0.
+    else:
+      self.mean, self.rms, self.skewness = 0., 0., 0.
+    # Half maximum, first/last bin above as FindFirstBinAbove/FindLastBinAbove
+    above = np.flatnonzero(content > self.peak / 2.)
+    if len(above) == 0:
+      self.halfLeft = self.halfRight = self.peakX
+    else:
+      self.halfLeft = self._crossing(x, content, above[0], above[0] - 1)
+      self.halfRight = self._crossing(x, content, above[-1], above[-1] + 1)
+    self.fwhm = self.halfRight - self.halfLeft
+    self.center = 0.5 * (self.halfRight + self.halfLeft)
+  def _crossing(self, x, content, inside, outside):
+    if outside < 0 or outside >= len(content):
+      return float(x[inside])
+    half = self.peak / 2.
+    frac = (content[inside] - half) / (content[inside] - content[outside])
+    return float(x[inside] + frac * (x[outside] - x[inside]))
+  def __repr__(self):
+    return f'PeakStats({self.name}, peak={self.peak:.3g} at {self.peakX:.3g}, fwhm={self.fwhm:.3g}, mean={self.mean:.3g}, rms={self.rms:.3g})'
+
+def _peak_stats_key(hist):
+  axis = hist.GetXaxis()
+  return hist_key(hist) + (axis.GetFirst(), axis.GetLast())
+
+def peak_stats(hist):
+  """Cached PeakStats of hist, recomputed after modification (see
+  array_util.hist_key) or axis range changes
+  """
+  key = _peak_stats_key(hist)
+  stats = _PEAK_STATS_CACHE.get(key)
+  if stats is None:
+    if len(_PEAK_STATS_CACHE) >= PEAK_STATS_CACHE_SIZE:
+      _PEAK_STATS_CACHE.pop(next(iter(_PEAK_STATS_CACHE))) # oldest
+    stats = PeakStats(hist)
+    _PEAK_STATS_CACHE[key] = stats
+  return stats
+
+def clear_peak_stats_cache():
+  _PEAK_STATS_CACHE.clear()
+
+def estimate_fwhm(hist):
+  """Calculate FWHM and center for TH1D
+  """
+  stats = peak_stats(hist)
+  if stats.fwhm < 2 * stats.binWidth:
+    print(f'[X] Warning  - Histogram {hist.GetName()} - FWHM too narrow center = {stats.center:.2e}, fwhm = {stats.fwhm:.2e}, rms = {stats.rms:.2e}, peak = {stats.peak:.2e}')
+    return stats.rms, stats.mean
+  return stats.fwhm, stats.center
+
+def gaus_seed(hist, rangeRatio=1):
+  """Peak position, FWHM and fit range for Gaussian fit around the peak
+  rangeRatio - half fit range as ratio of FWHM, at most 5 RMS
+  Return dict, or None if FWHM too narrow
+  """
+  stats = peak_stats(hist)
+  peak, mean, rms, center, fwhm = stats.peak, stats.mean, stats.rms, stats.center, stats.fwhm
+  if fwhm < 2 * stats.binWidth:
+    print(f'[X] Warning  - FWHM too narrow {center = }, {fwhm = }, {rms = }, {peak = }')
+    return None
+  fitRange = min(5 * rms, rangeRatio * fwhm)
+  return {
+    'peak': peak, 'mean': mean, 'rms': rms, 'center': center, 'fwhm': fwhm,
+    'fitRange': [center - fitRange, center + fitRange],
+  }
+
+GAUS_FWHM = 2.3548200 # FWHM / sigma
+LANDAU_FWHM = 4.0186 # FWHM / width
+LANDAU_ASYMMETRY = 0.3213 # (right - left) / FWHM of half maximum around peak
+
+def fit_gaus(hist, seed, fcnName='fcnFitGaus', strategy=None):
+  """Gaussian fit in seed['fitRange'], no drawing
+  Parameters start from seed peak, center and FWHM
+  Return (TF1, ROOT.Fit.FitResult, FCN calls), or None if failed
+  """
+  xmin, xmax = seed['fitRange']
+  fcnGaus = ROOT.TF1(fcnName, 'gaus', xmin, xmax)
+  fcnGaus.SetParameters(seed['peak'], seed['center'], seed['fwhm'] / GAUS_FWHM)
+  # given start values, no automatic initialisation of gaus
+  resultPtr, ncalls = fit_hist_tf1(hist, fcnGaus, strategy)
+  if resultPtr is None:
+    print(f'[X] Warning  - Fitting failed with center = {seed["center"]}, fwhm = {seed["fwhm"]}, rms = {seed["rms"]}, peak = {seed["peak"]}')
+    return None
+  return fcnGaus, resultPtr, ncalls
+
+def langau_seed(hist, fitRange=None):
+  """Fit range and parameters [start, low, high] for Landau-Gaussian fit
+
+  FWHM is split between Landau and Gaussian in quadrature by the asymmetry
+  of the half-maximum crossings around the peak (Landau 0.32, Gaussian 0),
+  Area is the integral of the histogram (bin width included, as langaufun).
+  """
+  fwhm, center = estimate_fwhm(hist)
+  stats = peak_stats(hist)
+  if(not fitRange): fitRange = [0.3*stats.mean, 1.5*stats.mean]
+  mp = stats.peakX
+  if stats.fwhm > 0 and stats.halfLeft <= mp <= stats.halfRight:
+    asymmetry = ((stats.halfRight - mp) - (mp - stats.halfLeft)) / stats.fwhm
+  else:
+    asymmetry = LANDAU_ASYMMETRY / 2
+  landauFrac = min(max(asymmetry / LANDAU_ASYMMETRY, 0.1), 0.9)
+  width = np.sqrt(landauFrac) * fwhm / LANDAU_FWHM
+  gsigma = np.sqrt(1. - landauFrac) * fwhm / GAUS_FWHM
+  area = stats.integralWidth
+  pars = [
+    [width, width * 1e-2, fwhm],
+    [mp, mp - fwhm, mp + fwhm],
+    [area, area * 0.5, area * 2],
+    [gsigma, gsigma * 1e-2, fwhm],
+  ]
+  return list(fitRange), [[float(v) for v in par] for par in pars]
+
+def new_langau_tf1(fcnName, xmin, xmax, precompile=False):
+  """TF1 of compiled langaufun, or of the vectorized Python version
+  """
+    # C macro, faster than python implementation
+  langaufun = load_langaufun(precompile)
+  if langaufun is None:
+    # python internel implementation, vectorized by NumPy
+    langaufun = fcn_langaus_vec
+  fcnfit = ROOT.TF1(fcnName, langaufun, xmin, xmax, 4)
+  fcnfit.SetParNames("Width","MP","Area","GSigma")
+  return fcnfit, langaufun
+
+def fit_langau(hist, fitRange, pars, fcnName='fitLangaus', precompile=False, strategy=None):
+  """Landau-Gaussian fit with parameters [start, low, high], no drawing
+  Return (TF1, fit result, FCN calls), or None if failed
+  """
+  N_PARS = 4
+  fcnfit, langaufun = new_langau_tf1(fcnName, fitRange[0], fitRange[1], precompile)
+  startvals = [par[0] for par in pars]
+  parlimitslo = [par[1] for par in pars]
+  parlimitshi = [par[2] for par in pars]
+  fcnfit.SetParameters(array('d', startvals))
+  for i in range(N_PARS):
+    fcnfit.SetParLimits(i, parlimitslo[i], parlimitshi[i])
+  if langaufun is fcn_langaus_vec:
+    # Whole-histogram chi2 per Minuit call, TF1 only for drawing
+    resultPtr, ncalls = fit_langaus_vec(hist, fitRange, startvals, parlimitslo, parlimitshi, strategy)
+    if resultPtr is not None:
+      fcnfit.SetFitResult(resultPtr)
+  else:
+    resultPtr, ncalls = fit_hist_tf1(hist, fcnfit, strategy)
+  if resultPtr is None:
+    print(f'[X] Warning  - {hist.GetName()} - Langau fitting FAILED after {ncalls} calls')
+    return None
+  return fcnfit, resultPtr, ncalls
+
+def record_tf1(record, fcnName, xmin, xmax):
+  """TF1 with parameters of FitRecord, for drawing
+  """
+  if record.model == 'gaus':
+    fcn = ROOT.TF1(fcnName, 'gaus', xmin, xmax)
+  elif record.model == 'langau':
+    fcn, _ = new_langau_tf1(fcnName, xmin, xmax)
+  else:
+    raise ValueError(f'Unknown fit model : {record.model}')
+  fcn.SetParameters(array('d', record.params))
+  fcn.SetParErrors(array('d', record.errors))
+  fcn.SetChisquare(record.chi2)
+  fcn.SetNDF(record.ndf)
+  return fcn
+
+def check_langaus_vec(pars=(1.0, 10., 1000., 1.5), xmin=0., xmax=40., npoints=200):
+  """Accuracy check of langaus_array against fcn_langaus
+
+  Return max. relative difference, relative to peak value
+  """
+  xs = np.linspace(xmin, xmax, npoints)
+  ref = np.array([fcn_langaus([x], list(pars)) for x in xs])
+  vec = langaus_array(xs, pars)
+  return float(np.max(np.abs(vec - ref)) / np.max(np.abs(ref)))
+
+if __name__ == '__main__':
+  for pars in [(1.0, 10., 1000., 1.5), (0.2, 5., 1., 0.05), (5., 100., 1e5, 20.)]:
+    xmin = pars[1] - 10 * (pars[0] + pars[3])
+    xmax = pars[1] + 40 * (pars[0] + pars[3])
+    print(f'[-] INFO - langaus_array vs. fcn_langaus {pars} : max. rel. diff = {check_langaus_vec(pars, xmin, xmax):.2e}')
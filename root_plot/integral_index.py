@@ -0,0 +1,157 @@
+# Prefix-sum index for repeated window integrals of TH1/TH2
+
+# Basic Usage:
+# index = integral_index(hist)              # built once, cached
+# values, errors = index.integral_x(xlows, xups)  # arrays of windows, O(1) each
+
+# Cumulative sums of contents and squared errors over the global bin
+# buffer (flow bins included) give any bin-range integral as a difference
+# of two entries; for TH2 a summed-area table gives rectangles and
+# projection bands along X in O(nx). Bin ranges follow TH1::Integral and
+# TH2::ProjectionX, including their clamping of out-of-range bins.
+# The cache is keyed by histogram identity, name, number of cells and
+# entries, an O(1) lookup: Fill and SetBinContent change the entries and
+# rebuild the index, while Scale, SetBinError or writes to the array views
+# do not, call clear_integral_index(hist) or index.rebuild(hist) after them.
+# Building the index is O(ncells), so for a single window HistCount without
+# index (TH1::Integral) is faster; use HistCounts/H2ProjectionBands for
+# arrays of windows, or keep the IntegralIndex and pass it explicitly
+# (e.g. HistCount(index=index)) for repeated calls.
+# The index keeps copies of the bin edges, not the axes of the histogram.
+
+import numpy as np
+import ROOT
+from root_plot.array_util import hist_content, hist_sumw2, axis_edges
+
+INTEGRAL_INDEX_CACHE_SIZE = 64
+_INTEGRAL_INDEX_CACHE = {}
+
+def _edges(axis):
+  return axis if isinstance(axis, np.ndarray) else axis_edges(axis)
+
+def axis_bins(axis, x):
+  """Vectorized TAxis::FindBin, 0 underflow, nbins+1 overflow
+  axis - TAxis or its edges
+  """
+  return np.searchsorted(_edges(axis), np.asarray(x, dtype=np.float64), side='right')
+
+def axis_bin_centers(axis, bins):
+  """Vectorized TAxis::GetBinCenter, flow bins extrapolated by mean width
+  axis - TAxis or its edges
+  """
+  edges = _edges(axis)
+  nbins = len(edges) - 1
+  bins = np.asarray(bins)
+  inner = np.clip(bins, 1, nbins)
+  centers = 0.5 * (edges[inner - 1] + edges[inner])
+  width = (edges[-1] - edges[0]) / nbins
+  outer = (bins < 1) | (bins > nbins)
+  return np.where(outer, edges[0] + (bins - 0.5) * width, centers)
+
+def _clamp_range(lo, hi, nbins):
+  """Bin range as TH1::Integral: lo >= 0, hi beyond last or below lo -> overflow
+  """
+  lo = np.maximum(lo, 0)
+  hi = np.where((hi > nbins + 1) | (hi < lo), nbins + 1, hi)
+  return lo, hi
+
+class IntegralIndex:
+  """Cumulative contents and squared errors of TH1 or TH2, flow bins included
+
+  Without stored Sumw2, squared errors are the contents, as TH1::GetBinError.
+  """
+  def __init__(self, hist):
+    self.rebuild(hist)
+  def rebuild(self, hist):
+    """Recompute the sums from hist, after writes not seen by the cache key
+    """
+    self.ndim = hist.GetDimension()
+    if self.ndim > 2:
+      raise TypeError(f'{hist.GetName()} : integral index for {self.ndim}D histogram not supported')
+    self.name = hist.GetName()
+    self.xedges = np.array(axis_edges(hist.GetXaxis()))
+    self.yedges = np.array(axis_edges(hist.GetYaxis())) if self.ndim == 2 else None
+    self.nx = hist.GetNbinsX()
+    self.ny = hist.GetNbinsY() if self.ndim == 2 else 0
+    content = np.asarray(hist_content(hist), dtype=np.float64)
+    sumw2 = hist_sumw2(hist, create=False)
+    sumw2 = content if sumw2 is None else np.asarray(sumw2, dtype=np.float64)
+    self.content = self._prefix(content)
+    self.sumw2 = self._prefix(sumw2)
+    return self
+  def _prefix(self, values):
+    # prefix[i] = sum(values[:i]), summed-area table in 2D
+    shape = tuple(n + 1 for n in values.shape)
+    table = np.zeros(shape)
+    if self.ndim == 1:
+      np.cumsum(values, out=table[1:])
+    else:
+      table[1:, 1:] = values.cumsum(axis=0).cumsum(axis=1)
+    return table
+  def integral(self, lo, hi):
+    """Integrals and errors of 1D bin ranges [lo, hi] (arrays), as IntegralAndError
+    """
+    lo, hi = _clamp_range(np.asarray(lo), np.asarray(hi), self.nx)
+    return (self.content[hi + 1] - self.content[lo],
+      np.sqrt(np.abs(self.sumw2[hi + 1] - self.sumw2[lo])))
+  def integral_2d(self, xlo, xhi, ylo, yhi):
+    """Integrals and errors of 2D bin rectangles (arrays)
+    """
+    xlo, xhi = _clamp_range(np.asarray(xlo), np.asarray(xhi), self.nx)
+    ylo, yhi = _clamp_range(np.asarray(ylo), np.asarray(yhi), self.ny)
+    def rect(table):
+      return table[xhi + 1, yhi + 1] - table[xlo, yhi + 1] - table[xhi + 1, ylo] + table[xlo, ylo]
+    return rect(self.content), np.sqrt(np.abs(rect(self.sumw2)))
+  def window_bins(self, low, up, edges=None):
+    """Bin ranges of windows [low, up] as plot_util.HistCount
+    (upper bin dropped if its center is above up)
+    edges - bin edges, default X edges
+    """
+    edges = self.xedges if edges is None else edges
+    lo, hi = axis_bins(edges, low), axis_bins(edges, up)
+    hi = np.where(axis_bin_centers(edges, hi) > up, hi - 1, hi)
+    return lo, hi
+  def integral_x(self, xlow, xup):
+    """Integrals and errors of 1D windows [xlow, xup] (arrays) as HistCount
+    """
+    return self.integral(*self.window_bins(xlow, xup))
+  def band_x(self, ylo, yhi):
+    """Contents and squared errors of ProjectionX over Y bins [ylo, yhi]
+    Arrays of X bins with flow, O(nx) per band, windows stacked along axis 0
+    """
+    ylo, yhi = np.atleast_1d(ylo), np.atleast_1d(yhi)
+    outside = yhi < ylo # TH2::ProjectionX: all bins with flow
+    ylo = np.where(outside, 0, np.maximum(ylo, 0))
+    yhi = np.where(outside | (yhi > self.ny + 1), self.ny + 1, yhi)
+    def band(table):
+      cumX = table[:, yhi + 1] - table[:, ylo] # sum over Y of X-prefix, per window
+      return np.diff(cumX, axis=0).T
+    return band(self.content), band(self.sumw2)
+
+def _index_key(hist):
+  # O(1), see module notes for the modifications it does not see
+  return (id(hist), hist.GetName(), hist.GetNcells(), hist.GetEntries())
+
+def integral_index(hist):
+  """Cached IntegralIndex of hist, rebuilt when its entries change
+  hist - TH1/TH2, or an IntegralIndex returned as is
+  """
+  if isinstance(hist, IntegralIndex):
+    return hist
+  key = _index_key(hist)
+  index = _INTEGRAL_INDEX_CACHE.get(key)
+  if index is None:
+    if len(_INTEGRAL_INDEX_CACHE) >= INTEGRAL_INDEX_CACHE_SIZE:
+      _INTEGRAL_INDEX_CACHE.pop(next(iter(_INTEGRAL_INDEX_CACHE))) # oldest
+    index = IntegralIndex(hist)
+    _INTEGRAL_INDEX_CACHE[key] = index
+  return index
+
+def clear_integral_index(hist=None):
+  """Drop cached index of hist, or all (invalidate after Scale or array writes)
+  """
+  if hist is None:
+    _INTEGRAL_INDEX_CACHE.clear()
+    return
+  for key in [key for key in _INTEGRAL_INDEX_CACHE if key[0] == id(hist)]:
+    del _INTEGRAL_INDEX_CACHE[key]
@@ -0,0 +1,84 @@
+# Per-page PDF cache for incremental report rebuild
+
+# Basic Usage:
+# p = Painter(printer='report.pdf', incremental=True)
+# ... same as usual ...
+# p.PrintBackCover()  # assemble report.pdf from cached pages
+
+# Each page is fingerprinted from the JSON serialization of the canvas
+# (all drawn objects with their contents, options and attributes) and of
+# gStyle, with the page title. Names of generated objects, which carry a
+# painter-wide counter, are replaced by their order on the page, so that a
+# change on one page does not alter the fingerprints of all later pages.
+# Unchanged pages are reused from the cache, only changed pages are
+# printed. Covers are always re-rendered.
+
+import os, re, glob, hashlib
+
+import ROOT
+from root_plot.pdf_util import merge_pdf
+
+def normalise_names(text, names):
+  """Replace each of names in text by its index in names, also as prefix of
+  derived names (e.g. name_fmt), but not of longer counters (name1)
+  """
+  if not names:
+    return text
+  index = {}
+  for name in names:
+    index.setdefault(name, len(index))
+  pattern = re.compile(r'(?<![\w])(' + '|'.join(re.escape(name) for name in sorted(index, key=len, reverse=True)) + r')(?!\d)')
+  return pattern.sub(lambda m: f'@obj{index[m.group(1)]}', text)
+
+class PageCache:
+  """Single-page PDF files keyed by page fingerprint
+  """
+  def __init__(self, cacheDir):
+    self.cacheDir = cacheDir
+    os.makedirs(cacheDir, exist_ok=True)
+    self.pages = [] # ordered page files of the document
+    self.hits = 0
+    self.misses = 0
+  def fingerprint(self, canvas, title, names=()):
+    """Digest of canvas, gStyle and title
+
+    names - generated object names (as Painter.unique_name), normalised
+    """
+    digest = hashlib.sha1(title.encode())
+    digest.update(normalise_names(str(ROOT.TBufferJSON.ConvertToJSON(canvas)), names).encode())
+    digest.update(str(ROOT.TBufferJSON.ConvertToJSON(ROOT.gStyle)).encode())
+    return digest.hexdigest()
+  def print_page(self, canvas, title, names=()):
+    """Print canvas unless cached, return bytes written
+    """
+    pagePath = os.path.join(self.cacheDir, f'page_{self.fingerprint(canvas, title, names)}.pdf')
+    self.pages.append(pagePath)
+    if os.path.exists(pagePath):
+      self.hits += 1
+      return 0
+    self.misses += 1
+    canvas.Print(pagePath, f'Title:{title}')
+    return os.path.getsize(pagePath)
+  def print_cover(self, canvas, name, title):
+    """Print cover page, always re-rendered
+    """
+    coverPath = os.path.join(self.cacheDir, f'{name}.pdf')
+    canvas.Print(coverPath, f'Title:{title}')
+    return coverPath
+  def assemble(self, output, front=None, back=None):
+    """Merge cover, cached pages and back cover into output
+    """
+    inputs = ([front] if front else []) + self.pages + ([back] if back else [])
+    merge_pdf(inputs, output)
+    return output
+  def prune(self):
+    """Remove cached pages not used by the current document
+    """
+    used = set(self.pages)
+    for pagePath in glob.glob(os.path.join(self.cacheDir, 'page_*.pdf')):
+      if pagePath not in used:
+        os.remove(pagePath)
+  def reset(self):
+    self.pages = []
+    self.hits = 0
+    self.misses = 0
@@ -7,13 +7,40 @@
 # p.PrintBackCover()
 
 import ROOT
+import time
+import itertools
+try:
+  import resource
+except ImportError: # not on Windows
+  resource = None
 from ROOT import TCanvas, TPaveText
 from ROOT import gPad, gStyle
 
 from root_plot.plot_util import *
-from root_plot.fit_util import fcn_langaus
+import numpy as np
+from root_plot.array_util import hist_content, axis_edges, sync_stats
+from root_plot.rebin_util import rebin_1d, rebin_2d, downsample_2d, group_edges, has_bin_labels, copy_draw_attributes
+from root_plot.fit_util import peak_stats, estimate_fwhm, gaus_seed, fit_gaus, langau_seed, fit_langau, record_tf1
+from root_plot import fit_batch
+from root_plot.fit_cache import FitCache
+from root_plot.export_pool import ExportPool
+from root_plot.timing_util import CallStats, timed
+from root_plot.page_cache import PageCache
+from root_plot.root_archive import RootArchive
+from root_plot.file_util import walk_file
+from root_plot.snapshot_cache import SnapshotCache
 
-def NewCanvas(name="c1_painter", title="New Canvas", winX=1600, winY=1000, **kwargs):
+def max_rss():
+  """Peak resident memory of this process in bytes, 0 if unknown
+  """
+  if resource is None: return 0
+  maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return maxrss if sys.platform == 'darwin' else maxrss * 1024 # KB on Linux
+
+_CANVAS_COUNTER = itertools.count(1)
+def NewCanvas(name=None, title="New Canvas", winX=1600, winY=1000, **kwargs):
+  if name is None: # unique, TCanvas of same name would be replaced
+    name = f'c{next(_CANVAS_COUNTER)}_painter'
   return TCanvas(name, title, winX,winY)
 
 
@@ -22,20 +49,40 @@ class Painter:
   Output stored in PDF file
   
   Parameters:
-    Canvas - name, title, winX, winY, nx, ny
+    Canvas - name, title, winX, winY, nx, ny, pageOffset
+    Style - styleContext (StyleContext, default own copy of gStyle), aliceStyle
+      made current (gStyle) at each page and pad: painters may alternate in
+      one thread, concurrent painters in several threads are not supported
+    Output - printAll, printDir, printExt, exportWorkers, exportQueue
+    Archive - saveROOT, archiveCompression, archiveLevel, archivePerPage, archiveBuffered
     Gausssian - gausFitRange
+    Langau - compileLangau
+    Fitting - fitCache, fitStrategy
+    Timing - stats, statsFile (JSON dumped at PrintBackCover)
+    Incremental - incremental, pageCacheDir
+    Level of detail - lodColz (off by default), lodReduce (mean, max, sum), lodBinsPerPixel
+    Snapshot - snapshotDir (DrawFile reads histograms from SnapshotCache)
   """
   def __init__(self, canvas = None, printer = "out.pdf", **kwargs):
     self.canvas = canvas if canvas is not None else NewCanvas(**kwargs)
+    self.pad = self.canvas # current pad, used instead of gPad
+    self.ownStyle = kwargs.get('styleContext') is None # closed with the painter
+    self.styleContext = kwargs.get('styleContext') or StyleContext(f'{self.canvas.GetName()}_style', alice=kwargs.get('aliceStyle', False))
+    self.style = self.styleContext.cd()
        # Output PDF in 1 file
     self.printer = printer if printer.endswith(".pdf") else printer +".pdf"
     self.printAll = kwargs.get('printAll', False)
     self.printDir = kwargs.get('printDir', os.path.dirname(self.printer))
     if(self.printDir == ''): self.printDir = '.'
     self.printExt = kwargs.get('printExt', ['pdf','png'])
+    self.exportWorkers = kwargs.get('exportWorkers', 0) # background export for printAll
+    self.exporter = None
+    if self.printAll and self.exportWorkers > 0:
+      self.exporter = ExportPool(self.exportWorkers, kwargs.get('exportQueue'))
     self.saveROOT = kwargs.get('saveROOT', False)
     if self.saveROOT:
-      self.rootfile = ROOT.TFile(printer.replace('.pdf','.root'), 'RECREATE')
+      self.archive = RootArchive(self.printer.replace('.pdf','.root'), kwargs.get('archiveCompression', 'zstd'),
+        kwargs.get('archiveLevel', 5), kwargs.get('archivePerPage', False), kwargs.get('archiveBuffered', False))
     # Configuration
     self.subPadNX = kwargs.get('nx', 1)
     self.subPadNY = kwargs.get('ny', 1)
@@ -46,41 +93,118 @@ class Painter:
     self.marginRight = kwargs.get('marginRight', 0.02)
     self.showGrid = kwargs.get('showGrid', False)
     self.gridColor = kwargs.get('gridColor', kGray+1)
-    ROOT.gStyle.SetGridColor(self.gridColor)
+    self.style.SetGridColor(self.gridColor)
     self.showPageNo = kwargs.get('showPageNo', False)
+    self.lodColz = kwargs.get('lodColz', False) # downsample TH2 colz to pad resolution
+    self.lodReduce = kwargs.get('lodReduce', 'mean') # 'sum' scales z by the merged block size
+    self.lodBinsPerPixel = kwargs.get('lodBinsPerPixel', 1.)
     # Parameters
     self.GAUS_FIT_RANGE = kwargs['gausFitRange'] if kwargs.get('gausFitRange') else 1 # ratio of FWHM
+    self.compileLangau = kwargs.get('compileLangau', False) # precompile langaus.C by ACLiC
+    self.fitCache = kwargs.get('fitCache') # FitCache, path or True for printDir/fit_cache.sqlite
+    if self.fitCache is True:
+      self.fitCache = FitCache(f'{self.printDir}/fit_cache.sqlite')
+    elif isinstance(self.fitCache, str):
+      self.fitCache = FitCache(self.fitCache)
+    self.fitStrategy = kwargs.get('fitStrategy') # FitStrategy, default fit_util.DEFAULT_FIT_STRATEGY
+    self.fitStats = {'fits': 0, 'failed': 0, 'ncalls': 0, 'maxCalls': 0, 'cached': 0}
     # Status
     self.padIndex = 0
-    self.pageNo = 0
+    self.pageNo = kwargs.get('pageOffset', 0) # pages printed before, e.g. by other shards
     self.pageName = "Start"
     self.padEmpty = True
     self.hasCover = False
     self.hasBackCover = False
     self.primaryHist = None
     self.counterSavedObjs = 0
+    self.counterObjs = 0
+    self.pageNames = [] # generated object names on current page
     # Dump
-    self.root_objs = []         # Temp storage to avoid GC
+      # Page-scoped storage to avoid GC, released after the page is printed
+    self.root_objs = []
+    self.pinned_objs = []       # kept until the painter is deleted
+    self.memStats = {'pages': 0, 'maxPageObjs': 0, 'maxRSS': 0}
+    # Incremental build, pages cached as single-page PDF
+    self.pageCache = None
+    self.coverFile = None
+    if kwargs.get('incremental'):
+      self.pageCache = PageCache(kwargs.get('pageCacheDir', f'{self.printDir}/.page_cache'))
+    self.snapshotCache = SnapshotCache(kwargs['snapshotDir']) if kwargs.get('snapshotDir') else None
+    # Timing
+    self.statsFile = kwargs.get('statsFile')
+    self.stats = CallStats() if (kwargs.get('stats') or self.statsFile) else None
+    self.pageStart = (time.perf_counter(), time.process_time())
   def __del__(self):
     if(self.hasCover and not self.hasBackCover):
       self.PrintBackCover('')
-    if self.saveROOT:
-      self.rootfile.Close()
-      print('[-] ROOT objects saved to ' + self.rootfile.GetName())
-      print(f'> save_obj & TObject.Write() calls - {self.counterSavedObjs}')
+    if self.exporter is not None:
+      self.exporter.close()
+    self.close_archive()
+    if self.ownStyle:
+      self.styleContext.close()
+  @property
+  def rootfile(self):
+    """TFile of saveROOT output, as before the archive (None without saveROOT)
+    """
+    return self.archive.file if self.saveROOT else None
+  @timed()
   def save_obj(self, obj): # ROOT.TObject
+    """Write obj (or list) to the ROOT archive, with archiveBuffered when
+    the page is printed (the state of obj at that time is saved)
+    """
     if not self.saveROOT: return
-    self.rootfile.cd()
-    if type(obj) is list:
-      for tobj in obj:
-        tobj.Write()
-        self.counterSavedObjs += 1
+    self.archive.add(obj, dirName=self.page_dir())
+    self.counterSavedObjs += len(obj) if type(obj) is list else 1
+  def close_archive(self):
+    """Write remaining objects and close the ROOT archive
+    """
+    if not self.saveROOT or self.archive.file is None: return
+    self.archive.close(self.page_dir())
+    print(f'> save_obj calls - {self.counterSavedObjs}')
+  def page_dir(self):
+    """Archive directory of the current page
+    """
+    return f'page_{self.pageNo + 1:04d}'
+  @timed('archive')
+  def archive_page(self, title=''):
+    """Write objects saved on current page, return bytes written
+    """
+    return self.archive.flush(self.page_dir(), title) if self.saveROOT else 0
+  def unique_name(self, prefix):
+    """Name of a generated object, unique in the painter
+
+    Registered for the current page, so that page fingerprints of the
+    incremental build do not depend on objects drawn on earlier pages
+    """
+    name = f'{prefix}_{self.counterObjs}'
+    self.pageNames.append(name)
+    return name
+  def new_obj(self, obj, pin=False):
+    """Keep obj alive until current page is printed, or painter deleted if pin
+    """
+    self.counterObjs += 1
+    if pin:
+      self.pinned_objs.append(obj)
     else:
-      obj.Write()
-      self.counterSavedObjs += 1
-  def new_obj(self, obj):
-    self.root_objs.append(obj)
-    return self.root_objs[-1]
+      self.root_objs.append(obj)
+    return obj
+  def pin_obj(self, obj):
+    """Keep obj (or list of obj) beyond current page
+    """
+    for tobj in (obj if type(obj) is list else [obj]):
+      if any(tobj is o for o in self.pinned_objs):
+        continue
+      self.root_objs = [o for o in self.root_objs if o is not tobj]
+      self.pinned_objs.append(tobj)
+    return obj
+  def release_page_objs(self):
+    """Release objects of the printed page, canvas must be cleared before
+    """
+    self.memStats['pages'] += 1
+    self.memStats['maxPageObjs'] = max(self.memStats['maxPageObjs'], len(self.root_objs))
+    self.memStats['maxRSS'] = max(self.memStats['maxRSS'], max_rss())
+    self.root_objs = []
+    self.pageNames = []
   def new_legend(self, xlow, ylow, xup, yup):
     lgd = self.new_obj(ROOT.TLegend(xlow, ylow, xup, yup))
     return lgd
@@ -113,9 +237,14 @@ class Painter:
     if(self.subPadNX * self.subPadNY > 1):
       self.canvas.Divide(self.subPadNX, self.subPadNY)
     self.padEmpty = True
+    self.pad = self.canvas
     # Style
-    ROOT.gPad.SetMargin(self.marginLeft, self.marginRight, self.marginBottom, self.marginTop)
-    ROOT.gPad.SetGrid(self.showGrid, self.showGrid)
+    self.pad.SetMargin(self.marginLeft, self.marginRight, self.marginBottom, self.marginTop)
+    self.pad.SetGrid(self.showGrid, self.showGrid)
+  def SetColorAndStyle(self, obj, c=None, s=None, size=1.0):
+    """plot_util.SetColorAndStyle with color/marker cycles of this painter
+    """
+    SetColorAndStyle(obj, c, s, size, self.styleContext)
   def SetLayout(self, nx, ny):
     self.subPadNX = nx
     self.subPadNY = ny
@@ -127,6 +256,7 @@ class Painter:
     self.draw_text(0.01,0.01,0.05,0.05,f'{self.pageNo}', 
       size=0.03, color=kGray+1, align=12).Draw()
   def PrintCover(self, title = '', isBack = False):
+    self.styleContext.cd()
     self.canvas.Clear()
     pTxt = ROOT.TPaveText(0.25,0.4,0.75,0.6, "brNDC")
     if(title == ''):
@@ -140,7 +270,13 @@ class Painter:
     self.canvas.Draw()
     pTxt.Draw()
     if(isBack):
-      self.canvas.Print(self.printer + ')', 'Title:End')
+      if self.pageCache is not None:
+        backFile = self.pageCache.print_cover(self.canvas, 'back', 'End')
+        self.pageCache.assemble(self.printer, self.coverFile, backFile)
+        self.pageCache.prune()
+        print(f'[-] INFO - Incremental build {self.printer} - {self.pageCache.hits} pages reused, {self.pageCache.misses} rendered')
+      else:
+        self.canvas.Print(self.printer + ')', 'Title:End')
     else:
       self.draw_pageno()
       text_footnote = {
@@ -152,41 +288,106 @@ class Painter:
       self.add_text(pave, f'Timestamp : {datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', **text_footnote)
       self.add_text(pave, f'Powered by #bf{{root_plot}}', **text_footnote)
       pave.Draw()
-      self.canvas.Print(self.printer + '(', 'Title:Cover')
+      if self.pageCache is not None:
+        self.pageCache.reset()
+        self.coverFile = self.pageCache.print_cover(self.canvas, 'cover', 'Cover')
+      else:
+        self.canvas.Print(self.printer + '(', 'Title:Cover')
     pTxt.Delete()
     self.ResetCanvas()
+    self.release_page_objs()
   def PrintBackCover(self, title=''):
+    self.close_archive() # before the page objects are released
     self.PrintCover(title, isBack=True)
+    if self.exporter is not None:
+      self.exporter.flush()
+    if self.stats is not None:
+      print('[-] INFO - Timing statistics\n' + self.stats.summary())
+      if self.statsFile:
+        self.stats.dump_json(self.statsFile)
+        print(f'[-] INFO - Timing statistics saved to {self.statsFile}')
+    stats = self.memStats
+    print(f'[-] INFO - Memory high-water : {stats["maxRSS"] / 1024**2:.1f} MB RSS, max. {stats["maxPageObjs"]} objects per page in {stats["pages"]} pages, {len(self.pinned_objs)} pinned')
+    stats = self.fitStats
+    if stats['fits'] > 0:
+      print(f'[-] INFO - Fitting - {stats["fits"]} fits ({stats["failed"]} failed), {stats["ncalls"]} FCN calls, {stats["ncalls"] / stats["fits"]:.0f} per fit, max. {stats["maxCalls"]}')
+    if stats['cached'] > 0:
+      print(f'[-] INFO - Fitting - {stats["cached"]} results from fit cache, no FCN calls')
+    if self.fitCache is not None:
+      stats = self.fitCache.stats()
+      print(f'[-] INFO - Fit cache {stats["path"]} - {stats["hits"]} hits, {stats["misses"]} misses, {stats["entries"]} entries')
+  def OpenDocument(self):
+    """Open output PDF without cover page, close by CloseDocument or PrintBackCover
+    """
+    self.canvas.Print(self.printer + '[')
+  def CloseDocument(self):
+    """Close output PDF without back cover page
+    """
+    self.canvas.Print(self.printer + ']')
+    self.close_archive()
+  @timed()
   def NextPage(self, title=""):
+    self.styleContext.cd() # figures and page painted with own style
     # Print
+    nbytes = 0
     if self.printAll and not self.padEmpty:
       figureName = title
       if title == '':
-        figureName = f'{self.primaryHist.GetName()}_{len(self.root_objs)}'
+        figureName = f'{self.primaryHist.GetName()}_{self.counterObjs}'
       figurePath = f'{self.printDir}/{figureName}'
-      for ext in self.printExt:
-        self.canvas.SaveAs(figurePath + '.' + ext)
+      nbytes = self.export_figure(figurePath)
     if(title == ""):
       title = self.pageName
+    nbytes += self.archive_page(title)
     self.pageNo += 1
     if(self.showPageNo):
       self.canvas.cd()
       self.draw_pageno()
-    self.canvas.Print(self.printer, f"Title:{title}")
+    nbytes += self.print_page(title)
+    if self.stats is not None:
+      self.stats.add_page(self.pageNo, title, time.perf_counter() - self.pageStart[0],
+        time.process_time() - self.pageStart[1], nbytes)
     # New page
     self.padIndex = 0
     self.ResetCanvas()
+    self.release_page_objs()
+    self.pageStart = (time.perf_counter(), time.process_time())
+  @timed('Print')
+  def print_page(self, title):
+    """Print canvas as a page of the output PDF, return bytes written
+    """
+    if self.pageCache is not None:
+      return self.pageCache.print_page(self.canvas, title, self.pageNames)
+    size = os.path.getsize(self.printer) if os.path.exists(self.printer) else 0
+    self.canvas.Print(self.printer, f"Title:{title}")
+    return os.path.getsize(self.printer) - size if os.path.exists(self.printer) else 0
+  @timed('export')
+  def export_figure(self, figurePath):
+    """Save canvas as figurePath.ext for ext in printExt, return bytes written
+    (0 for background export)
+    """
+    if self.exporter is not None:
+      self.exporter.submit(self.canvas, figurePath, self.printExt, self.style)
+      return 0
+    nbytes = 0
+    for ext in self.printExt:
+      self.canvas.SaveAs(figurePath + '.' + ext)
+      if os.path.exists(figurePath + '.' + ext):
+        nbytes += os.path.getsize(figurePath + '.' + ext)
+    return nbytes
+  @timed()
   def NextPad(self, title=""):
     # Full sub-pads
     if(self.padIndex == self.subPadNX * self.subPadNY):
       self.NextPage()
     self.padIndex = self.padIndex + 1
-    self.canvas.cd(self.padIndex)
+    self.pad = self.canvas.cd(self.padIndex)
     self.padEmpty = True
     self.primaryHist = None
     # Style
-    ROOT.gPad.SetMargin(self.marginLeft, self.marginRight, self.marginBottom, self.marginTop)
-    ROOT.gPad.SetGrid(self.showGrid, self.showGrid)
+    self.styleContext.cd()
+    self.pad.SetMargin(self.marginLeft, self.marginRight, self.marginBottom, self.marginTop)
+    self.pad.SetGrid(self.showGrid, self.showGrid)
   def NextRow(self):
     while(self.padIndex % self.subPadNX != 0):
       self.NextPad()
@@ -196,9 +397,9 @@ class Painter:
     Default: vertical gray band crossing the frame
     """
     grshade = self.new_obj(ROOT.TGraph(4))
-    ROOT.gPad.Update()
-    ymin = kwargs.get('ymin', ROOT.gPad.GetUymin())
-    ymax = kwargs.get('ymax', ROOT.gPad.GetUymax())
+    self.pad.Update()
+    ymin = kwargs.get('ymin', self.pad.GetUymin())
+    ymax = kwargs.get('ymax', self.pad.GetUymax())
     grshade.SetPoint(0, xmin, ymax)
     grshade.SetPoint(1, xmax, ymax)
     grshade.SetPoint(2, xmax, ymin)
@@ -217,22 +418,28 @@ class Painter:
     palette = hist.GetListOfFunctions().FindObject("palette")
     totalWidth = width + 0.05 + 0.05 # palette, label, title
     # Pad
-    ROOT.gPad.SetRightMargin(totalWidth + self.marginRight)
+    self.pad.SetRightMargin(totalWidth + self.marginRight)
     # Palette
     palette.SetX1NDC(1. - totalWidth)
     palette.SetX2NDC(1. - totalWidth + width)
     palette.SetY1NDC(self.marginBottom)
     palette.SetY2NDC(1. - self.marginTop)
     return palette
-  def hist_rebin(self, hist, binning):
-    """binning: width, min, max
+  def hist_rebin(self, hist, binning=None, edges=None):
+    """binning: width, min, max - group bins in place
+    edges: variable-width bin edges - return new TH1D/TH2D (X only for TH2)
     """
+    if edges is not None:
+      if hist.GetDimension() == 1:
+        return self.new_obj(rebin_1d(hist, edges))
+      return self.new_obj(rebin_2d(hist, edges, axis_edges(hist.GetYaxis())))
     binwidth = binning[0]
     valmin = binning[1]
     valmax = binning[2]
     nbingroup = int ( binwidth // hist.GetBinWidth(1))
     hist.Rebin(nbingroup)
     hist.GetXaxis().SetRangeUser(valmin, valmax)
+    return hist
   def new_hist(self, name, title, binning):
     """binning: width, min, max
     """
@@ -241,99 +448,135 @@ class Painter:
     valmax = binning[2]
     nbins = int( (valmax - valmin) // binwidth)
     return self.new_obj(ROOT.TH1F(name, title, nbins, valmin, valmax))
-  def draw_hist_text(self, hist, **textAttr):
-    """Plot bin content as text for ROOT.TH2
+  def draw_hist_text(self, hist, mode='bulk', minCellSize=0.015, aggregate=False, fmt='.3f', **textAttr):
+    """Plot bin content as text for ROOT.TH2, zero bins included
+
+    mode - 'bulk': all labels by one TH2 'TEXT0' primitive with shared
+      color and size (font from gStyle), 'pave': one TPaveText per bin
+    minCellSize - min. bin size in pad NDC for readable labels, smaller bins
+      are skipped, or summed into readable groups if aggregate
+    fmt - text format, per histogram also in bulk mode
     """
-    xlower = ROOT.gPad.GetLeftMargin()
-    xupper = 1 - ROOT.gPad.GetRightMargin()
-    ylower = ROOT.gPad.GetBottomMargin()
-    yupper = 1 - ROOT.gPad.GetTopMargin()
-    wx = (xupper - xlower) / hist.GetNbinsX()
-    wy = (yupper - ylower) / hist.GetNbinsY()
+    xlower = self.pad.GetLeftMargin()
+    xupper = 1 - self.pad.GetRightMargin()
+    ylower = self.pad.GetBottomMargin()
+    yupper = 1 - self.pad.GetTopMargin()
+    xaxis, yaxis = hist.GetXaxis(), hist.GetYaxis()
+    wx = (xupper - xlower) / (xaxis.GetLast() - xaxis.GetFirst() + 1)
+    wy = (yupper - ylower) / (yaxis.GetLast() - yaxis.GetFirst() + 1)
     # Text attributes
     textAttr['color'] = textAttr.get('color', kBlack)
     textAttr['size'] = textAttr.get('size', 0.06)
     textAttr['font'] = textAttr.get('font', 62)
-    textAttr['align'] = textAttr.get('color', 22)
-    for iy in range(hist.GetNbinsY()):
-      for ix in range(hist.GetNbinsX()):
-        val = hist.GetBinContent(ix + 1, iy +1)
-        pave = self.draw_text(ix * wx + xlower, iy * wy + ylower, (ix+1) * wx + xlower, (iy+1)*wx + xlower)
-        self.add_text(pave,f'{val:.3f}', **textAttr)
+    textAttr['align'] = textAttr.get('align', 22)
+    # Density cutoff
+    labels = hist
+    if min(wx, wy) < minCellSize:
+      if not aggregate:
+        print(f'[X] Warning  - {hist.GetName()} - bins too small for text ({wx:.3f} x {wy:.3f} NDC), skipped')
+        return None
+      ngroupX = math.ceil(minCellSize / wx) if wx < minCellSize else 1
+      ngroupY = math.ceil(minCellSize / wy) if wy < minCellSize else 1
+      # explicit edges, last group partial instead of dropped as by Rebin2D
+      labels = self.new_obj(rebin_2d(hist, group_edges(axis_edges(xaxis), ngroupX),
+        group_edges(axis_edges(yaxis), ngroupY), self.unique_name(f'{hist.GetName()}_text')))
+      labels.SetDirectory(ROOT.nullptr)
+      labels.GetXaxis().SetRangeUser(xaxis.GetBinLowEdge(xaxis.GetFirst()), xaxis.GetBinUpEdge(xaxis.GetLast()))
+      labels.GetYaxis().SetRangeUser(yaxis.GetBinLowEdge(yaxis.GetFirst()), yaxis.GetBinUpEdge(yaxis.GetLast()))
+    if mode == 'bulk':
+      if labels is hist: # keep attributes of the drawn histogram
+        labels = self.new_obj(hist.Clone(self.unique_name(f'{hist.GetName()}_text')))
+      labels.SetMarkerColor(textAttr['color'])
+      labels.SetMarkerSize(textAttr['size'] / 0.02) # TEXT size = 0.02 * marker size
+      # Text format is read from gStyle at paint time: set it just before
+      # painting these labels and restore it after, by TExec in the pad
+      textFormat = self.style.GetPaintTextFormat()
+      self.new_obj(ROOT.TExec(f'{labels.GetName()}_fmt', f'gStyle->SetPaintTextFormat("{fmt}");')).Draw()
+      labels.Draw('TEXT0 SAME')
+      self.new_obj(ROOT.TExec(f'{labels.GetName()}_fmt_reset', f'gStyle->SetPaintTextFormat("{textFormat}");')).Draw()
+      return labels
+    # Paves at bin edges mapped onto the displayed axis range
+    xmin, xmax = xaxis.GetBinLowEdge(xaxis.GetFirst()), xaxis.GetBinUpEdge(xaxis.GetLast())
+    ymin, ymax = yaxis.GetBinLowEdge(yaxis.GetFirst()), yaxis.GetBinUpEdge(yaxis.GetLast())
+    xedges = xlower + (axis_edges(labels.GetXaxis()) - xmin) / (xmax - xmin) * (xupper - xlower)
+    yedges = ylower + (axis_edges(labels.GetYaxis()) - ymin) / (ymax - ymin) * (yupper - ylower)
+    eps = 1e-9
+    for iy in range(labels.GetNbinsY()):
+      if yedges[iy] < ylower - eps or yedges[iy + 1] > yupper + eps: continue
+      for ix in range(labels.GetNbinsX()):
+        if xedges[ix] < xlower - eps or xedges[ix + 1] > xupper + eps: continue
+        val = labels.GetBinContent(ix + 1, iy +1)
+        pave = self.draw_text(xedges[ix], yedges[iy], xedges[ix + 1], yedges[iy + 1])
+        self.add_text(pave, f'{val:{fmt}}', **textAttr)
         pave.Draw('same')
+    return labels
   # Calculation
   def normalise_profile_y(self, hist):
-    for ix in range(1,hist.GetNbinsX()+1):
-      hpfx = hist.ProjectionY(f'_py_{ix}', ix, ix)
-      norm = hpfx.GetMaximum()
-      if norm < 1: continue
-      for iy in range(1,hist.GetNbinsY()+1):
-        raw = hist.GetBinContent(ix, iy)
-        hist.SetBinContent(ix, iy, 1. * raw / norm)
-      hpfx.Delete()
+    """Normalise each X column by its maximum along Y
+    """
+    content = hist_content(hist, flow=False)
+    norm = content.max(axis=1)
+    cols = norm >= 1
+    content[cols] = content[cols] / norm[cols, np.newaxis]
+    sync_stats(hist)
     return None
+  def lod_hist(self, h2, reduce='mean'):
+    """Copy of TH2 downsampled to the pixel resolution of current pad, for drawing
+    with the draw attributes of h2
+    Return h2 itself if not larger than the pad, or if it has bin labels
+    """
+    if has_bin_labels(h2):
+      return h2
+    pad = self.pad
+    maxX = int(pad.GetWw() * pad.GetAbsWNDC() * (1 - pad.GetLeftMargin() - pad.GetRightMargin()) * self.lodBinsPerPixel)
+    maxY = int(pad.GetWh() * pad.GetAbsHNDC() * (1 - pad.GetBottomMargin() - pad.GetTopMargin()) * self.lodBinsPerPixel)
+    hlod = downsample_2d(h2, maxX, maxY, reduce, self.unique_name(f'{h2.GetName()}_lod'))
+    if hlod is h2:
+      return h2
+    hlod.SetDirectory(ROOT.nullptr)
+    copy_draw_attributes(h2, hlod)
+    print(f'[+] DEBUG - LOD {h2.GetName()} : {h2.GetNbinsX()}x{h2.GetNbinsY()} -> {hlod.GetNbinsX()}x{hlod.GetNbinsY()} ({reduce})')
+    return self.new_obj(hlod)
   def estimate_fwhm(self, hist):
     """Calculate FWHM and center for TH1D
     """
-    peak = hist.GetMaximum()
-    rms = hist.GetRMS()
-    mean = hist.GetMean()
-    halfLeft = hist.FindFirstBinAbove(peak/2.)
-    halfRight = hist.FindLastBinAbove(peak/2.)
-    center = 0.5 * (hist.GetBinCenter(halfRight) + hist.GetBinCenter(halfLeft))
-    fwhm = hist.GetBinCenter(halfRight) - hist.GetBinCenter(halfLeft)
-    if fwhm < 2 * hist.GetBinWidth(1):
-      print(f'[X] Warning  - Histogram {hist.GetName()} - FWHM too narrow {center = :.2e}, {fwhm = :.2e}, {rms = :.2e}, {peak = :.2e}')
-      return rms, mean
-    return fwhm, center
+    return estimate_fwhm(hist)
   # Fitting -> Fitter?
+  def count_fit(self, ncalls, failed=False, cached=False):
+    """Account FCN calls of one fit, summary at PrintBackCover
+    Fit cache hits are counted apart, their stored calls were not spent
+    """
+    stats = self.fitStats
+    if cached:
+      stats['cached'] += 1
+      return
+    stats['fits'] += 1
+    stats['failed'] += int(failed)
+    stats['ncalls'] += ncalls
+    stats['maxCalls'] = max(stats['maxCalls'], ncalls)
+  @timed()
   def optimise_hist_langau(self, hist, scale=1, **kwargs):
     """Adaptive fitter for Landau-Gaussian distribution
     """
-    # Parameters
-    N_PARS = 4
-    fwhm, center = self.estimate_fwhm(hist)
-    fitRange = kwargs.get('fitRange')
-    if(not fitRange): fitRange = [0.3*hist.GetMean(), 1.5*hist.GetMean()]
-    area = hist.Integral()
-    pars = [
-      [fwhm * 0.1, fwhm * 0., fwhm * 1],
-      [center, center * 0.5, center * 2],
-      [10 * area, area * 5, area * 100],
-      [fwhm * 0.1, fwhm * 0., fwhm * 1],
-    ]
-    # Fitter
-    langaufun = None
-    try:
-      langaufun = getattr(ROOT, 'langaufun')
-    except AttributeError:
-      script_path = os.path.dirname( os.path.realpath(__file__) )
-      macroPath = script_path + '/langaus.C'
-      if os.path.exists(macroPath):
-        # C macro, faster than python implementation
-        ROOT.gInterpreter.ProcessLine(f'#include "{macroPath}"')
-        langaufun = ROOT.langaufun
-      else:
-        # python internel implementation
-        langaufun = fcn_langaus
-    fcnName = f'fitLangaus_{hist.GetName()}_{len(self.root_objs)}'
-    fcnfit = self.new_obj(ROOT.TF1(fcnName, langaufun, fitRange[0], fitRange[1], N_PARS))
-    startvals = [par[0] for par in pars]
-    parlimitslo = [par[1] for par in pars]
-    parlimitshi = [par[2] for par in pars]
-    fcnfit.SetParameters(array('d', startvals))
-    fcnfit.SetParNames("Width","MP","Area","GSigma")
-    for i in range(N_PARS):
-      fcnfit.SetParLimits(i, parlimitslo[i], parlimitshi[i])
-    resultPtr = hist.Fit(fcnName, 'RB0SQN')
-    try:
-      params = resultPtr.GetParams()
-    except ReferenceError:
+    if self.fitCache is not None:
+      record = fit_batch.fit_hist(hist, 'langau', self.fitCache, fitRange=kwargs.get('fitRange'),
+        compileLangau=self.compileLangau, fitStrategy=self.fitStrategy)
+      self.count_fit(record.NCalls(), not record.IsValid(), record.cached)
+      return self.draw_fit(hist, record, scale, **kwargs)
+    fitRange, pars = langau_seed(hist, kwargs.get('fitRange'))
+    fcnName = self.unique_name(f'fitLangaus_{hist.GetName()}')
+    fit = fit_langau(hist, fitRange, pars, fcnName, self.compileLangau, self.fitStrategy)
+    if fit is None:
+      self.count_fit(0, failed=True)
       self.draw_text(0.50, 0.55, 0.80, 0.85, 'Langau fitting FAILED').Draw('same')
-      print(f'[X] Warning  - {hist.GetName()} - Langau fitting FAILED')
       return None
-    fiterrs = array('d',[0.] * N_PARS)
-    fiterrs = fcnfit.GetParErrors()
+    fcnfit, resultPtr, ncalls = fit
+    self.count_fit(ncalls)
+    self.new_obj(fcnfit)
+    return self.draw_langau_fit(hist, fcnfit, resultPtr, **kwargs)
+  def draw_langau_fit(self, hist, fcnfit, result, **kwargs):
+    N_PARS = 4
+    params = result.GetParams()
     # Draw
     fcnfit.SetRange(hist.GetXaxis().GetXmin(), hist.GetXaxis().GetXmax())
     if(kwargs.get('color')):
@@ -344,37 +587,36 @@ class Painter:
       fcnfit.SetLineWidth(kwargs['width'])
     fcnfit.Draw('lsame')
     if(kwargs.get('notext')):
-      return fcnfit, resultPtr
+      return fcnfit, result
     pave = self.draw_text(0.58, 0.55, 0.85, 0.85,title='Landau-Gaussian')
-    self.add_text(pave, f'#chi^{{2}} / NDF = {resultPtr.Chi2():.1f} / {resultPtr.Ndf()}')
-    self.add_text(pave, f'Mean = {hist.GetMean():.2e}')
+    self.add_text(pave, f'#chi^{{2}} / NDF = {result.Chi2():.1f} / {result.Ndf()}')
+    self.add_text(pave, f'Mean = {peak_stats(hist).mean:.2e}')
     for ipar in range(N_PARS):
       self.add_text(pave, f'{fcnfit.GetParName(ipar)} = {params[ipar]:.2e}')
     pave.Draw('same')
-    return fcnfit, resultPtr
+    return fcnfit, result
+  @timed()
   def optimise_hist_gaus(self, hist, scale=1, **kwargs):
-    peak = hist.GetMaximum()
-    mean = hist.GetMean()
-    rms = hist.GetRMS()
-    halfLeft = hist.FindFirstBinAbove(peak/2.)
-    halfRight = hist.FindLastBinAbove(peak/2.)
-    center = 0.5 * (hist.GetBinCenter(halfRight) + hist.GetBinCenter(halfLeft))
-    fwhm = hist.GetBinCenter(halfRight) - hist.GetBinCenter(halfLeft)
-    if fwhm < 2 * hist.GetBinWidth(1):
-      print(f'[X] Warning  - FWHM too narrow {center = }, {fwhm = }, {rms = }, {peak = }')
+    if self.fitCache is not None:
+      record = fit_batch.fit_hist(hist, 'gaus', self.fitCache, gausFitRange=self.GAUS_FIT_RANGE, fitStrategy=self.fitStrategy)
+      self.count_fit(record.NCalls(), not record.IsValid(), record.cached)
+      return self.draw_fit(hist, record, scale, **kwargs)
+    seed = gaus_seed(hist, self.GAUS_FIT_RANGE)
+    if seed is None:
       return None
-    fitRange = min(5 * rms, self.GAUS_FIT_RANGE * fwhm)
-    fcnGaus = self.new_obj(
-      ROOT.TF1(f'fcnFitGaus_{hist.GetName()}_{len(self.root_objs)}',
-      'gaus', center - fitRange, center + fitRange))
-    resultPtr = hist.Fit(fcnGaus,'SQN','', center - fitRange, center + fitRange)
-    try:
-      params = resultPtr.GetParams()
-    except ReferenceError:
-      print(f'[X] Warning  - Fitting failed with {center = }, {fwhm = }, {rms = }, {peak = }')
+    fit = fit_gaus(hist, seed, self.unique_name(f'fcnFitGaus_{hist.GetName()}'), self.fitStrategy)
+    if fit is None:
+      self.count_fit(0, failed=True)
       return None
+    fcnGaus, resultPtr, ncalls = fit
+    self.count_fit(ncalls)
+    self.new_obj(fcnGaus)
+    return self.draw_gaus_fit(hist, fcnGaus, resultPtr, seed, scale, **kwargs)
+  def draw_gaus_fit(self, hist, fcnGaus, result, seed, scale=1, **kwargs):
+    params = result.GetParams()
     mean = params[1]
     sigma = params[2]
+    center, rms, fwhm = seed['center'], seed['rms'], seed['fwhm']
     fcnGaus.SetRange(mean - 5 * sigma, mean + 5 * sigma)
     fcnGaus.Draw('same')
     drawRange = min(15 * rms, 10 * params[2])
@@ -387,30 +629,83 @@ class Painter:
       fcnGaus.SetLineWidth(kwargs['width'])
     fcnGaus.Draw('lsame')
     if(kwargs.get('notext')):
-      return fcnGaus, resultPtr
+      return fcnGaus, result
     # Draw info
     pave = self.new_obj(ROOT.TPaveText(0.18, 0.55, 0.45, 0.85,'NDC'))
     pave.SetFillColor(ROOT.kWhite)
     self.add_text(pave, f'mean (#mu) = {params[1] * scale:.1f}')
     self.add_text(pave, f'#sigma = {params[2] * scale:.1f}')
-    self.add_text(pave, f'#chi^{{2}} / NDF = {resultPtr.Chi2():.1f} / {resultPtr.Ndf()}')
+    self.add_text(pave, f'#chi^{{2}} / NDF = {result.Chi2():.1f} / {result.Ndf()}')
     self.add_text(pave, f'RMS = {rms * scale:.1f}')
     self.add_text(pave, f'FWHM = {fwhm * scale:.1f}')
     pave.Draw('same')
-    return resultPtr
+    return result
+  def fit_many(self, hists, model='gaus', workers=None, **kwargs):
+    """Fit histograms in a process pool without drawing, see fit_batch.fit_many
+    Draw results afterwards by DrawHist(hist, fitResult=record)
+    """
+    kwargs.setdefault('gausFitRange', self.GAUS_FIT_RANGE)
+    kwargs.setdefault('compileLangau', self.compileLangau)
+    kwargs.setdefault('fitStrategy', self.fitStrategy)
+    records = fit_batch.fit_many(hists, model, workers, **kwargs)
+    for record in records:
+      self.count_fit(record.NCalls(), not record.IsValid(), record.cached)
+    return records
+  def draw_fit(self, hist, record, scale=1, **kwargs):
+    """Draw FitRecord (e.g. from fit_many) with the histogram on current pad
+    """
+    if not record.IsValid():
+      print(f'[X] Warning  - {hist.GetName()} - {record.model} fitting FAILED')
+      if record.model == 'langau':
+        self.draw_text(0.50, 0.55, 0.80, 0.85, 'Langau fitting FAILED').Draw('same')
+      return None
+    fcnName = self.unique_name(f'fcnFit_{record.model}_{hist.GetName()}')
+    fcn = self.new_obj(record_tf1(record, fcnName, *record.fitRange))
+    if record.model == 'gaus':
+      return self.draw_gaus_fit(hist, fcn, record, record.info, scale, **kwargs)
+    return self.draw_langau_fit(hist, fcn, record, **kwargs)
+  def DrawFile(self, source, include=None, exclude=None, options=None, classes=('TH1', 'TGraph')):
+    """Draw every object of a ROOT file, one pad each, with bounded memory
+
+    Objects are read lazily one at a time and released after their page
+    is printed. With snapshotDir, objects are rebuilt from the snapshot
+    cache and the source is only read when it changed.
+    source - file path or TFile
+    include/exclude - glob patterns on object path in file, e.g. 'QA/*/hPt*'
+    options - per-class keyword arguments of DrawHist, first matching base
+      class is used, e.g. {'TH2': {'option': 'colz'}, 'TH1': {'optLogY': True}}
+    Return number of drawn objects
+    """
+    if options is None:
+      options = {'TH2': {'option': 'colz'}, 'TGraph': {'option': 'AP'}}
+    ndrawn = 0
+    if self.snapshotCache is not None and isinstance(source, str):
+      objects = self.snapshotCache.walk(source, include, exclude, classes)
+    else:
+      objects = walk_file(source, include, exclude, classes)
+    for path, obj in objects:
+      drawOptions = next((opts for cl, opts in options.items() if obj.InheritsFrom(cl)), {})
+      self.DrawHist(obj, **drawOptions)
+      self.new_obj(obj) # page-scoped, after DrawHist which may start a new page
+      ndrawn += 1
+    return ndrawn
+  @timed()
   def DrawHist(self, htmp, title="", option="", optStat=False, samePad=False, optGaus=False, scale=1, **kwargs):
-    ROOT.gStyle.SetOptStat(optStat)
+    self.style.SetOptStat(optStat)
     if(title == ""):
       title = htmp.GetTitle()
+    primary = samePad and self.padEmpty
     if(not samePad):
       self.NextPad(title)
     elif not self.padEmpty:
       option = f'{option}same'
-    else:
-      self.primaryHist = htmp
     print("[+] DEBUG - Pad " + str(self.padIndex) + ' : ' + htmp.GetName())
     if kwargs.get('optNormY') == True:
       self.normalise_profile_y(htmp)
+    if(kwargs.get('lodColz', self.lodColz) and option.lower().startswith('colz') and htmp.InheritsFrom('TH2') and not htmp.InheritsFrom('TH3')):
+      htmp = self.lod_hist(htmp, kwargs.get('lodReduce', self.lodReduce))
+    if primary:
+      self.primaryHist = htmp # the drawn object
     htmp.Draw(option)
     self.padEmpty = False
     # Style
@@ -420,9 +715,11 @@ class Painter:
     if(htmp.ClassName().startswith('TH') and self.subPadNX * self.subPadNY >= 4):
       htmp.SetTitleSize(0.08, "XY")
       htmp.SetTitleOffset(0.8, "XY")
+    if(kwargs.get('fitResult')):
+      self.draw_fit(htmp, kwargs['fitResult'], scale)
     if(optGaus): self.optimise_hist_gaus(htmp, scale)
     if(kwargs.get('optLangau') == True):
       self.optimise_hist_langau(htmp, scale)
-    ROOT.gPad.SetLogx(kwargs.get('optLogX') == True)
-    ROOT.gPad.SetLogy(kwargs.get('optLogY') == True)
-    ROOT.gPad.SetLogz(kwargs.get('optLogZ') == True)
+    self.pad.SetLogx(kwargs.get('optLogX') == True)
+    self.pad.SetLogy(kwargs.get('optLogY') == True)
+    self.pad.SetLogz(kwargs.get('optLogZ') == True)
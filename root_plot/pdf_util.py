@@ -0,0 +1,39 @@
+# PDF document assembly
+
+# Merge single-page or multi-page PDF files in order, by pypdf if
+# installed, otherwise by one of the qpdf, pdfunite or ghostscript tools.
+
+import os, shutil, subprocess
+
+def _merge_pypdf(inputs, output):
+  import pypdf
+  writer = pypdf.PdfWriter()
+  for path in inputs:
+    writer.append(path)
+  with open(output, 'wb') as f:
+    writer.write(f)
+
+def _merge_command(inputs, output):
+  if shutil.which('qpdf'):
+    return ['qpdf', '--empty', '--pages'] + list(inputs) + ['--', output]
+  if shutil.which('pdfunite'):
+    return ['pdfunite'] + list(inputs) + [output]
+  if shutil.which('gs'):
+    return ['gs', '-q', '-dBATCH', '-dNOPAUSE', '-sDEVICE=pdfwrite', f'-sOutputFile={output}'] + list(inputs)
+  return None
+
+def merge_pdf(inputs, output):
+  """Concatenate PDF files in order into output
+  """
+  inputs = list(inputs)
+  for path in inputs:
+    if not os.path.exists(path):
+      raise FileNotFoundError(path)
+  try:
+    return _merge_pypdf(inputs, output)
+  except ImportError:
+    pass
+  cmd = _merge_command(inputs, output)
+  if cmd is None:
+    raise RuntimeError('No PDF merger available, install pypdf, qpdf, poppler (pdfunite) or ghostscript')
+  subprocess.run(cmd, check=True)
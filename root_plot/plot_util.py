@@ -3,19 +3,36 @@
 # Utility lib for general purpose in post-processing
 
 import ROOT
-from ROOT import TMath
-  # Colors
-from ROOT import kBlack, kRed, kBlue, kGreen, kViolet, kCyan, kOrange, kPink, kYellow, kMagenta, kGray, kWhite
-  # Markers
-from ROOT import kFullCircle, kFullSquare, kOpenCircle, kOpenSquare, kOpenDiamond, kOpenCross, kFullCross, kFullDiamond, kFullStar, kOpenStar, kOpenCircle, kOpenSquare, kOpenTriangleUp, kOpenTriangleDown, kOpenStar, kOpenDiamond, kOpenCross, kOpenThreeTriangles, kOpenFourTrianglesX, kOpenDoubleDiamond, kOpenFourTrianglesPlus, kOpenCrossX, kFullTriangleUp, kOpenTriangleUp, kFullCrossX, kOpenCrossX, kFullTriangleDown, kFullThreeTriangles, kOpenThreeTriangles, kFullFourTrianglesX, kFullDoubleDiamond, kFullFourTrianglesPlus
-  # Lines
-from ROOT import kSolid, kDashed, kDotted, kDashDotted
-  # Objects
-from ROOT import TCanvas, TPaveText
-from ROOT import gPad, gStyle
+from root_plot import setup_root
+setup_root()
 
-import sys, os, datetime, math, json, logging
+# ROOT constants as plain values, no symbol lookup at import
+  # Colors (EColor)
+kWhite, kBlack, kGray = 0, 1, 920
+kRed, kGreen, kBlue, kYellow, kMagenta, kCyan = 632, 416, 600, 400, 616, 432
+kOrange, kSpring, kTeal, kAzure, kViolet, kPink = 800, 820, 840, 860, 880, 900
+  # Markers (EMarkerStyle)
+kFullCircle, kFullSquare, kFullTriangleUp, kFullTriangleDown = 20, 21, 22, 23
+kOpenCircle, kOpenSquare, kOpenTriangleUp, kOpenDiamond, kOpenCross = 24, 25, 26, 27, 28
+kFullStar, kOpenStar, kOpenTriangleDown, kFullDiamond, kFullCross = 29, 30, 32, 33, 34
+kOpenThreeTriangles, kFullThreeTriangles, kOpenFourTrianglesX, kFullFourTrianglesX = 37, 39, 40, 41
+kOpenDoubleDiamond, kFullDoubleDiamond, kOpenFourTrianglesPlus, kFullFourTrianglesPlus = 42, 43, 44, 45
+kOpenCrossX, kFullCrossX = 46, 47
+  # Lines (ELineStyle)
+kSolid, kDashed, kDotted, kDashDotted = 1, 2, 3, 4
+  # Objects, resolved from ROOT on first access
+ROOT_SYMBOLS = ('TMath', 'TCanvas', 'TPaveText', 'gPad', 'gStyle')
+def __getattr__(name):
+  if name in ROOT_SYMBOLS:
+    return getattr(ROOT, name)
+  raise AttributeError(f"module 'root_plot.plot_util' has no attribute '{name}'")
+
+import sys, os, datetime, math, json, logging, itertools
 from array import array
+import numpy as np
+from root_plot.array_util import hist_content, hist_sumw2, axis_edges, axis_widths, sync_stats
+from root_plot.rebin_util import rebin_1d, rebin_2d
+from root_plot.integral_index import integral_index, axis_bins, axis_bin_centers
 
 # Color & Style
 # Select color and marker style in pre-defined group
@@ -26,7 +43,7 @@ COLOR_SET_ALICE_FILL = [kGray+1,  kRed-10, kBlue-9, kGreen-8, kMagenta-9, kOrang
 COLOR_SET = COLOR_SET_DEFAULT
 COLOR_INDEX = -1
 def SelectColor(COLOR_INDEX = -1):
-  while(COLOR_INDEX < 100):
+  while(True):
     yield COLOR_SET[COLOR_INDEX % len(COLOR_SET)]
     COLOR_INDEX += 1
 
@@ -40,7 +57,7 @@ MC_MARKER = [kOpenCircle, kOpenSquare, kOpenTriangleUp, kOpenTriangleDown, kOpen
 MARKER_SET = MARKER_SET_DEFAULT
 MARKER_INDEX = -1
 def SelectMarker(MARKER_INDEX = 0):
-  while(MARKER_INDEX < 100):
+  while(True):
     yield MARKER_SET[MARKER_INDEX % len(MARKER_SET)]
     MARKER_INDEX += 1
 COLOR = SelectColor()
@@ -49,52 +66,108 @@ MARKER = SelectMarker()
 LINE_STYLE_SET = [kSolid, kDashed, kDotted, kDashDotted]
 LINE_STYLE_INDEX = -1
 def SelectLine(LINE_STYLE_INDEX = 0):
-  while(LINE_STYLE_INDEX < 100):
+  while(True):
     yield LINE_STYLE_SET[LINE_STYLE_INDEX % len(LINE_STYLE_SET)]
     LINE_STYLE_INDEX += 1
 LINE = SelectLine()
 
+class StyleContext:
+  """Drawing style owned by one Painter, instead of module generators and gStyle
+
+  Color, marker and line style cycles never run out and are independent
+  between contexts. The TStyle is a private copy of gStyle (at creation),
+  made current by cd() before drawing and printing. ROOT paints from the
+  process-wide gStyle, so contexts switch between painters of one thread;
+  painters drawing concurrently in several threads are not supported.
+  name - made unique in gROOT's list of styles if taken
+  """
+  def __init__(self, name='root_plot_style', colors=None, markers=None, lines=None, alice=False):
+    self.colors = list(colors or COLOR_SET)
+    self.markers = list(markers or MARKER_SET)
+    self.lines = list(lines or LINE_STYLE_SET)
+    self.previous = ROOT.gStyle.GetName() # current at creation, restored by close()
+    self.style = ROOT.TStyle(ROOT.gStyle)
+    styles = ROOT.gROOT.GetListOfStyles()
+    uniqueName, n = name, 1
+    while styles.FindObject(uniqueName):
+      uniqueName, n = f'{name}_{n}', n + 1
+    self.style.SetName(uniqueName)
+    ROOT.SetOwnership(self.style, False) # registered in gROOT's list of styles, until close()
+    if alice:
+      ALICEStyle(style=self.style)
+    self.reset()
+  def reset(self):
+    self.colorCycle = itertools.cycle(self.colors)
+    self.markerCycle = itertools.cycle(self.markers)
+    self.lineCycle = itertools.cycle(self.lines)
+  def next_color(self):
+    return next(self.colorCycle)
+  def next_marker(self):
+    return next(self.markerCycle)
+  def next_line(self):
+    return next(self.lineCycle)
+  def cd(self):
+    """Make the style current (gStyle), return it
+    """
+    self.style.cd()
+    return self.style
+  def close(self):
+    """Remove the style from gROOT's list of styles and delete it,
+    gStyle falls back to the style current at creation if it was this one
+    """
+    if self.style is None: return
+    styles = ROOT.gROOT.GetListOfStyles()
+    if ROOT.addressof(ROOT.gStyle) == ROOT.addressof(self.style):
+      previous = styles.FindObject(self.previous) if self.previous != self.style.GetName() else None
+      (previous or ROOT.gROOT.GetStyle('Modern')).cd()
+    styles.Remove(self.style)
+    ROOT.SetOwnership(self.style, True)
+    self.style = None
+
 # From ALICE collaboration editor guidelines
-def ALICEStyle(graypalette = False):
+def ALICEStyle(graypalette = False, style = None):
+  """Apply to style, default gStyle
+  """
   print("[-] INFO - Setting ALICE figure style")
-  ROOT.gStyle.Reset("Plain")
-  ROOT.gStyle.SetOptTitle(0)
-  ROOT.gStyle.SetOptStat(0)
+  style = style if style is not None else ROOT.gStyle
+  style.Reset("Plain")
+  style.SetOptTitle(0)
+  style.SetOptStat(0)
   if(graypalette):
-    ROOT.gStyle.SetPalette(8,0)
+    style.SetPalette(8,0)
   else:
-    ROOT.gStyle.SetPalette(1)
-  ROOT.gStyle.SetCanvasColor(10)
-  ROOT.gStyle.SetCanvasBorderMode(0)
-  ROOT.gStyle.SetFrameLineWidth(1)
-  ROOT.gStyle.SetFrameFillColor(kWhite)
-  ROOT.gStyle.SetPadColor(10)
-  ROOT.gStyle.SetPadTickX(1)
-  ROOT.gStyle.SetPadTickY(1)
-  ROOT.gStyle.SetPadTopMargin(0.02)
-  ROOT.gStyle.SetPadBottomMargin(0.12)
-  ROOT.gStyle.SetPadLeftMargin(0.14)
-  ROOT.gStyle.SetPadRightMargin(0.02)
-  ROOT.gStyle.SetHistLineWidth(1)
-  ROOT.gStyle.SetHistLineColor(kRed)
-  ROOT.gStyle.SetFuncWidth(2)
-  ROOT.gStyle.SetFuncColor(kGreen+3)
-  ROOT.gStyle.SetLineWidth(2)
-  ROOT.gStyle.SetLabelSize(0.045,"xyz")
-  ROOT.gStyle.SetLabelOffset(0.01,"y")
-  ROOT.gStyle.SetLabelOffset(0.01,"x")
-  ROOT.gStyle.SetLabelColor(kBlack,"xyz")
-  ROOT.gStyle.SetTitleSize(0.05,"xyz")
-  ROOT.gStyle.SetTitleOffset(1.2,"y")
-  ROOT.gStyle.SetTitleOffset(1.1,"x")
-  ROOT.gStyle.SetTitleFillColor(kWhite)
-  ROOT.gStyle.SetTextSizePixels(26)
-  ROOT.gStyle.SetTextFont(42)
-  ROOT.gStyle.SetLegendBorderSize(0)
-  ROOT.gStyle.SetLegendFillColor(kWhite)
-  ROOT.gStyle.SetLegendFont(42)
+    style.SetPalette(1)
+  style.SetCanvasColor(10)
+  style.SetCanvasBorderMode(0)
+  style.SetFrameLineWidth(1)
+  style.SetFrameFillColor(kWhite)
+  style.SetPadColor(10)
+  style.SetPadTickX(1)
+  style.SetPadTickY(1)
+  style.SetPadTopMargin(0.02)
+  style.SetPadBottomMargin(0.12)
+  style.SetPadLeftMargin(0.14)
+  style.SetPadRightMargin(0.02)
+  style.SetHistLineWidth(1)
+  style.SetHistLineColor(kRed)
+  style.SetFuncWidth(2)
+  style.SetFuncColor(kGreen+3)
+  style.SetLineWidth(2)
+  style.SetLabelSize(0.045,"xyz")
+  style.SetLabelOffset(0.01,"y")
+  style.SetLabelOffset(0.01,"x")
+  style.SetLabelColor(kBlack,"xyz")
+  style.SetTitleSize(0.05,"xyz")
+  style.SetTitleOffset(1.2,"y")
+  style.SetTitleOffset(1.1,"x")
+  style.SetTitleFillColor(kWhite)
+  style.SetTextSizePixels(26)
+  style.SetTextFont(42)
+  style.SetLegendBorderSize(0)
+  style.SetLegendFillColor(kWhite)
+  style.SetLegendFont(42)
 
-def InitALICELabel(x1 = 0.02, y1 = 0.03, x2 = 0.35, y2 = 0.1, size=0.04, align=13, type="perf", pos='lt'):
+def InitALICELabel(x1 = 0.02, y1 = 0.03, x2 = 0.35, y2 = 0.1, size=0.04, align=13, type="perf", pos='lt', pad=None):
   """Draw text relative to pad edges
   
   Position:
@@ -102,11 +175,13 @@ def InitALICELabel(x1 = 0.02, y1 = 0.03, x2 = 0.35, y2 = 0.1, size=0.04, align=1
     x2 - Label pave to away edge X
     y1 - Label pave to near edge Y
     y2 - Label pave to away edge Y
+  pad - margins of pad, default gPad
   """
-  PAD_EDGE_LEFT = ROOT.gPad.GetLeftMargin()
-  PAD_EDGE_RIGHT = 1 - ROOT.gPad.GetRightMargin()
-  PAD_EDGE_BOTTOM   = ROOT.gPad.GetBottomMargin()
-  PAD_EDGE_TOP   = 1 - ROOT.gPad.GetTopMargin()
+  pad = pad if pad is not None else ROOT.gPad
+  PAD_EDGE_LEFT = pad.GetLeftMargin()
+  PAD_EDGE_RIGHT = 1 - pad.GetRightMargin()
+  PAD_EDGE_BOTTOM   = pad.GetBottomMargin()
+  PAD_EDGE_TOP   = 1 - pad.GetTopMargin()
   if pos == 'lt': # Left Top
     xlower = PAD_EDGE_LEFT + x1
     xupper = PAD_EDGE_LEFT + x2
@@ -148,11 +223,15 @@ def InitALICELabel(x1 = 0.02, y1 = 0.03, x2 = 0.35, y2 = 0.1, size=0.04, align=1
   txt.SetTextFont(42) # Helvetica Bold
   return pTxtALICE
 
-def PrintFigure(name):
-  ROOT.gPad.SaveAs(name + ".pdf")
-  ROOT.gPad.SaveAs(name + ".eps")
-  ROOT.gPad.SaveAs(name + ".png")
-  ROOT.gPad.SaveAs(name + ".root")
+def PrintFigure(name, pool = None):
+  """Save current pad as pdf, eps, png and root
+  pool - ExportPool, write files in background
+  """
+  exts = ['pdf', 'eps', 'png', 'root']
+  if(pool is not None):
+    return pool.submit(ROOT.gPad, name, exts)
+  for ext in exts:
+    ROOT.gPad.SaveAs(name + "." + ext)
 
 def ResetLegend(lgd, xlow, ylow, xup, yup):
   lgd.Clear()
@@ -161,56 +240,106 @@ def ResetLegend(lgd, xlow, ylow, xup, yup):
   lgd.SetY1NDC(ylow)
   lgd.SetY2NDC(yup)
 
-def H2ProjectionX(hname, h2, ylow, yup):
+def H2ProjectionX(hname, h2, ylow, yup, index = False):
+  """index - project from summed-area table in O(nx), see integral_index
+    True: cached table, built in O(ncells) on first use and after Fill
+    IntegralIndex of h2: no lookup, O(nx) per call
+    For arrays of windows use H2ProjectionBands
+  """
   yBinLow = h2.GetYaxis().FindBin(ylow)
   yBinUp = h2.GetYaxis().FindBin(yup)
   if(yup > h2.GetYaxis().GetBinCenter(yBinUp)):
     yBinUp -= 1
-  return h2.ProjectionX(hname, yBinLow, yBinUp)
+  if(not index):
+    return h2.ProjectionX(hname, yBinLow, yBinUp)
+  content, sumw2 = integral_index(h2 if index is True else index).band_x(yBinLow, yBinUp)
+  return band_hist(hname, h2, content[0], sumw2[0])
+
+def H2ProjectionBands(h2, ylows, yups):
+  """ProjectionX contents and errors for arrays of Y windows as H2ProjectionX
+  One O(ncells) build (cached), then O(nx) per window
+  Return arrays [window, X bin with flow]
+  """
+  index = integral_index(h2)
+  yaxis = h2.GetYaxis()
+  yBinLow = axis_bins(yaxis, ylows)
+  yBinUp = axis_bins(yaxis, yups)
+  yBinUp = np.where(np.asarray(yups) > axis_bin_centers(yaxis, yBinUp), yBinUp - 1, yBinUp)
+  content, sumw2 = index.band_x(yBinLow, yBinUp)
+  return content, np.sqrt(np.abs(sumw2))
+
+def band_hist(hname, h2, content, sumw2):
+  """TH1D with X binning of h2 from projection arrays (flow included)
+  """
+  xaxis = h2.GetXaxis()
+  edges = axis_edges(xaxis)
+  hist = ROOT.TH1D(hname, h2.GetTitle(), len(edges) - 1, array('d', edges))
+  hist.GetXaxis().SetTitle(xaxis.GetTitle())
+  hist_sumw2(hist)[...] = sumw2
+  hist_content(hist)[...] = content
+  hist.SetEntries(hist.GetEffectiveEntries())
+  return sync_stats(hist)
 
 # Normalize by column
   # X=measured, Y=true
 def ResponseNorm(h2):
-  NX = h2.GetNbinsX()
-  NY = h2.GetNbinsY()
-  for ix in range(1,NX+1):
-    SumY = h2.Integral(ix, ix, 1, NY)
-    if(SumY == 0):
-      continue
-    for iy in range(1, NY+1):
-      val = h2.GetBinContent(ix, iy) / SumY
-      h2.SetBinContent(ix, iy, val)
+  content = hist_content(h2, flow=False)
+  SumY = content.sum(axis=1)
+  cols = SumY != 0
+  content[cols] = content[cols] / SumY[cols, np.newaxis]
+  sync_stats(h2)
   return h2
 # Input: TH1, Int_t
 # Deprecated: use TH1/2::Scale(1./TH::Integral('width'))
 def HistNorm(hist, NEv = 0):
   if(NEv == 0):
     NEv = hist.GetEntries()
-  for i in range(1, hist.GetNbinsX() + 1):
-    factor = NEv * hist.GetBinWidth(i)
-    err = hist.GetBinError(i)
-    hist.SetBinContent(i, hist.GetBinContent(i) / factor)
-    hist.SetBinError(i,  err / factor)
+  factor = NEv * axis_widths(hist.GetXaxis())
+  sumw2 = hist_sumw2(hist, flow=False) # before contents, Sumw2() copies them
+  content = hist_content(hist, flow=False)
+  content[:] = content / factor
+  sumw2[:] = sumw2 / factor**2
+  sync_stats(hist)
   return hist
 
-def HistCount(hist, xlow, xup, err = None):
+def HistCount(hist, xlow, xup, err = None, index = False):
+  """Integral of bins in [xlow, xup], error stored in err (ctypes.c_double)
+  index - from prefix sums, see integral_index
+    True: cached sums, built in O(ncells) on first use and after Fill,
+    slower than TH1::Integral for a single window
+    IntegralIndex of hist: no lookup, O(1) per call
+    For arrays of windows use HistCounts
+  """
+  if(index):
+    value, error = integral_index(hist if index is True else index).integral_x(xlow, xup)
+    if(err is not None):
+      err.value = float(error)
+    return float(value)
   xBinLow = hist.FindBin(xlow)
   xBinUp  = hist.FindBin(xup)
   # x_up on the edge of bin
   if(hist.GetBinCenter(xBinUp) > xup):
     xBinUp -= 1
-  if(not err):
+  if(err is None): # c_double(0.) is falsy
     return hist.Integral(xBinLow, xBinUp)
   else:
     return hist.IntegralAndError(xBinLow, xBinUp, err)
 
-def SetColorAndStyle(obj, c = None, s = None, size = 1.0):
+def HistCounts(hist, xlows, xups):
+  """Integrals and errors for arrays of windows as HistCount, by prefix sums
+  One O(ncells) build (cached), then O(1) per window
+  """
+  return integral_index(hist).integral_x(xlows, xups)
+
+def SetColorAndStyle(obj, c = None, s = None, size = 1.0, context = None):
+  """Next color and marker from context (StyleContext), default module cycles
+  """
   if(c is None):
-    c = next(COLOR)
+    c = context.next_color() if context is not None else next(COLOR)
   obj.SetLineColor(c)
   obj.SetMarkerColor(c)
   if(s is None):
-    s = next(MARKER)
+    s = context.next_marker() if context is not None else next(MARKER)
   obj.SetMarkerStyle(s)
   obj.SetMarkerSize(size)
 
@@ -265,30 +394,16 @@ def PrintOut(canvas, title, printFile, more=False):
     canvas.SaveAs(printFile + '_' + title + '.pdf')
 
 def Rebin2D(h2raw, BINNING_X, BINNING_Y, name='h2new', title='New 2D histograms with user-defined binning', normalize=True):
-  NX_RAW = h2raw.GetNbinsX()
-  x_raw = h2raw.GetXaxis()
-  NY_RAW = h2raw.GetNbinsY()
-  y_raw = h2raw.GetYaxis()
-  NX = len(BINNING_X) - 1
-  BINNING_X_input = array('d', BINNING_X)
-  NY = len(BINNING_Y) - 1
-  BINNING_Y_input = array('d', BINNING_Y)
-  # Histogram - NEW
-  h2 = ROOT.TH2D(name, title, NX, BINNING_X_input, NY, BINNING_Y_input)
-  x = h2.GetXaxis()
-  y = h2.GetXaxis()
-  # 2D bin content
-    # TH1 bin index from 1 to N
-  for i in range(1, NX_RAW +1, 1):
-    for j in range(1, NY_RAW +1, 1):
-      val = h2raw.GetBinContent(i,j)
-      h2.Fill(x_raw.GetBinCenter(i), y_raw.GetBinCenter(j), val)
+  h2 = rebin_2d(h2raw, BINNING_X, BINNING_Y, name, title)
     # Normalized with bin area and all events
-  for i in range(1, NX+1, 1):
-    for j in range(1, NY+1, 1):
-      val = h2.GetBinContent(i,j)
-      val /= x.GetBinWidth(i) * y.GetBinWidth(j) * h2raw.GetSum()
-      h2.SetBinContent(i, j, val)
+  if(normalize):
+    area = np.outer(axis_widths(h2.GetXaxis()), axis_widths(h2.GetYaxis()))
+    factor = area * h2raw.GetSum()
+    content = hist_content(h2, flow=False)
+    sumw2 = hist_sumw2(h2, flow=False)
+    content[...] = content / factor
+    sumw2[...] = sumw2 / factor**2
+    sync_stats(h2)
   return h2
 
 if __name__ == '__main__':
@@ -0,0 +1,187 @@
+# Ratio, difference and pull of histograms and graphs, computed on arrays
+
+# Basic Usage:
+# padMain, padRatio = NewRatioPads(c, 'main', 'ratio')
+# ... draw data and MC on padMain ...
+# graph, line = DrawRatioPanel(padRatio, hData, hMC, errors='poisson')
+
+# Points of both inputs are read as NumPy arrays (bin buffers of TH1,
+# X/Y/error buffers of TGraph), combined in one vectorized pass, and the
+# lower-panel TGraphAsymmErrors is built from the arrays directly, without
+# TH1::Divide or intermediate clones.
+
+import ROOT
+import numpy as np
+from root_plot.array_util import hist_content, hist_errors, axis_edges
+
+try:
+  from scipy.special import gammaincinv
+except ImportError:
+  gammaincinv = None
+
+RATIO_MODES = ('ratio', 'diff', 'pull')
+ERROR_MODES = ('uncorrelated', 'binomial', 'poisson')
+
+def _graph_buffer(ptr, n):
+  if not ptr: return np.zeros(n)
+  return np.array(np.frombuffer(ptr, dtype=np.float64, count=n))
+
+def points(obj):
+  """Arrays x, exl, exh, y, eyl, eyh of TH1 bins (no flow) or TGraph points
+  """
+  if obj.InheritsFrom('TH1'):
+    if obj.GetDimension() != 1:
+      raise TypeError(f'{obj.GetName()} : ratio of {obj.GetDimension()}D histogram not supported')
+    edges = axis_edges(obj.GetXaxis())
+    x = 0.5 * (edges[1:] + edges[:-1])
+    ex = 0.5 * np.diff(edges)
+    y = np.array(hist_content(obj, flow=False), dtype=np.float64)
+    ey = hist_errors(obj, flow=False)
+    return x, ex, ex.copy(), y, ey, ey.copy()
+  n = obj.GetN()
+  x, y = _graph_buffer(obj.GetX(), n), _graph_buffer(obj.GetY(), n)
+  if obj.InheritsFrom('TGraphAsymmErrors'):
+    return (x, _graph_buffer(obj.GetEXlow(), n), _graph_buffer(obj.GetEXhigh(), n),
+      y, _graph_buffer(obj.GetEYlow(), n), _graph_buffer(obj.GetEYhigh(), n))
+  ex, ey = _graph_buffer(obj.GetEX(), n), _graph_buffer(obj.GetEY(), n)
+  return x, ex, ex.copy(), y, ey, ey.copy()
+
+def check_binning(num, den):
+  """Raise ValueError unless TH1 num and den have the same X bin edges
+  (bins are paired by index), no check if either is a TGraph
+  """
+  if not (num.InheritsFrom('TH1') and den.InheritsFrom('TH1')):
+    return
+  edgesNum, edgesDen = axis_edges(num.GetXaxis()), axis_edges(den.GetXaxis())
+  if len(edgesNum) != len(edgesDen) or not np.allclose(edgesNum, edgesDen, rtol=1e-9, atol=0.):
+    raise ValueError(f'{num.GetName()} vs. {den.GetName()} : different binning, {len(edgesNum) - 1} and {len(edgesDen) - 1} bins in [{edgesNum[0]}, {edgesNum[-1]}] and [{edgesDen[0]}, {edgesDen[-1]}]')
+
+def values_at(obj, x):
+  """Values and errors of obj at x: bin content for TH1, points for TGraph
+  For TH1 vs. TH1, check_binning first, bins are found by center x
+  """
+  if obj.InheritsFrom('TH1'):
+    edges = axis_edges(obj.GetXaxis())
+    ibin = np.searchsorted(edges, x, side='right') # 0 underflow, nbins+1 overflow
+    content = np.asarray(hist_content(obj), dtype=np.float64)
+    return content[ibin], hist_errors(obj)[ibin]
+  _, _, _, y, eyl, eyh = points(obj)
+  if len(y) != len(x):
+    raise ValueError(f'{obj.GetName()} : {len(y)} points, expected {len(x)}')
+  return y, 0.5 * (eyl + eyh)
+
+def poisson_interval(n, level=0.683):
+  """Garwood central interval (lower, upper) of Poisson counts n, arrays
+  Each distinct n is evaluated once without SciPy
+  Raise ValueError if n are not non-negative integers (weighted or
+  normalised histograms), use stored errors ('uncorrelated') for those
+  """
+  n = np.asarray(n, dtype=np.float64)
+  counts = np.isfinite(n) & (n >= 0) & (n == np.round(n))
+  if not counts.all():
+    raise ValueError(f'Poisson interval needs raw counts, got {n[~counts][:3].tolist()} - weighted or normalised input, use errors=\'uncorrelated\'')
+  alpha = (1. - level) / 2.
+  lower = np.zeros(n.shape)
+  positive = n > 0
+  if gammaincinv is not None:
+    lower[positive] = gammaincinv(n[positive], alpha)
+    upper = gammaincinv(n + 1., 1. - alpha)
+    return lower, upper
+  values, inverse = np.unique(n, return_inverse=True)
+  inverse = inverse.reshape(n.shape)
+  low = np.array([ROOT.Math.gamma_quantile(alpha, v, 1.) if v > 0 else 0. for v in values.tolist()])
+  up = np.array([ROOT.Math.gamma_quantile_c(alpha, v + 1., 1.) for v in values.tolist()])
+  return low[inverse], up[inverse]
+
+def ratio_arrays(yn, eyn, yd, eyd, mode='ratio', errors='uncorrelated', eynHigh=None, level=0.683):
+  """Values and (lower, upper) errors of numerator vs. denominator arrays
+
+  mode - 'ratio' n/d, 'diff' n-d, 'pull' (n-d)/sigma (no error bars)
+  errors - 'uncorrelated' (Gaussian, both errors),
+    'binomial' (n subset of d, as TH1::Divide option B),
+    'poisson' (asymmetric Garwood interval of counts n, d as expectation,
+      n must be unweighted integer counts)
+  eynHigh - upper numerator errors if asymmetric, default eyn
+  Points with d = 0 (ratio) or sigma = 0 (pull) are NaN
+  """
+  if mode not in RATIO_MODES:
+    raise ValueError(f'Unknown mode : {mode}, expected one of {RATIO_MODES}')
+  if errors not in ERROR_MODES:
+    raise ValueError(f'Unknown errors : {errors}, expected one of {ERROR_MODES}')
+  yn, eyn, yd, eyd = [np.asarray(a, dtype=np.float64) for a in (yn, eyn, yd, eyd)]
+  eynHigh = eyn if eynHigh is None else np.asarray(eynHigh, dtype=np.float64)
+  if errors == 'poisson':
+    low, up = poisson_interval(yn, level)
+    eyn, eynHigh = yn - low, up - yn
+  with np.errstate(divide='ignore', invalid='ignore'):
+    if mode == 'ratio':
+      value = np.where(yd != 0, yn / yd, np.nan)
+      if errors == 'binomial':
+        err = np.sqrt(np.abs(((1. - 2. * value) * eyn**2 + value**2 * eyd**2) / yd**2))
+        return value, err, err
+      if errors == 'poisson': # denominator as expectation
+        return value, eyn / np.abs(yd), eynHigh / np.abs(yd)
+      errLow = np.sqrt(eyn**2 * yd**2 + eyd**2 * yn**2) / yd**2
+      errHigh = np.sqrt(eynHigh**2 * yd**2 + eyd**2 * yn**2) / yd**2
+      return value, errLow, errHigh
+    diff = yn - yd
+    # errors toward the denominator: upper numerator error if n < d
+    sigmaN = np.where(diff < 0, eynHigh, eyn)
+    if errors == 'binomial':
+      sigma = np.sqrt(np.abs(eyd**2 - eyn**2))
+    else:
+      sigma = np.sqrt(sigmaN**2 + eyd**2)
+    if mode == 'diff':
+      if errors == 'binomial':
+        return diff, sigma, sigma
+      return diff, np.sqrt(eyn**2 + eyd**2), np.sqrt(eynHigh**2 + eyd**2)
+    value = np.where(sigma > 0, diff / sigma, np.nan)
+    zeros = np.zeros(value.shape)
+    return value, zeros, zeros
+
+def ratio_graph(num, den, mode='ratio', errors='uncorrelated', name=None, level=0.683):
+  """TGraphAsymmErrors of num vs. den (TH1 or TGraph), built from arrays
+
+  Points of num are kept, den is taken at the same x (bin content for TH1,
+  same binning required if num is a TH1 too).
+  Undefined points (zero denominator or sigma) are skipped.
+  """
+  check_binning(num, den)
+  x, exl, exh, yn, eynl, eynh = points(num)
+  yd, eyd = values_at(den, x)
+  value, errLow, errHigh = ratio_arrays(yn, eynl, yd, eyd, mode, errors, eynh, level)
+  valid = np.isfinite(value)
+  columns = [np.ascontiguousarray(a[valid], dtype=np.float64) for a in (x, value, exl, exh, errLow, errHigh)]
+  graph = ROOT.TGraphAsymmErrors(int(valid.sum()), *columns)
+  graph.SetName(name or f'{num.GetName()}_{mode}_{den.GetName()}')
+  graph.SetTitle('')
+  graph.GetXaxis().SetTitle(num.GetXaxis().GetTitle())
+  graph.GetYaxis().SetTitle({'ratio': 'Ratio', 'diff': 'Difference', 'pull': 'Pull'}[mode])
+  return graph
+
+def DrawRatioPanel(padRatio, num, den, mode='ratio', errors='uncorrelated', rmin=None, rmax=None, ytitle=None, option='PZ'):
+  """Draw ratio/diff/pull of num vs. den on the lower pad of NewRatioPads
+  with a reference line at 1 (ratio) or 0, styled by SetRatioPlot
+  Return (graph, line), keep them alive until the pad is printed
+  """
+  from root_plot.plot_util import SetRatioPlot
+  graph = ratio_graph(num, den, mode, errors)
+  if ytitle: graph.GetYaxis().SetTitle(ytitle)
+  ref = 1. if mode == 'ratio' else 0.
+  if rmin is None: rmin = {'ratio': 0.5, 'diff': None, 'pull': -5.}[mode]
+  if rmax is None: rmax = {'ratio': 1.5, 'diff': None, 'pull': 5.}[mode]
+  padRatio.cd()
+  if num.InheritsFrom('TH1'):
+    xmin, xmax = num.GetXaxis().GetXmin(), num.GetXaxis().GetXmax()
+    graph.GetXaxis().SetLimits(xmin, xmax)
+  else:
+    xmin, xmax = graph.GetXaxis().GetXmin(), graph.GetXaxis().GetXmax()
+  if rmin is None or rmax is None: # diff, symmetric range around 0
+    bound = 1.1 * max(abs(graph.GetHistogram().GetMinimum()), abs(graph.GetHistogram().GetMaximum()), 1e-9)
+    rmin, rmax = -bound, bound
+  SetRatioPlot(graph, rmin, rmax)
+  graph.Draw(f'A{option}')
+  line = ROOT.TLine(xmin, ref, xmax, ref)
+  line.SetLineStyle(2)
+  line.Draw()
+  return graph, line
@@ -0,0 +1,192 @@
+# Rebinning of TH1/TH2 to variable-width target edges
+
+# Source bins are assigned to target bins by bin center, as TH1::Fill
+# would do. The source-to-target map is built once by sorted-edge search
+# and cached by axis signature, so histograms sharing the same axes are
+# rebinned by one vectorized accumulation of contents and errors.
+
+import ROOT
+import numpy as np
+from array import array
+from root_plot.array_util import hist_content, hist_sumw2, axis_edges, axis_centers, sync_stats
+
+BIN_MAP_CACHE_SIZE = 256
+_BIN_MAP_CACHE = {}
+
+def axis_signature(axis):
+  """Hashable key of TAxis binning
+  """
+  if axis.GetXbins().GetSize() == 0: # fixed bin width
+    return (axis.GetNbins(), axis.GetXmin(), axis.GetXmax())
+  return axis_edges(axis).tobytes()
+
+def _cache_get(key, build):
+  index = _BIN_MAP_CACHE.get(key)
+  if index is None:
+    if len(_BIN_MAP_CACHE) >= BIN_MAP_CACHE_SIZE:
+      _BIN_MAP_CACHE.pop(next(iter(_BIN_MAP_CACHE))) # oldest
+    index = build()
+    _BIN_MAP_CACHE[key] = index
+  return index
+
+def bin_map(axis, edges):
+  """Target bin index of each source bin, under/overflow included
+
+  Source underflow/overflow go to target underflow/overflow,
+  source bins with center outside of edges go to target underflow/overflow
+  """
+  edges = np.asarray(edges, dtype=np.float64)
+  def build():
+    index = np.empty(axis.GetNbins() + 2, dtype=np.intp)
+    index[0] = 0
+    index[-1] = len(edges)
+    index[1:-1] = np.searchsorted(edges, axis_centers(axis), side='right')
+    return index
+  return _cache_get(('x', axis_signature(axis), edges.tobytes()), build)
+
+def bin_map_2d(xaxis, xedges, yaxis, yedges):
+  """Flat target cell index of each source cell [ix, iy]
+  """
+  xedges = np.asarray(xedges, dtype=np.float64)
+  yedges = np.asarray(yedges, dtype=np.float64)
+  def build():
+    xmap = bin_map(xaxis, xedges)
+    ymap = bin_map(yaxis, yedges)
+    return (xmap[:, np.newaxis] * (len(yedges) + 1) + ymap[np.newaxis, :]).ravel()
+  key = ('xy', axis_signature(xaxis), xedges.tobytes(), axis_signature(yaxis), yedges.tobytes())
+  return _cache_get(key, build)
+
+def clear_bin_map_cache():
+  _BIN_MAP_CACHE.clear()
+
+def _source_arrays(hist):
+  content = hist_content(hist).astype(np.float64)
+  sumw2 = hist_sumw2(hist, create=False)
+  if sumw2 is None:
+    sumw2 = np.abs(content)
+  return content, sumw2
+
+def _fill_target(hnew, hist, content, sumw2):
+  hist_sumw2(hnew)[...] = sumw2
+  hist_content(hnew)[...] = content
+  hnew.SetEntries(hist.GetEntries())
+  return sync_stats(hnew)
+
+def rebin_1d(hist, edges, name=None, title=None):
+  """Rebin TH1 to new edges, return new TH1D
+  """
+  edges = np.asarray(edges, dtype=np.float64)
+  nbins = len(edges) - 1
+  index = bin_map(hist.GetXaxis(), edges)
+  content, sumw2 = _source_arrays(hist)
+  hnew = ROOT.TH1D(name or f'{hist.GetName()}_rebin', title or hist.GetTitle(),
+    nbins, array('d', edges))
+  hnew.GetXaxis().SetTitle(hist.GetXaxis().GetTitle())
+  hnew.GetYaxis().SetTitle(hist.GetYaxis().GetTitle())
+  return _fill_target(hnew, hist,
+    np.bincount(index, weights=content, minlength=nbins + 2),
+    np.bincount(index, weights=sumw2, minlength=nbins + 2))
+
+def rebin_2d(h2, xedges, yedges, name=None, title=None):
+  """Rebin TH2 to new X/Y edges, return new TH2D
+  """
+  xedges = np.asarray(xedges, dtype=np.float64)
+  yedges = np.asarray(yedges, dtype=np.float64)
+  nx, ny = len(xedges) - 1, len(yedges) - 1
+  index = bin_map_2d(h2.GetXaxis(), xedges, h2.GetYaxis(), yedges)
+  content, sumw2 = _source_arrays(h2)
+  hnew = ROOT.TH2D(name or f'{h2.GetName()}_rebin', title or h2.GetTitle(),
+    nx, array('d', xedges), ny, array('d', yedges))
+  hnew.GetXaxis().SetTitle(h2.GetXaxis().GetTitle())
+  hnew.GetYaxis().SetTitle(h2.GetYaxis().GetTitle())
+  hnew.GetZaxis().SetTitle(h2.GetZaxis().GetTitle())
+  ncells = (nx + 2) * (ny + 2)
+  shape = (nx + 2, ny + 2)
+  return _fill_target(hnew, h2,
+    np.bincount(index, weights=content.ravel(), minlength=ncells).reshape(shape),
+    np.bincount(index, weights=sumw2.ravel(), minlength=ncells).reshape(shape))
+
+LOD_REDUCTIONS = ('sum', 'mean', 'max')
+
+def has_bin_labels(hist):
+  """True if any axis of hist has alphanumeric bin labels
+  """
+  return any(axis.GetLabels() for axis in (hist.GetXaxis(), hist.GetYaxis(), hist.GetZaxis()))
+
+def copy_draw_attributes(src, dst):
+  """Copy drawing attributes of histogram src to its rebinned copy dst:
+  line, fill and marker, axis styles and user ranges, minimum and maximum,
+  user contours and draw option (bin labels are not mapped)
+  """
+  for attr in (ROOT.TAttLine, ROOT.TAttFill, ROOT.TAttMarker):
+    attr.Copy(src, dst)
+  for srcAxis, dstAxis in zip((src.GetXaxis(), src.GetYaxis(), src.GetZaxis()),
+      (dst.GetXaxis(), dst.GetYaxis(), dst.GetZaxis())):
+    ROOT.TAttAxis.Copy(srcAxis, dstAxis)
+    dstAxis.SetTitle(srcAxis.GetTitle())
+    if srcAxis.TestBit(ROOT.TAxis.kAxisRange):
+      # coarse bins holding the first and last displayed source bin
+      dstAxis.SetRange(dstAxis.FindFixBin(srcAxis.GetBinCenter(srcAxis.GetFirst())),
+        dstAxis.FindFixBin(srcAxis.GetBinCenter(srcAxis.GetLast())))
+  if src.GetMinimumStored() != -1111:
+    dst.SetMinimum(src.GetMinimumStored())
+  if src.GetMaximumStored() != -1111:
+    dst.SetMaximum(src.GetMaximumStored())
+  if src.TestBit(ROOT.TH1.kUserContour):
+    ncont = src.GetContour()
+    dst.SetContour(ncont, array('d', [src.GetContourLevel(i) for i in range(ncont)]))
+  dst.SetOption(src.GetOption())
+  dst.SetStats(not src.TestBit(ROOT.TH1.kNoStats))
+  return dst
+
+def group_edges(edges, factor):
+  """Edges of groups of factor neighbouring bins, last group partial if
+  factor does not divide the number of bins
+  """
+  coarse = edges[::factor]
+  if coarse[-1] != edges[-1]:
+    coarse = np.append(coarse, edges[-1])
+  return coarse
+
+def downsample_2d(h2, maxX, maxY, reduce='sum', name=None):
+  """Merge blocks of neighbouring bins of TH2 to at most maxX x maxY bins
+
+  reduce - value of a block, 'sum' (errors propagated, as rebin_2d),
+    'mean' or 'max' of its source bins (flow bins dropped)
+  Return new TH2D, or h2 itself if already small enough
+  """
+  if reduce not in LOD_REDUCTIONS:
+    raise ValueError(f'Unknown reduction : {reduce}, expected one of {LOD_REDUCTIONS}')
+  nx, ny = h2.GetNbinsX(), h2.GetNbinsY()
+  fx, fy = -(-nx // max(1, maxX)), -(-ny // max(1, maxY))
+  if fx <= 1 and fy <= 1:
+    return h2
+  xedges = group_edges(axis_edges(h2.GetXaxis()), fx)
+  yedges = group_edges(axis_edges(h2.GetYaxis()), fy)
+  name = name or f'{h2.GetName()}_lod'
+  if reduce == 'sum':
+    return rebin_2d(h2, xedges, yedges, name)
+  mx, my = len(xedges) - 1, len(yedges) - 1
+  content, sumw2 = _source_arrays(h2)
+  fill = 0. if reduce == 'mean' else -np.inf
+  blocks = np.full((mx * fx, my * fy), fill)
+  blocks[:nx, :ny] = content[1:-1, 1:-1]
+  blocks = blocks.reshape(mx, fx, my, fy)
+  target = np.zeros((mx + 2, my + 2))
+  targetSumw2 = np.zeros((mx + 2, my + 2))
+  if reduce == 'mean':
+    counts = np.zeros((mx * fx, my * fy))
+    counts[:nx, :ny] = 1.
+    counts = counts.reshape(mx, fx, my, fy).sum(axis=(1, 3))
+    errors = np.zeros((mx * fx, my * fy))
+    errors[:nx, :ny] = sumw2[1:-1, 1:-1]
+    target[1:-1, 1:-1] = blocks.sum(axis=(1, 3)) / counts
+    targetSumw2[1:-1, 1:-1] = errors.reshape(mx, fx, my, fy).sum(axis=(1, 3)) / counts**2
+  else:
+    target[1:-1, 1:-1] = blocks.max(axis=(1, 3))
+    targetSumw2[1:-1, 1:-1] = np.abs(target[1:-1, 1:-1])
+  hnew = ROOT.TH2D(name, h2.GetTitle(), mx, array('d', xedges), my, array('d', yedges))
+  hnew.GetXaxis().SetTitle(h2.GetXaxis().GetTitle())
+  hnew.GetYaxis().SetTitle(h2.GetYaxis().GetTitle())
+  hnew.GetZaxis().SetTitle(h2.GetZaxis().GetTitle())
+  return _fill_target(hnew, h2, target, targetSumw2)
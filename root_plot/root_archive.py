@@ -0,0 +1,104 @@
+# Compressed ROOT file for Painter.save_obj
+
+# Basic Usage:
+# archive = RootArchive('report.root', algorithm='zstd', level=5, perPage=True)
+# archive.add(hist, dirName='page_0001') # written now
+# archive.close()
+
+# By default objects are written when added, so the file holds their state
+# at that call, and all keys are at top level as with TObject::Write
+# (repeated names add cycles); with perPage each page gets its own
+# directory, written with kOverwrite so that repeated names replace the key
+# instead of adding a new cycle. With buffered, objects are kept alive and
+# written at flush (page end) in one pass: the file then holds their state
+# at flush, not at add. Bytes written and time spent in I/O are accounted.
+
+import time
+
+import ROOT
+
+COMPRESSION_ALGORITHMS = {'global': 0, 'zlib': 1, 'lzma': 2, 'lz4': 4, 'zstd': 5}
+
+def compression_settings(algorithm='zstd', level=5):
+  """ROOT compression settings integer, 100 * algorithm + level
+  """
+  if algorithm not in COMPRESSION_ALGORITHMS:
+    raise ValueError(f'Unknown compression algorithm : {algorithm}, expected one of {tuple(COMPRESSION_ALGORITHMS)}')
+  return 100 * COMPRESSION_ALGORITHMS[algorithm] + level
+
+class RootArchive:
+  """ROOT file with objects written at once or buffered per page directory
+
+  algorithm, level - compression, see COMPRESSION_ALGORITHMS, level 0-9
+  perPage - one TDirectory per page, otherwise all keys at top level (default)
+  buffered - write at flush instead of add, objects archived in their state at flush
+  """
+  def __init__(self, path, algorithm='zstd', level=5, perPage=False, buffered=False):
+    self.path = path
+    self.perPage = perPage
+    self.buffered = buffered
+    self.settings = compression_settings(algorithm, level)
+    with ROOT.TDirectory.TContext(): # keep gDirectory
+      self.file = ROOT.TFile(path, 'RECREATE', '', self.settings)
+    if not self.file or self.file.IsZombie():
+      raise OSError(f'Cannot create ROOT file : {path}')
+    self.buffer = []
+    self.nobjs = 0
+    self.nflush = 0
+    self.ioTime = 0.
+    self.bytesWritten = 0
+  def __len__(self):
+    return len(self.buffer)
+  def add(self, obj, name=None, dirName=''):
+    """Write obj (or list of objects) into dirName, or buffer it until the next flush
+    """
+    if self.file is None:
+      print(f'[X] Warning  - ROOT archive {self.path} closed, object not saved')
+      return
+    objs = [(tobj, None) for tobj in obj] if type(obj) is list else [(obj, name)]
+    if self.buffered:
+      self.buffer += objs
+    else:
+      self.write(objs, dirName)
+  def flush(self, dirName='', title=''):
+    """Write buffered objects into dirName (created if needed), return bytes written
+    """
+    if not self.buffer or self.file is None:
+      return 0
+    nbytes = self.write(self.buffer, dirName, title)
+    self.nflush += 1
+    self.buffer = []
+    return nbytes
+  def write(self, objs, dirName='', title=''):
+    """Write list of (obj, name) into dirName, return bytes written
+    """
+    start = time.perf_counter()
+    nbytes = self.file.GetBytesWritten()
+    with ROOT.TDirectory.TContext():
+      tdir = self.file
+      option = '' # flat, new cycle per write as TObject::Write
+      if self.perPage and dirName:
+        tdir = self.file.GetDirectory(dirName) or self.file.mkdir(dirName, title)
+        option = 'Overwrite'
+      for obj, name in objs:
+        tdir.WriteTObject(obj, name or obj.GetName(), option)
+    self.nobjs += len(objs)
+    self.ioTime += time.perf_counter() - start
+    return self.file.GetBytesWritten() - nbytes
+  def stats(self):
+    return {'path': self.path, 'objects': self.nobjs, 'flushes': self.nflush,
+      'bytes': self.file.GetBytesWritten() if self.file is not None else self.bytesWritten,
+      'ioTime': self.ioTime, 'compression': self.settings}
+  def close(self, dirName=''):
+    """Flush remaining objects into dirName, close the file and print summary
+    """
+    if self.file is None: return
+    self.flush(dirName)
+    start = time.perf_counter()
+    self.file.Close()
+    self.ioTime += time.perf_counter() - start
+    self.bytesWritten = self.file.GetBytesWritten()
+    self.file = None
+    stats = self.stats()
+    batches = f' in {stats["flushes"]} batches' if self.buffered else ''
+    print(f'[-] INFO - ROOT objects saved to {self.path} - {stats["objects"]} objects{batches}, {stats["bytes"] / 1024**2:.2f} MB, I/O {stats["ioTime"]:.2f} s')
@@ -0,0 +1,251 @@
+# Columnar snapshot of histograms in ROOT files, for fast re-plotting
+
+# Basic Usage:
+# cache = SnapshotCache('.snapshots')
+# for path, obj in cache.walk('run.root', include=['QA/*']):
+#   p.DrawHist(obj)
+
+# On first use the source file is read once, and bin edges, contents and
+# sum of squared weights of every TH1/TH2/TH3 are appended to raw float64
+# columns (edges.f8, content.f8, sumw2.f8) as the file is walked, so memory
+# stays bounded by the largest histogram, with a JSON manifest of offsets
+# and metadata (class, draw attributes, minimum/maximum, axis ranges,
+# contours). Later runs memory-map the columns and rebuild the
+# histograms without opening the source. Other objects (TGraph, TProfile)
+# and histograms with bin labels or attached functions are copied as they
+# are into a small local objects.root. A snapshot is rebuilt when mtime or
+# size of the source file changes.
+
+import os, re, json, shutil, hashlib
+from array import array
+
+import numpy as np
+import ROOT
+from root_plot.array_util import hist_to_arrays, arrays_to_hist
+from root_plot.file_util import match_path, open_file, walk_file, detach
+from root_plot.rebin_util import has_bin_labels
+
+SNAPSHOT_VERSION = 3 # bump when the layout changes
+COLUMNS = ('edges', 'content', 'sumw2')
+COLUMN_DTYPE = np.dtype('<f8')
+COLUMNAR_CLASSES = re.compile(r'^TH[123][DFISL]$') # plain histograms, rebuilt as same class (TH1C to objects.root)
+
+def source_signature(source):
+  stat = os.stat(source)
+  return {'source': os.path.abspath(source), 'mtime': stat.st_mtime_ns, 'size': stat.st_size,
+    'version': SNAPSHOT_VERSION}
+
+def columnar(hist):
+  """True if hist can be stored as plain arrays and rebuilt identically:
+  TH1/TH2/TH3 of a standard class, without bin labels or attached functions
+  """
+  if not COLUMNAR_CLASSES.match(hist.ClassName()):
+    return False
+  functions = hist.GetListOfFunctions()
+  return not has_bin_labels(hist) and not (functions and functions.GetSize() > 0)
+
+def draw_attributes(hist):
+  """Plain dict of draw attributes of hist, restored by set_draw_attributes
+  """
+  attrs = {
+    'line': [hist.GetLineColor(), hist.GetLineStyle(), hist.GetLineWidth()],
+    'fill': [hist.GetFillColor(), hist.GetFillStyle()],
+    'marker': [hist.GetMarkerColor(), hist.GetMarkerStyle(), hist.GetMarkerSize()],
+    'minimum': hist.GetMinimumStored(), 'maximum': hist.GetMaximumStored(),
+    'option': hist.GetOption(), 'stats': not hist.TestBit(ROOT.TH1.kNoStats),
+    'ranges': [], 'contour': None,
+  }
+  for axis in [hist.GetXaxis(), hist.GetYaxis(), hist.GetZaxis()][:hist.GetDimension()]:
+    attrs['ranges'].append([axis.GetFirst(), axis.GetLast()] if axis.TestBit(ROOT.TAxis.kAxisRange) else None)
+  if hist.TestBit(ROOT.TH1.kUserContour):
+    attrs['contour'] = [hist.GetContourLevel(i) for i in range(hist.GetContour())]
+  return attrs
+
+def set_draw_attributes(hist, attrs):
+  lineColor, lineStyle, lineWidth = attrs['line']
+  fillColor, fillStyle = attrs['fill']
+  markerColor, markerStyle, markerSize = attrs['marker']
+  hist.SetLineColor(lineColor)
+  hist.SetLineStyle(lineStyle)
+  hist.SetLineWidth(lineWidth)
+  hist.SetFillColor(fillColor)
+  hist.SetFillStyle(fillStyle)
+  hist.SetMarkerColor(markerColor)
+  hist.SetMarkerStyle(markerStyle)
+  hist.SetMarkerSize(markerSize)
+  hist.SetMinimum(attrs['minimum'])
+  hist.SetMaximum(attrs['maximum'])
+  hist.SetOption(attrs['option'])
+  hist.SetStats(attrs['stats'])
+  for axis, binRange in zip([hist.GetXaxis(), hist.GetYaxis(), hist.GetZaxis()], attrs['ranges']):
+    if binRange is not None:
+      axis.SetRange(*binRange)
+  if attrs['contour'] is not None:
+    hist.SetContour(len(attrs['contour']), array('d', attrs['contour']))
+  return hist
+
+def load_column(path):
+  """Read-only memory map of a raw float64 column (empty file allowed)
+  """
+  if os.path.getsize(path) == 0:
+    return np.zeros(0, dtype=COLUMN_DTYPE)
+  return np.memmap(path, dtype=COLUMN_DTYPE, mode='r')
+
+class SnapshotCache:
+  """Snapshots of ROOT files in cacheDir, one sub-directory per source and classes
+  """
+  def __init__(self, cacheDir='.snapshots', classes=('TH1', 'TGraph')):
+    self.cacheDir = cacheDir
+    self.classes = list(classes)
+    os.makedirs(cacheDir, exist_ok=True)
+    self.manifests = {}
+    self.index = {}
+    self.columns = {}
+    self.objFiles = {}
+    self.hits = 0
+    self.misses = 0
+  def entry_dir(self, source):
+    key = hashlib.sha1(f'{os.path.abspath(source)}:{self.classes}'.encode()).hexdigest()[:16]
+    return os.path.join(self.cacheDir, f'{os.path.basename(source)}.{key}')
+  def manifest(self, source):
+    """Manifest of a valid snapshot of source, built if missing or outdated
+    """
+    manifest = self.manifests.get(source)
+    if manifest is not None:
+      return manifest
+    entryDir = self.entry_dir(source)
+    manifestPath = os.path.join(entryDir, 'manifest.json')
+    manifest = None
+    if os.path.exists(manifestPath):
+      with open(manifestPath) as f:
+        manifest = json.load(f)
+      if manifest['signature'] != source_signature(source):
+        manifest = None
+    if manifest is None:
+      self.misses += 1
+      manifest = self.build(source)
+    else:
+      self.hits += 1
+    self.manifests[source] = manifest
+    self.index[source] = {meta['path']: meta for meta in manifest['objects']}
+    return manifest
+  def build(self, source):
+    """Read source once and write its snapshot, return manifest
+    """
+    entryDir = self.entry_dir(source)
+    tmpDir = entryDir + '.tmp'
+    shutil.rmtree(tmpDir, ignore_errors=True)
+    os.makedirs(tmpDir)
+    signature = source_signature(source)
+    columns = {name: open(os.path.join(tmpDir, f'{name}.f8'), 'wb') for name in COLUMNS}
+    offsets = {name: 0 for name in COLUMNS}
+    objects = []
+    objFile = None
+    try:
+      for path, obj in walk_file(source, classes=self.classes):
+        meta = {'path': path, 'className': obj.ClassName()}
+        if columnar(obj):
+          data = hist_to_arrays(obj)
+          meta.update(stored='columns', name=data['name'], title=data['title'],
+            axisTitles=data['axisTitles'], entries=data['entries'], attributes=draw_attributes(obj),
+            shape=list(data['content'].shape), nedges=[len(edges) for edges in data['edges']])
+          values = {'edges': np.concatenate(data['edges']), 'content': data['content'].ravel(),
+            'sumw2': data['sumw2'].ravel() if data['sumw2'] is not None else None}
+          for name in COLUMNS:
+            if values[name] is None:
+              meta[name] = None
+              continue
+            meta[name] = offsets[name]
+            columns[name].write(values[name].astype(COLUMN_DTYPE).tobytes())
+            offsets[name] += len(values[name])
+        else:
+          if objFile is None:
+            with ROOT.TDirectory.TContext():
+              objFile = ROOT.TFile(os.path.join(tmpDir, 'objects.root'), 'RECREATE')
+          objFile.WriteTObject(obj, path.replace('/', '__'), 'Overwrite')
+          meta.update(stored='root', key=path.replace('/', '__'))
+        objects.append(meta)
+    finally:
+      for column in columns.values():
+        column.close()
+      if objFile is not None:
+        objFile.Close()
+    manifest = {'signature': signature, 'classes': self.classes, 'objects': objects}
+    with open(os.path.join(tmpDir, 'manifest.json'), 'w') as f:
+      json.dump(manifest, f)
+    shutil.rmtree(entryDir, ignore_errors=True)
+    os.replace(tmpDir, entryDir)
+    self.columns.pop(source, None)
+    self.close_files(source)
+    print(f'[-] INFO - Snapshot of {source} - {len(objects)} objects saved to {entryDir}')
+    return manifest
+  def _columns(self, source):
+    columns = self.columns.get(source)
+    if columns is None:
+      entryDir = self.entry_dir(source)
+      columns = {name: load_column(os.path.join(entryDir, f'{name}.f8')) for name in COLUMNS}
+      self.columns[source] = columns
+    return columns
+  def list(self, source, include=None, exclude=None, classes=None):
+    """List of (path, class name) as file_util.list_file, from the manifest
+    """
+    return [(meta['path'], meta['className']) for meta in self._select(source, include, exclude, classes)]
+  def _select(self, source, include=None, exclude=None, classes=None):
+    for meta in self.manifest(source)['objects']:
+      if not match_path(meta['path'], include, exclude):
+        continue
+      if classes:
+        cl = ROOT.TClass.GetClass(meta['className'])
+        if not (cl and any(cl.InheritsFrom(name) for name in classes)):
+          continue
+      yield meta
+  def _rebuild(self, source, meta):
+    if meta['stored'] == 'root':
+      objFile = self.objFiles.get(source)
+      if objFile is None:
+        objFile = open_file(os.path.join(self.entry_dir(source), 'objects.root'))
+        self.objFiles[source] = objFile
+      return detach(objFile.Get(meta['key']))
+    columns = self._columns(source)
+    edges, start = [], meta['edges']
+    for nedges in meta['nedges']:
+      edges.append(columns['edges'][start:start + nedges])
+      start += nedges
+    size = int(np.prod(meta['shape']))
+    data = {
+      'className': meta['className'],
+      'name': meta['name'], 'title': meta['title'], 'axisTitles': meta['axisTitles'],
+      'entries': meta['entries'], 'edges': edges,
+      'content': columns['content'][meta['content']:meta['content'] + size].reshape(meta['shape']),
+      'sumw2': None if meta['sumw2'] is None else
+        columns['sumw2'][meta['sumw2']:meta['sumw2'] + size].reshape(meta['shape']),
+    }
+    hist = arrays_to_hist(data)
+    hist.SetDirectory(ROOT.nullptr)
+    return set_draw_attributes(hist, meta['attributes'])
+  def get(self, source, path):
+    """Object at path of source, rebuilt from the snapshot
+    """
+    self.manifest(source)
+    meta = self.index[source].get(path)
+    if meta is None:
+      raise KeyError(f'{path} not in snapshot of {source}')
+    return self._rebuild(source, meta)
+  def walk(self, source, include=None, exclude=None, classes=None):
+    """Generator of (path, obj) as file_util.walk_file, from the snapshot
+    Histograms are rebuilt with their class and draw attributes
+    """
+    for meta in list(self._select(source, include, exclude, classes)):
+      yield meta['path'], self._rebuild(source, meta)
+  def close_files(self, source=None):
+    for key in [source] if source else list(self.objFiles):
+      objFile = self.objFiles.pop(key, None)
+      if objFile is not None:
+        objFile.Close()
+  def clear(self):
+    self.close_files()
+    self.manifests.clear()
+    self.index.clear()
+    self.columns.clear()
+    shutil.rmtree(self.cacheDir, ignore_errors=True)
+    os.makedirs(self.cacheDir, exist_ok=True)
@@ -0,0 +1,64 @@
+# Timing instrumentation for Painter entry points
+
+# Cumulative wall time, CPU time and call counts per entry point, and
+# render time and output bytes per page. Methods decorated by @timed
+# are only measured when the owner has a CallStats in self.stats,
+# otherwise the cost is one attribute check.
+
+import time, json, functools
+
+class CallStats:
+  """Structured timing statistics
+  calls - {name: {'count', 'wall', 'cpu'}} (seconds, nested calls inclusive)
+  pages - [{'pageNo', 'title', 'wall', 'cpu', 'bytes'}]
+  """
+  def __init__(self):
+    self.calls = {}
+    self.pages = []
+    self.start = (time.perf_counter(), time.process_time())
+  def add(self, name, wall, cpu):
+    entry = self.calls.setdefault(name, {'count': 0, 'wall': 0., 'cpu': 0.})
+    entry['count'] += 1
+    entry['wall'] += wall
+    entry['cpu'] += cpu
+  def add_page(self, pageNo, title, wall, cpu, nbytes):
+    self.pages.append({'pageNo': pageNo, 'title': title, 'wall': wall, 'cpu': cpu, 'bytes': nbytes})
+  def to_dict(self):
+    return {
+      'total': {
+        'wall': time.perf_counter() - self.start[0],
+        'cpu': time.process_time() - self.start[1],
+      },
+      'calls': self.calls,
+      'pages': self.pages,
+    }
+  def dump_json(self, path):
+    with open(path, 'w') as f:
+      json.dump(self.to_dict(), f, indent=2)
+  def summary(self):
+    lines = [f'{"call":<24} {"count":>7} {"wall [s]":>10} {"cpu [s]":>10}']
+    for name, entry in sorted(self.calls.items(), key=lambda item: -item[1]['wall']):
+      lines.append(f'{name:<24} {entry["count"]:7d} {entry["wall"]:10.3f} {entry["cpu"]:10.3f}')
+    if self.pages:
+      slowest = max(self.pages, key=lambda page: page['wall'])
+      lines.append(f'pages: {len(self.pages)}, {sum(page["bytes"] for page in self.pages) / 1024**2:.1f} MB, '
+        f'slowest page {slowest["pageNo"]} ({slowest["title"]}) {slowest["wall"]:.3f} s')
+    return '\n'.join(lines)
+
+def timed(name=None):
+  """Decorator for methods, record into self.stats if not None
+  """
+  def decorator(method):
+    callName = name or method.__name__
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+      stats = self.stats
+      if stats is None:
+        return method(self, *args, **kwargs)
+      wall, cpu = time.perf_counter(), time.process_time()
+      try:
+        return method(self, *args, **kwargs)
+      finally:
+        stats.add(callName, time.perf_counter() - wall, time.process_time() - cpu)
+    return wrapper
+  return decorator
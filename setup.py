@@ -1,6 +1,7 @@
-import root_plot
-
-from distutils.core import setup
+try:
+  from setuptools import setup
+except ImportError:
+  from distutils.core import setup
 
 setup(
     name="root_plot",
@@ -10,5 +11,7 @@ setup(
     author_email="yatowoo@gmail.com",
     url="https://github.com/yatowoo/RooPlot",
     packages=['root_plot'],
+    package_data={'root_plot': ['langaus.C']},
+    entry_points={'console_scripts': ['root-plot = root_plot.cli:main']},
     license="MIT",
-)
\ No newline at end of file
+)
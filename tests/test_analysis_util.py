@@ -0,0 +1,91 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+ROOT = pytest.importorskip('ROOT')
+
+from root_plot import analysis_util
+from root_plot.analysis_util import (clopper_pearson, clopper_pearson_array, efficiency_simple,
+  show_efficiency, efficiency_array, efficiency_hist)
+
+# (n, k) with k=0, k=n, n=0 and large n
+PAIRS = [(0, 0), (1, 0), (1, 1), (10, 0), (10, 3), (10, 10), (57, 12), (1000, 999), (25000, 1)]
+LEVELS = [0.683, 0.95]
+
+def root_bounds(n, k, level):
+  return (ROOT.TEfficiency.ClopperPearson(n, k, level, False),
+    ROOT.TEfficiency.ClopperPearson(n, k, level, True))
+
+@pytest.fixture(params=['betaincinv', 'beta_quantile'])
+def backend(request, monkeypatch):
+  # SciPy path and ROOT.Math fallback of clopper_pearson_array
+  if request.param == 'betaincinv':
+    if analysis_util.betaincinv is None:
+      pytest.skip('scipy not available')
+  else:
+    monkeypatch.setattr(analysis_util, 'betaincinv', None)
+  return request.param
+
+@pytest.mark.parametrize('level', LEVELS)
+@pytest.mark.parametrize('n, k', PAIRS)
+def test_clopper_pearson_matches_tefficiency(n, k, level):
+  assert clopper_pearson(float(n), float(k), level) == pytest.approx(root_bounds(n, k, level), rel=1e-9, abs=1e-12)
+
+@pytest.mark.parametrize('level', LEVELS)
+def test_clopper_pearson_array_matches_tefficiency(backend, level):
+  nall = np.array([n for n, k in PAIRS] * 2) # repeated pairs evaluated once
+  nsel = np.array([k for n, k in PAIRS] * 2)
+  lower, upper = clopper_pearson_array(nall, nsel, level)
+  assert lower.shape == upper.shape == nall.shape
+  for n, k, low, up in zip(nall, nsel, lower, upper):
+    assert (low, up) == pytest.approx(root_bounds(int(n), int(k), level), rel=1e-9, abs=1e-12), (n, k)
+
+def test_clopper_pearson_array_shapes(backend):
+  nall = np.array([[10., 20.], [0., 5.]])
+  lower, upper = clopper_pearson_array(nall, 5.) # broadcast k
+  assert lower.shape == upper.shape == (2, 2)
+  assert (lower[1, 0], upper[1, 0]) == (0., 1.) # n=0
+  assert upper[1, 1] == 1. # k=n
+  lower, upper = clopper_pearson_array([], [])
+  assert lower.shape == upper.shape == (0,)
+
+@pytest.mark.parametrize('n, k', PAIRS)
+def test_efficiency_simple_four_values(n, k):
+  values = efficiency_simple(k, n)
+  assert len(values) == 4
+  eff, error, lowerError, upperError = values
+  if n < 1: # zeros, also as 4 values
+    assert values == (0., 0., 0., 0.)
+    return
+  low, up = root_bounds(n, k, 0.683)
+  assert eff == pytest.approx(k / n)
+  assert lowerError == pytest.approx(eff - low, abs=1e-12)
+  assert upperError == pytest.approx(up - eff, abs=1e-12)
+  assert error == pytest.approx((lowerError + upperError) / 2., abs=1e-12)
+
+def test_show_efficiency_empty():
+  assert show_efficiency(0, 0) == '0.0^{+0.0}_{-0.0} %'
+
+def test_efficiency_array_matches_efficiency_simple(backend):
+  nall = np.array([n for n, k in PAIRS] + [0.5])
+  nsel = np.array([k for n, k in PAIRS] + [0.])
+  result = efficiency_array(nsel, nall)
+  for i, (k, n) in enumerate(zip(nsel, nall)):
+    assert tuple(values[i] for values in result) == pytest.approx(efficiency_simple(k, n), abs=1e-12)
+
+def test_efficiency_hist(backend):
+  total = ROOT.TH1D('hEffTotal', '', 5, 0., 5.)
+  passed = ROOT.TH1D('hEffPassed', '', 5, 0., 5.)
+  for hist in (total, passed):
+    hist.SetDirectory(ROOT.nullptr)
+  for i, (n, k) in enumerate([(10, 3), (0, 0), (4, 4), (7, 0), (100, 50)]):
+    total.SetBinContent(i + 1, n)
+    passed.SetBinContent(i + 1, k)
+  eff, error, lowerError, upperError = efficiency_hist(passed, total)
+  assert eff.shape == (5,)
+  for i in range(5):
+    expected = efficiency_simple(passed.GetBinContent(i + 1), total.GetBinContent(i + 1))
+    assert (eff[i], error[i], lowerError[i], upperError[i]) == pytest.approx(expected, abs=1e-12)
+  other = ROOT.TH1D('hEffOther', '', 4, 0., 5.)
+  other.SetDirectory(ROOT.nullptr)
+  with pytest.raises(ValueError):
+    efficiency_hist(other, total)
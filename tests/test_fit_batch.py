@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+ROOT = pytest.importorskip('ROOT')
+
+from root_plot.fit_util import LANGAUS_LIBRARY
+
+def test_fit_many_compile_langau_cold_cache(tmp_path):
+  # fresh interpreter, so that langaufun is not declared yet, spawned
+  # workers on an empty ROOT_PLOT_CACHE
+  script = textwrap.dedent('''
+    import ROOT
+    from root_plot.fit_batch import fit_many
+    from root_plot.fit_util import langaus_compiled
+    ROOT.gRandom.SetSeed(1)
+    hists = []
+    for i in range(8):
+      hist = ROOT.TH1D(f'hLangauBatch{i}', '', 100, 0., 200.)
+      hist.SetDirectory(ROOT.nullptr)
+      for _ in range(5000):
+        hist.Fill(ROOT.gRandom.Landau(40., 4.) + ROOT.gRandom.Gaus(0., 5.))
+      hists.append(hist)
+    records = fit_many(hists, 'langau', workers=4, mpContext='spawn', compileLangau=True)
+    assert langaus_compiled()
+    assert len(records) == len(hists)
+    assert all(record.IsValid() for record in records), records
+  ''')
+  env = dict(os.environ, ROOT_PLOT_CACHE=str(tmp_path))
+  repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+  proc = subprocess.run([sys.executable, '-c', script], cwd=repo, env=env, capture_output=True, text=True, timeout=600)
+  assert proc.returncode == 0, proc.stdout + proc.stderr
+  assert any(name.startswith(LANGAUS_LIBRARY) and name.endswith('.so') for name in os.listdir(tmp_path))
@@ -0,0 +1,113 @@
+import itertools
+
+import pytest
+
+np = pytest.importorskip('numpy')
+ROOT = pytest.importorskip('ROOT')
+
+from root_plot import fit_cache
+from root_plot.array_util import hist_content, hist_sumw2
+from root_plot.fit_batch import cache_config, fit_hist
+from root_plot.fit_cache import FitCache
+from root_plot.fit_util import FitRecord, FitStrategy
+
+@pytest.fixture
+def cache(tmp_path):
+  cache = FitCache(str(tmp_path / 'fits.sqlite'))
+  yield cache
+  cache.close()
+
+@pytest.fixture
+def hist():
+  rng = np.random.default_rng(6)
+  hist = ROOT.TH1D('hFitCache', '', 50, -5., 5.)
+  hist.SetDirectory(ROOT.nullptr)
+  hist.Sumw2()
+  for x in rng.normal(0.5, 1., 5000):
+    hist.Fill(x)
+  return hist
+
+CONFIG = cache_config((-1.5, 2.5), {'mean': 0.5, 'sigma': 1.}, 'gaus')
+
+def clone(hist, name):
+  copy = hist.Clone(name)
+  copy.SetDirectory(ROOT.nullptr)
+  return copy
+
+def test_identical_histogram_hits(cache, hist):
+  key = cache.key(hist, 'gaus', CONFIG)
+  record = FitRecord('hFitCache', 'gaus', [1., 0.5, 1.], [0.1, 0.01, 0.01], 40., 47, 0, (-1.5, 2.5), ncalls=80)
+  assert cache.get(key) is None
+  cache.put(key, record)
+  copy = clone(hist, 'hFitCacheCopy') # name is not part of the key
+  assert cache.key(copy, 'gaus', CONFIG) == key
+  cached = cache.get(cache.key(copy, 'gaus', CONFIG))
+  assert cached.cached and not record.cached
+  assert cached.to_dict() == record.to_dict()
+  assert (cache.hits, cache.misses) == (1, 1)
+
+def modify_content(hist):
+  hist_content(hist)[20] += 1.
+
+def modify_sumw2(hist):
+  hist_sumw2(hist)[20] += 1.
+
+def modify_range(hist):
+  hist.GetXaxis().SetRange(5, 45)
+
+def modify_binning(hist):
+  hist.SetBins(50, -5., 5.5)
+
+@pytest.mark.parametrize('modify', [modify_content, modify_sumw2, modify_range, modify_binning])
+def test_modified_histogram_misses(cache, hist, modify):
+  key = cache.key(hist, 'gaus', CONFIG)
+  copy = clone(hist, 'hFitCacheModified')
+  modify(copy)
+  assert cache.key(copy, 'gaus', CONFIG) != key
+
+def test_sumw2_presence_changes_key(cache):
+  plain = ROOT.TH1D('hFitCachePlain', '', 10, 0., 1.)
+  plain.SetDirectory(ROOT.nullptr)
+  plain.SetBinContent(3, 4.)
+  withSumw2 = clone(plain, 'hFitCacheSumw2')
+  withSumw2.Sumw2()
+  assert cache.key(plain, 'gaus', CONFIG) != cache.key(withSumw2, 'gaus', CONFIG)
+
+@pytest.mark.parametrize('model, config', [
+  ('langau', CONFIG),
+  ('gaus', cache_config((-1.5, 2.6), {'mean': 0.5, 'sigma': 1.}, 'gaus')),
+  ('gaus', cache_config((-1.5, 2.5), {'mean': 0.6, 'sigma': 1.}, 'gaus')),
+  ('gaus', cache_config((-1.5, 2.5), {'mean': 0.5, 'sigma': 1.}, 'gaus', fitStrategy=FitStrategy(strategy=2))),
+])
+def test_config_change_misses(cache, hist, model, config):
+  assert cache.key(hist, model, config) != cache.key(hist, 'gaus', CONFIG)
+
+def test_compile_langau_in_key():
+  config = cache_config((10., 60.), {'pars': [[1., 0.5, 2.]]}, 'langau')
+  assert config != cache_config((10., 60.), {'pars': [[1., 0.5, 2.]]}, 'langau', compileLangau=True)
+
+def test_lru_eviction(tmp_path, monkeypatch):
+  clock = itertools.count(1000.)
+  monkeypatch.setattr(fit_cache.time, 'time', lambda: float(next(clock)))
+  cache = FitCache(str(tmp_path / 'lru.sqlite'), maxEntries=3)
+  for key in ['a', 'b', 'c']:
+    cache.put(key, FitRecord(key, 'gaus', status=0))
+  assert cache.get('a') is not None # most recently used now
+  cache.put('d', FitRecord('d', 'gaus', status=0))
+  assert len(cache) == 3
+  assert cache.get('b') is None # least recently used, evicted
+  assert all(cache.get(key) is not None for key in ['a', 'c', 'd'])
+  cache.close()
+
+def test_persistent(tmp_path, hist):
+  path = str(tmp_path / 'persist.sqlite')
+  cache = FitCache(path)
+  first = fit_hist(hist, 'gaus', cache=cache)
+  assert first.status == 0 and not first.cached
+  cache.close()
+  cache = FitCache(path)
+  second = fit_hist(hist, 'gaus', cache=cache)
+  assert second.cached and second.ncalls == first.ncalls
+  assert second.params == pytest.approx(first.params)
+  assert (cache.hits, cache.misses) == (1, 0)
+  cache.close()
@@ -0,0 +1,116 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+ROOT = pytest.importorskip('ROOT')
+
+from root_plot import fit_util
+
+LANGAUS_PARS = [
+  (1.0, 10., 1000., 1.5),
+  (0.2, 5., 1., 0.05), # narrow Gaussian, Landau dominated
+  (5., 100., 1e5, 20.), # wide Gaussian
+]
+
+@pytest.mark.parametrize('pars', LANGAUS_PARS)
+def test_langaus_array_matches_fcn_langaus(pars):
+  xmin = pars[1] - 10 * (pars[0] + pars[3])
+  xmax = pars[1] + 40 * (pars[0] + pars[3])
+  xs = np.linspace(xmin, xmax, 301)
+  ref = np.array([fit_util.fcn_langaus([x], list(pars)) for x in xs])
+  vec = fit_util.langaus_array(xs, pars)
+  np.testing.assert_allclose(vec, ref, rtol=1e-6, atol=1e-9 * ref.max())
+  assert fit_util.fcn_langaus_vec([xs[50]], list(pars)) == pytest.approx(ref[50], rel=1e-6)
+
+def test_landau_array_matches_tmath():
+  xs = np.concatenate([np.linspace(-8., 10., 200), [20., 100., 400., 1e4]])
+  for mpv, sigma in [(0., 1.), (3., 0.5)]:
+    ref = np.array([ROOT.TMath.Landau(x, mpv, sigma) for x in xs])
+    np.testing.assert_allclose(fit_util.landau_array(xs, mpv, sigma), ref, rtol=1e-9, atol=1e-300)
+
+def test_fit_langaus_vec_result_outlives_fitter():
+  pars = (1.0, 10., 1000., 1.5)
+  hist = ROOT.TH1D('hLangausVec', '', 80, 0., 40.)
+  hist.SetDirectory(ROOT.nullptr)
+  centers = np.array([hist.GetBinCenter(i) for i in range(1, 81)])
+  for i, value in enumerate(fit_util.langaus_array(centers, pars) * hist.GetBinWidth(1)):
+    hist.SetBinContent(i + 1, value)
+    hist.SetBinError(i + 1, max(np.sqrt(value), 1.))
+  result, ncalls = fit_util.fit_langaus_vec(hist, (2., 35.), [1.2, 9.5, 900., 1.2],
+    [0.1, 0., 1., 0.1], [10., 30., 1e5, 10.])
+  assert result is not None and ncalls > 0
+  assert result.Status() == 0 # result is a copy, still valid after the fitter is gone
+  assert result.Parameter(1) == pytest.approx(pars[1], rel=0.05)
+
+@pytest.fixture
+def hpeak():
+  rng = np.random.default_rng(7)
+  hist = ROOT.TH1D('hPeakStats', '', 80, 0., 40.)
+  hist.SetDirectory(ROOT.nullptr)
+  for x in np.concatenate([rng.normal(15., 2., 4000), rng.normal(30., 3., 1500)]):
+    hist.Fill(x)
+  hist.GetXaxis().SetRange(11, 70) # x in [5, 35], peak at 15 inside
+  return hist
+
+def crossing(hist, inside, outside):
+  half = hist.GetBinContent(hist.GetMaximumBin()) / 2.
+  xin, xout = hist.GetBinCenter(inside), hist.GetBinCenter(outside)
+  cin, cout = hist.GetBinContent(inside), hist.GetBinContent(outside)
+  return xin + (cin - half) / (cin - cout) * (xout - xin)
+
+def test_peak_stats_matches_th1_in_axis_range(hpeak):
+  fit_util.clear_peak_stats_cache()
+  stats = fit_util.peak_stats(hpeak)
+  axis = hpeak.GetXaxis()
+  first, last = axis.GetFirst(), axis.GetLast()
+  maxBin = hpeak.GetMaximumBin() # in axis range
+  assert stats.peak == hpeak.GetBinContent(maxBin)
+  assert stats.peakX == pytest.approx(hpeak.GetBinCenter(maxBin))
+  half = stats.peak / 2.
+  firstAbove = hpeak.FindFirstBinAbove(half, 1, first, last)
+  lastAbove = hpeak.FindLastBinAbove(half, 1, first, last)
+  assert first < firstAbove and lastAbove < last
+  assert stats.halfLeft == pytest.approx(crossing(hpeak, firstAbove, firstAbove - 1))
+  assert stats.halfRight == pytest.approx(crossing(hpeak, lastAbove, lastAbove + 1))
+  assert stats.fwhm == pytest.approx(stats.halfRight - stats.halfLeft)
+  # axis range set: TH1::GetStats uses the bin contents in range
+  assert stats.mean == pytest.approx(hpeak.GetMean(), rel=1e-12)
+  assert stats.rms == pytest.approx(hpeak.GetStdDev(), rel=1e-12)
+  assert stats.integral == pytest.approx(hpeak.Integral(first, last))
+  assert stats.integralWidth == pytest.approx(hpeak.Integral(first, last, 'width'))
+
+def test_peak_stats_cache_invalidated(hpeak):
+  fit_util.clear_peak_stats_cache()
+  stats = fit_util.peak_stats(hpeak)
+  assert fit_util.peak_stats(hpeak) is stats
+  for _ in range(5000):
+    hpeak.Fill(32.3)
+  after = fit_util.peak_stats(hpeak)
+  assert after is not stats and after.peakX == pytest.approx(hpeak.GetBinCenter(hpeak.FindBin(32.3)))
+  hpeak.GetXaxis().SetRange(1, 40) # peak at 32.3 excluded
+  ranged = fit_util.peak_stats(hpeak)
+  assert ranged.peakX == pytest.approx(hpeak.GetBinCenter(hpeak.GetMaximumBin()))
+  assert ranged.peakX < 20.
+
+class FakeResult:
+  def GetParams(self):
+    return [1., 15., 100., 1.]
+  def Chi2(self):
+    return 10.
+  def Ndf(self):
+    return 8
+
+def test_langau_annotation_shows_binned_mean(hpeak, tmp_path):
+  from root_plot.painter import Painter
+  ROOT.gROOT.SetBatch(True)
+  painter = Painter(printer=str(tmp_path / 'annotation.pdf'))
+  painter.DrawHist(hpeak)
+  fcn = ROOT.TF1('fcnAnnotation', 'pol3', 0., 40.)
+  painter.draw_langau_fit(hpeak, fcn, FakeResult())
+  paves = [obj for obj in painter.pad.GetListOfPrimitives() if obj.InheritsFrom('TPaveText')]
+  lines = [line.GetTitle() for pave in paves for line in pave.GetListOfLines()]
+  expected = f'Mean = {fit_util.peak_stats(hpeak).mean:.2e}'
+  assert expected in lines
+  hpeak.GetXaxis().SetRange() # full range: binned mean of all bins, not unbinned GetMean
+  binned = sum(hpeak.GetBinContent(i) * hpeak.GetBinCenter(i) for i in range(1, 81)) / hpeak.Integral()
+  assert fit_util.peak_stats(hpeak).mean == pytest.approx(binned, rel=1e-12)
+  assert fit_util.peak_stats(hpeak).mean != hpeak.GetMean()
@@ -0,0 +1,101 @@
+import ctypes
+
+import pytest
+
+np = pytest.importorskip('numpy')
+ROOT = pytest.importorskip('ROOT')
+
+from root_plot.array_util import hist_content, hist_sumw2
+from root_plot.integral_index import IntegralIndex, integral_index, clear_integral_index
+from root_plot.plot_util import HistCount, HistCounts, H2ProjectionX, H2ProjectionBands
+
+@pytest.fixture
+def h1():
+  rng = np.random.default_rng(1)
+  hist = ROOT.TH1D('hIndex1', '', 20, 0., 10.)
+  hist.SetDirectory(ROOT.nullptr)
+  hist.Sumw2()
+  hist_content(hist)[...] = rng.uniform(0., 5., 22)
+  hist_sumw2(hist)[...] = rng.uniform(0., 2., 22)
+  return hist
+
+@pytest.fixture
+def h2():
+  rng = np.random.default_rng(2)
+  hist = ROOT.TH2D('hIndex2', '', 12, 0., 6., 8, -2., 2.)
+  hist.SetDirectory(ROOT.nullptr)
+  hist.Sumw2()
+  hist_content(hist)[...] = rng.uniform(0., 5., (14, 10))
+  hist_sumw2(hist)[...] = rng.uniform(0., 2., (14, 10))
+  return hist
+
+# includes flow bins, last bin, hi beyond overflow and hi < lo (TH1::Integral clamping)
+BIN_RANGES = [(1, 20), (0, 21), (3, 3), (5, 12), (-4, 7), (15, 40), (12, 5), (0, 0), (21, 21)]
+
+@pytest.mark.parametrize('lo, hi', BIN_RANGES)
+def test_integral_matches_integral_and_error(h1, lo, hi):
+  err = ctypes.c_double(0.)
+  ref = h1.IntegralAndError(lo, hi, err)
+  value, error = IntegralIndex(h1).integral(lo, hi)
+  assert value == pytest.approx(ref, rel=1e-12, abs=1e-12)
+  assert error == pytest.approx(err.value, rel=1e-12, abs=1e-12)
+
+def test_integral_x_matches_hist_count(h1):
+  windows = [(0., 10.), (1.2, 3.7), (2.5, 2.5), (-5., 4.), (7., 30.), (9.9, 10.), (4., 1.)]
+  values, errors = HistCounts(h1, [w[0] for w in windows], [w[1] for w in windows])
+  for (xlow, xup), value, error in zip(windows, values, errors):
+    err = ctypes.c_double(0.)
+    assert value == pytest.approx(HistCount(h1, xlow, xup, err), rel=1e-12, abs=1e-12)
+    assert error == pytest.approx(err.value, rel=1e-12, abs=1e-12)
+    assert HistCount(h1, xlow, xup, index=integral_index(h1)) == pytest.approx(value, rel=1e-12, abs=1e-12)
+
+@pytest.mark.parametrize('xlo, xhi, ylo, yhi', [(1, 12, 1, 8), (0, 13, 0, 9), (3, 5, 2, 2), (-1, 4, 7, 20), (6, 2, 1, 3)])
+def test_integral_2d_matches_integral_and_error(h2, xlo, xhi, ylo, yhi):
+  err = ctypes.c_double(0.)
+  ref = h2.IntegralAndError(xlo, xhi, ylo, yhi, err)
+  value, error = IntegralIndex(h2).integral_2d(xlo, xhi, ylo, yhi)
+  assert value == pytest.approx(ref, rel=1e-12, abs=1e-12)
+  assert error == pytest.approx(err.value, rel=1e-12, abs=1e-12)
+
+@pytest.mark.parametrize('ylo, yhi', [(1, 8), (0, 9), (4, 4), (3, 20), (5, 2), (-3, 2)])
+def test_band_x_matches_projection_x(h2, ylo, yhi):
+  proj = h2.ProjectionX('hIndexProj', ylo, yhi)
+  content, sumw2 = IntegralIndex(h2).band_x(ylo, yhi)
+  np.testing.assert_allclose(content[0], hist_content(proj), rtol=1e-12, atol=1e-12)
+  np.testing.assert_allclose(sumw2[0], hist_sumw2(proj), rtol=1e-12, atol=1e-12)
+  proj.Delete()
+
+def test_projection_bands_match_h2_projection_x(h2):
+  ylows, yups = [-2., -0.3, 1.], [2., 0.8, 1.]
+  content, errors = H2ProjectionBands(h2, ylows, yups)
+  for i, (ylow, yup) in enumerate(zip(ylows, yups)):
+    proj = H2ProjectionX(f'hIndexBand{i}', h2, ylow, yup)
+    np.testing.assert_allclose(content[i], hist_content(proj), rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(errors[i], np.sqrt(hist_sumw2(proj)), rtol=1e-12, atol=1e-12)
+    proj.Delete()
+
+def test_cache_invalidated_by_modification(h1):
+  clear_integral_index()
+  before = integral_index(h1)
+  assert integral_index(h1) is before
+  h1.SetBinContent(4, h1.GetBinContent(4) + 1.)
+  after = integral_index(h1)
+  assert after is not before
+  assert after.integral(4, 4)[0] == pytest.approx(h1.GetBinContent(4))
+
+def test_array_writes_need_rebuild(h1):
+  clear_integral_index()
+  index = integral_index(h1)
+  hist_content(h1)[4] += 1.
+  assert integral_index(h1) is index # O(1) key does not see array writes
+  assert index.rebuild(h1).integral(4, 4)[0] == pytest.approx(h1.GetBinContent(4))
+  h1.Scale(2.)
+  clear_integral_index(h1)
+  assert integral_index(h1) is not index
+  assert integral_index(h1).integral(4, 4)[0] == pytest.approx(h1.GetBinContent(4))
+
+def test_index_outlives_histogram(h1):
+  index = IntegralIndex(h1)
+  expected = index.integral_x(2., 6.)
+  h1.Delete()
+  np.testing.assert_allclose(index.integral_x(2., 6.), expected)
@@ -0,0 +1,91 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+ROOT = pytest.importorskip('ROOT')
+
+from root_plot.array_util import hist_content, hist_errors
+from root_plot.ratio_util import poisson_interval, ratio_arrays, ratio_graph, values_at, check_binning
+
+# Garwood central 68.27% intervals
+GARWOOD = [(0, 0., 1.8411), (1, 0.1727, 3.2996), (2, 0.7082, 4.6379), (5, 2.8403, 8.3825), (10, 6.8913, 14.267)]
+
+def new_hist(name, contents, nbins=10, xmin=0., xmax=10.):
+  hist = ROOT.TH1D(name, '', nbins, xmin, xmax)
+  hist.SetDirectory(ROOT.nullptr)
+  hist.Sumw2()
+  for i, value in enumerate(contents):
+    hist.SetBinContent(i + 1, value)
+    hist.SetBinError(i + 1, np.sqrt(value))
+  return hist
+
+@pytest.fixture
+def pass_total():
+  rng = np.random.default_rng(3)
+  total = rng.integers(5, 200, 10).astype(float)
+  passed = np.floor(total * rng.uniform(0., 1., 10))
+  return new_hist('hPass', passed), new_hist('hTotal', total)
+
+def test_poisson_interval_garwood():
+  n = np.array([g[0] for g in GARWOOD])
+  lower, upper = poisson_interval(n, level=0.6827)
+  np.testing.assert_allclose(lower, [g[1] for g in GARWOOD], rtol=2e-4, atol=1e-4)
+  np.testing.assert_allclose(upper, [g[2] for g in GARWOOD], rtol=2e-4)
+
+@pytest.mark.parametrize('n', [[1.5, 2.], [-1., 3.], [np.nan]])
+def test_poisson_interval_rejects_non_counts(n):
+  with pytest.raises(ValueError):
+    poisson_interval(n)
+
+def test_poisson_ratio_errors():
+  yn, yd = np.array([0., 1., 5., 10.]), np.array([2., 2., 4., 8.])
+  value, errLow, errHigh = ratio_arrays(yn, np.sqrt(yn), yd, np.zeros(4), errors='poisson', level=0.6827)
+  lower = np.array([0., 0.1727, 2.8403, 6.8913])
+  upper = np.array([1.8411, 3.2996, 8.3825, 14.267])
+  np.testing.assert_allclose(value, yn / yd)
+  np.testing.assert_allclose(errLow, (yn - lower) / yd, rtol=2e-4, atol=1e-4)
+  np.testing.assert_allclose(errHigh, (upper - yn) / yd, rtol=2e-4)
+
+def test_poisson_ratio_rejects_weighted():
+  with pytest.raises(ValueError):
+    ratio_arrays([0.5, 2.25], [0.5, 1.5], [1., 2.], [1., 1.], errors='poisson')
+
+@pytest.mark.parametrize('errors, option', [('binomial', 'B'), ('uncorrelated', '')])
+def test_ratio_matches_th1_divide(pass_total, errors, option):
+  passed, total = pass_total
+  ref = passed.Clone('hRatioRef')
+  ref.SetDirectory(ROOT.nullptr)
+  ref.Divide(passed, total, 1., 1., option)
+  value, errLow, errHigh = ratio_arrays(hist_content(passed, flow=False), hist_errors(passed, flow=False),
+    hist_content(total, flow=False), hist_errors(total, flow=False), errors=errors)
+  np.testing.assert_allclose(value, hist_content(ref, flow=False), rtol=1e-12)
+  np.testing.assert_allclose(errLow, hist_errors(ref, flow=False), rtol=1e-9, atol=1e-12)
+  np.testing.assert_allclose(errHigh, errLow)
+
+def test_ratio_graph_points(pass_total):
+  passed, total = pass_total
+  graph = ratio_graph(passed, total, errors='binomial')
+  assert graph.GetN() == 10
+  y = np.frombuffer(graph.GetY(), dtype=np.float64, count=graph.GetN())
+  np.testing.assert_allclose(y, hist_content(passed, flow=False) / hist_content(total, flow=False))
+
+@pytest.mark.parametrize('mode', ['diff', 'pull'])
+def test_diff_and_pull_uncorrelated(mode):
+  yn, eyn, yd, eyd = np.array([4., 9.]), np.array([2., 3.]), np.array([5., 5.]), np.array([1., 2.])
+  value, errLow, errHigh = ratio_arrays(yn, eyn, yd, eyd, mode=mode)
+  sigma = np.sqrt(eyn**2 + eyd**2)
+  np.testing.assert_allclose(value, yn - yd if mode == 'diff' else (yn - yd) / sigma)
+  np.testing.assert_allclose(errLow, sigma if mode == 'diff' else 0.)
+
+def test_binning_mismatch_raises():
+  num = new_hist('hNumBins', [1.] * 10)
+  den = new_hist('hDenBins', [1.] * 20, nbins=20)
+  with pytest.raises(ValueError):
+    check_binning(num, den)
+  with pytest.raises(ValueError):
+    ratio_graph(num, den)
+
+def test_values_at_bin_lookup():
+  hist = new_hist('hValuesAt', np.arange(1., 11.))
+  values, errors = values_at(hist, np.array([0.5, 9.5, -1., 11.]))
+  np.testing.assert_allclose(values, [1., 10., 0., 0.]) # under/overflow bins
+  np.testing.assert_allclose(errors[:2], np.sqrt([1., 10.]))
@@ -0,0 +1,101 @@
+from array import array
+
+import pytest
+
+np = pytest.importorskip('numpy')
+ROOT = pytest.importorskip('ROOT')
+
+from root_plot.array_util import hist_content, hist_sumw2, axis_edges
+from root_plot.rebin_util import rebin_1d, rebin_2d, group_edges
+from root_plot.plot_util import Rebin2D
+
+def cell_values(hist):
+  ncells = hist.GetNcells()
+  return (np.array([hist.GetBinContent(i) for i in range(ncells)]),
+    np.array([hist.GetBinError(i) for i in range(ncells)]))
+
+@pytest.fixture
+def h1():
+  rng = np.random.default_rng(4)
+  hist = ROOT.TH1D('hRebinSource1', '', 20, 0., 10.)
+  hist.SetDirectory(ROOT.nullptr)
+  hist.Sumw2()
+  for x, w in zip(rng.normal(5., 3., 2000), rng.uniform(0.5, 2., 2000)): # with under/overflow
+    hist.Fill(x, w)
+  return hist
+
+@pytest.fixture
+def h2():
+  rng = np.random.default_rng(5)
+  hist = ROOT.TH2D('hRebinSource2', '', 12, 0., 6., 8, -2., 2.)
+  hist.SetDirectory(ROOT.nullptr)
+  hist.Sumw2()
+  for x, y, w in zip(rng.normal(3., 2., 3000), rng.normal(0., 1.5, 3000), rng.uniform(0.5, 2., 3000)):
+    hist.Fill(x, y, w)
+  return hist
+
+def test_rebin_1d_matches_th1_rebin(h1):
+  edges = [0., 0.5, 1.5, 3., 5., 8., 10.] # variable width, aligned to source edges
+  ref = h1.Rebin(len(edges) - 1, 'hRebinRef1', array('d', edges))
+  hist = rebin_1d(h1, edges, 'hRebin1')
+  np.testing.assert_array_equal(axis_edges(hist.GetXaxis()), edges)
+  for values, refValues in zip(cell_values(hist), cell_values(ref)):
+    np.testing.assert_allclose(values, refValues, rtol=1e-12, atol=1e-12)
+  assert hist.GetEntries() == ref.GetEntries()
+
+def test_rebin_1d_narrower_range_goes_to_flow(h1):
+  edges = [2., 4., 5., 7.] # source bins outside go to under/overflow
+  ref = h1.Rebin(len(edges) - 1, 'hRebinRef1b', array('d', edges))
+  hist = rebin_1d(h1, edges, 'hRebin1b')
+  for values, refValues in zip(cell_values(hist), cell_values(ref)):
+    np.testing.assert_allclose(values, refValues, rtol=1e-12, atol=1e-12)
+
+def test_rebin_2d_matches_th2_rebin2d(h2):
+  ref = h2.Rebin2D(3, 2, 'hRebinRef2')
+  hist = rebin_2d(h2, group_edges(axis_edges(h2.GetXaxis()), 3), group_edges(axis_edges(h2.GetYaxis()), 2), 'hRebin2')
+  assert (hist.GetNbinsX(), hist.GetNbinsY()) == (ref.GetNbinsX(), ref.GetNbinsY())
+  for values, refValues in zip(cell_values(hist), cell_values(ref)):
+    np.testing.assert_allclose(values, refValues, rtol=1e-12, atol=1e-12)
+
+# Not aligned to source edges: source bins assigned by center, as TH2::Fill
+XEDGES = [0.3, 1.1, 2.6, 4.2, 5.5]
+YEDGES = [-1.7, -0.2, 0.4, 1.9]
+
+def fill_reference(h2, name):
+  """Reference by TH2::Fill at source bin centers (flow cells included),
+  errors from summed sumw2 of the source
+  """
+  ref = ROOT.TH2D(name, '', len(XEDGES) - 1, array('d', XEDGES), len(YEDGES) - 1, array('d', YEDGES))
+  ref.SetDirectory(ROOT.nullptr)
+  sumw2 = np.zeros(ref.GetNcells())
+  xaxis, yaxis = h2.GetXaxis(), h2.GetYaxis()
+  for i in range(h2.GetNbinsX() + 2):
+    for j in range(h2.GetNbinsY() + 2):
+      x, y = xaxis.GetBinCenter(i), yaxis.GetBinCenter(j)
+      ref.Fill(x, y, h2.GetBinContent(i, j))
+      sumw2[ref.FindBin(x, y)] += h2.GetBinError(i, j)**2
+  content = np.array([ref.GetBinContent(i) for i in range(ref.GetNcells())])
+  return ref, content, sumw2
+
+def test_rebin2d_matches_fill_reference(h2):
+  _, content, sumw2 = fill_reference(h2, 'hRebinFill')
+  hist = Rebin2D(h2, XEDGES, YEDGES, name='hRebinFlow', normalize=False)
+  values, errors = cell_values(hist)
+  np.testing.assert_allclose(values, content, rtol=1e-12, atol=1e-12)
+  np.testing.assert_allclose(errors, np.sqrt(sumw2), rtol=1e-12, atol=1e-12)
+  assert hist_content(hist)[0, :].sum() > 0 and hist_content(hist)[-1, :].sum() > 0 # flow filled
+
+def test_rebin2d_normalize(h2):
+  _, content, sumw2 = fill_reference(h2, 'hRebinFillNorm')
+  hist = Rebin2D(h2, XEDGES, YEDGES, name='hRebinNorm', normalize=True)
+  widthX = np.diff(XEDGES)
+  widthY = np.diff(YEDGES)
+  factor = np.outer(widthX, widthY) * h2.GetSum()
+  shape = (len(XEDGES) + 1, len(YEDGES) + 1)
+  inner = (slice(1, -1), slice(1, -1))
+  expected = content.reshape(shape[::-1]).T
+  expectedErr = np.sqrt(sumw2.reshape(shape[::-1]).T)
+  np.testing.assert_allclose(hist_content(hist)[inner], expected[inner] / factor, rtol=1e-12)
+  np.testing.assert_allclose(np.sqrt(hist_sumw2(hist)[inner]), expectedErr[inner] / factor, rtol=1e-12)
+  # flow cells are not normalised
+  np.testing.assert_allclose(hist_content(hist)[0], expected[0], rtol=1e-12)
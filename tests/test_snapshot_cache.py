@@ -0,0 +1,84 @@
+import os
+from array import array
+
+import pytest
+
+np = pytest.importorskip('numpy')
+ROOT = pytest.importorskip('ROOT')
+
+from root_plot.array_util import axis_edges
+from root_plot.file_util import walk_file
+from root_plot.snapshot_cache import SnapshotCache
+
+def hist_values(hist):
+  ndim = hist.GetDimension()
+  axes = [hist.GetXaxis(), hist.GetYaxis(), hist.GetZaxis()][:ndim]
+  ncells = hist.GetNcells()
+  return {
+    'className': hist.ClassName(), 'name': hist.GetName(), 'title': hist.GetTitle(),
+    'edges': [list(axis_edges(axis)) for axis in axes],
+    'axisTitles': [axis.GetTitle() for axis in axes],
+    'content': [hist.GetBinContent(i) for i in range(ncells)],
+    'errors': [hist.GetBinError(i) for i in range(ncells)],
+    'entries': hist.GetEntries(),
+    'line': (hist.GetLineColor(), hist.GetLineStyle(), hist.GetLineWidth()),
+    'marker': (hist.GetMarkerColor(), hist.GetMarkerStyle()),
+    'minimum': hist.GetMinimumStored(), 'maximum': hist.GetMaximumStored(),
+    'option': hist.GetOption(),
+    'ranges': [(axis.GetFirst(), axis.GetLast()) for axis in axes],
+  }
+
+@pytest.fixture
+def source(tmp_path):
+  rng = np.random.default_rng(3)
+  path = str(tmp_path / 'source.root')
+  with ROOT.TDirectory.TContext():
+    tfile = ROOT.TFile(path, 'RECREATE')
+    qa = tfile.mkdir('QA')
+    hists = []
+    h1 = ROOT.TH1D('hEnergy', 'Energy;E (GeV);counts', 5, array('d', [0., 1., 2.5, 5., 10., 20.]))
+    h1.Sumw2()
+    for x in rng.exponential(4., 500):
+      h1.Fill(x, 0.5)
+    h1.SetLineColor(ROOT.kBlue)
+    h1.SetMarkerStyle(20)
+    h1.SetMinimum(0.1)
+    h1.GetXaxis().SetRange(2, 4)
+    hists.append(h1)
+    h2 = ROOT.TH2F('hMap', 'Map;x;y', 12, -3., 3., 8, 0., 4.)
+    for x, y in zip(rng.normal(0., 1., 800), rng.uniform(-1., 5., 800)):
+      h2.Fill(x, y)
+    h2.SetOption('colz')
+    hists.append(h2)
+    h3 = ROOT.TH1I('hCounts', 'Counts', 10, 0., 10.) # no Sumw2
+    for x in rng.integers(-1, 12, 200):
+      h3.Fill(x)
+    hists.append(h3)
+    hc = ROOT.TH2C('hHits', 'Hits', 4, 0., 4., 4, 0., 4.)
+    hc.Fill(1., 2.)
+    hists.append(hc)
+    for hist in hists:
+      qa.WriteTObject(hist)
+    graph = ROOT.TGraph(3, array('d', [1., 2., 3.]), array('d', [2., 4., 8.]))
+    tfile.WriteTObject(graph, 'gTrend')
+    tfile.Close()
+  return path
+
+def test_walk_round_trip(source, tmp_path):
+  expected = {path: hist_values(obj) for path, obj in walk_file(source, classes=['TH1'])}
+  assert len(expected) == 4
+  cacheDir = str(tmp_path / 'snapshots')
+  for _ in range(2): # built, then read from the memory-mapped columns
+    cache = SnapshotCache(cacheDir)
+    objects = dict(cache.walk(source))
+    assert set(objects) == set(expected) | {'gTrend'}
+    for path, values in expected.items():
+      rebuilt = hist_values(objects[path])
+      for key in ('content', 'errors'):
+        np.testing.assert_allclose(rebuilt.pop(key), values[key], rtol=1e-12, err_msg=f'{path} {key}')
+      assert rebuilt.pop('entries') == pytest.approx(values['entries'])
+      assert rebuilt == {key: value for key, value in values.items() if key not in ('content', 'errors', 'entries')}
+    assert objects['gTrend'].GetN() == 3
+  assert (cache.hits, cache.misses) == (1, 0)
+  entryDir = cache.entry_dir(source)
+  assert sorted(name for name in os.listdir(entryDir) if name.endswith('.f8')) == ['content.f8', 'edges.f8', 'sumw2.f8']